@@ -4,11 +4,84 @@ import os
 
 load_dotenv()
 
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
 # MongoDB 配置
 MONGODB_URL = os.getenv("MONGODB_URL", "mongodb://localhost:27017")
 DB_NAME = os.getenv("DB_NAME", "bert_movie")
+MONGODB_MAX_POOL_SIZE = int(os.getenv("MONGODB_MAX_POOL_SIZE", 100))
+MONGODB_MIN_POOL_SIZE = int(os.getenv("MONGODB_MIN_POOL_SIZE", 0))
+MONGODB_CONNECT_TIMEOUT_MS = int(os.getenv("MONGODB_CONNECT_TIMEOUT_MS", 5000))
+MONGODB_SERVER_SELECTION_TIMEOUT_MS = int(os.getenv("MONGODB_SERVER_SELECTION_TIMEOUT_MS", 5000))
+MONGODB_SOCKET_TIMEOUT_MS = int(os.getenv("MONGODB_SOCKET_TIMEOUT_MS", 30000))
+MONGODB_APP_NAME = os.getenv("MONGODB_APP_NAME", "bert_movie_backend")
+MONGODB_ENSURE_INDEXES = os.getenv("MONGODB_ENSURE_INDEXES", "true").lower() == "true"  # 启动时按 database/indexes.py 创建缺失的索引
 
 # JWT 配置
 SECRET_KEY = os.getenv("SECRET_KEY", "secret")
 ALGORITHM = os.getenv("ALGORITHM", "HS256")
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", 720))
+USER_CACHE_TTL_SECONDS = int(os.getenv("USER_CACHE_TTL_SECONDS", 60))  # 认证用户缓存有效期
+USER_CACHE_MAX_SIZE = int(os.getenv("USER_CACHE_MAX_SIZE", 10000))
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", 12))  # bcrypt 代价因子，已有密码在下次登录时按新代价重新哈希
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", max(1, (os.cpu_count() or 2) // 2)))  # 并行计算 bcrypt 的线程数
+PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", 256))  # 排队等待哈希的请求上限，超过返回 503
+
+# 情感分析模型配置
+# 可选模型: teacher 为 模型训练.py 微调的 12 层模型，student 为 模型蒸馏.py 蒸馏的小模型，
+# 两者的延迟/准确率对比见 bert_experiment/模型对比.py 生成的 model_tradeoff.md
+SENTIMENT_MODELS = {
+    "teacher": os.path.join(BASE_DIR, "..", "bert_experiment", "results_bert_finetune", "final_model"),
+    "student": os.path.join(BASE_DIR, "..", "bert_experiment", "results_bert_distill", "final_model"),
+}
+SENTIMENT_MODEL = os.getenv("SENTIMENT_MODEL", "teacher")
+# 直接指定模型目录时优先于 SENTIMENT_MODEL
+SENTIMENT_MODEL_PATH = os.getenv("SENTIMENT_MODEL_PATH", SENTIMENT_MODELS.get(SENTIMENT_MODEL, SENTIMENT_MODEL))
+SENTIMENT_BACKEND = os.getenv("SENTIMENT_BACKEND", "torch")  # 推理后端: torch / torch-int8 / onnx
+SENTIMENT_MAX_LENGTH = int(os.getenv("SENTIMENT_MAX_LENGTH", 128))
+SENTIMENT_MAX_BATCH_SIZE = int(os.getenv("SENTIMENT_MAX_BATCH_SIZE", 32))  # 单个微批次最多文本数
+SENTIMENT_MAX_WAIT_MS = float(os.getenv("SENTIMENT_MAX_WAIT_MS", 10))  # 凑批最长等待时间（毫秒）
+# /api/analysis/sentiment 单次请求的文本条数与单条文本字符数上限（超出 SENTIMENT_MAX_LENGTH 的部分推理时本就会被截断）
+SENTIMENT_REQUEST_MAX_TEXTS = int(os.getenv("SENTIMENT_REQUEST_MAX_TEXTS", SENTIMENT_MAX_BATCH_SIZE))
+SENTIMENT_REQUEST_MAX_CHARS = int(os.getenv("SENTIMENT_REQUEST_MAX_CHARS", 512))
+SENTIMENT_SUB_BATCH_SIZE = int(os.getenv("SENTIMENT_SUB_BATCH_SIZE", 16))  # 微批次按长度排序后再切分的块大小
+SENTIMENT_CACHE_SIZE = int(os.getenv("SENTIMENT_CACHE_SIZE", 100000))  # 进程内 LRU 缓存条数上限
+SENTIMENT_CACHE_TTL_SECONDS = int(os.getenv("SENTIMENT_CACHE_TTL_SECONDS", 30 * 24 * 3600))  # sentiment_cache 集合过期时间
+
+# 关键词统计配置
+KEYWORD_TOP_K = int(os.getenv("KEYWORD_TOP_K", 50))
+KEYWORD_COMPACTION_INTERVAL_SECONDS = int(os.getenv("KEYWORD_COMPACTION_INTERVAL_SECONDS", 300))  # 后台压缩及刷新热门关键词的周期
+
+# 分词服务配置
+SEGMENTATION_WORKERS = int(os.getenv("SEGMENTATION_WORKERS", max((os.cpu_count() or 2) // 2, 1)))  # jieba 分词进程数
+SEGMENTATION_CHUNK_SIZE = int(os.getenv("SEGMENTATION_CHUNK_SIZE", 200))  # 每个子任务包含的评论数
+SEGMENTATION_CACHE_SIZE = int(os.getenv("SEGMENTATION_CACHE_SIZE", 200000))  # 单条评论分词结果缓存条数
+
+# 海报图片配置
+THUMBNAIL_SIZE = (int(os.getenv("THUMBNAIL_WIDTH", 240)), int(os.getenv("THUMBNAIL_HEIGHT", 360)))
+IMAGE_CACHE_MAX_AGE = int(os.getenv("IMAGE_CACHE_MAX_AGE", 365 * 24 * 3600))  # 带版本号图片地址的缓存时间
+
+# 词云图片配置
+WORD_CLOUD_FONT_PATH = os.getenv(
+    "WORD_CLOUD_FONT_PATH",
+    os.path.join(BASE_DIR, "static", "fonts", "NotoSansSC-Regular.otf"),  # 需要包含中文字形的字体，否则中文显示为方框
+)
+# 字体文件不存在且系统中也没有中文字体时，init_db.py 从这里下载（SIL OFL 授权的思源黑体简体子集）
+WORD_CLOUD_FONT_URL = os.getenv(
+    "WORD_CLOUD_FONT_URL",
+    "https://github.com/notofonts/noto-cjk/raw/main/Sans/SubsetOTF/SC/NotoSansSC-Regular.otf",
+)
+WORD_CLOUD_CACHE_DIR = os.getenv("WORD_CLOUD_CACHE_DIR", os.path.join(BASE_DIR, "cache", "word_clouds"))
+WORD_CLOUD_WORKERS = int(os.getenv("WORD_CLOUD_WORKERS", 2))  # 渲染词云的进程数
+WORD_CLOUD_CACHE_MAX_AGE = int(os.getenv("WORD_CLOUD_CACHE_MAX_AGE", 3600))  # 浏览器缓存时间，过期后用 ETag 协商
+
+# 评论写入队列配置
+REVIEW_QUEUE_MAX_SIZE = int(os.getenv("REVIEW_QUEUE_MAX_SIZE", 10000))  # 队列满时新评论返回 503
+REVIEW_BATCH_SIZE = int(os.getenv("REVIEW_BATCH_SIZE", 64))  # 每批打分并写入的评论数
+REVIEW_BATCH_MAX_WAIT_MS = float(os.getenv("REVIEW_BATCH_MAX_WAIT_MS", 50))
+REVIEW_WRITE_RETRIES = int(os.getenv("REVIEW_WRITE_RETRIES", 3))  # 批量写入失败后的重试次数
+REVIEW_WRITE_RETRY_BASE_MS = float(os.getenv("REVIEW_WRITE_RETRY_BASE_MS", 200))  # 重试间隔，每次翻倍
+
+# 监控指标配置
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() == "true"  # 是否统计请求与 MongoDB 命令耗时并开放 /metrics
+SLOW_REQUEST_MS = float(os.getenv("SLOW_REQUEST_MS", 1000))  # 超过该耗时的请求记录分阶段耗时日志，0 表示关闭
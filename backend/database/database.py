@@ -1,18 +1,44 @@
 from motor.motor_asyncio import AsyncIOMotorClient
-from config import MONGODB_URL, DB_NAME
+from config import (
+    MONGODB_URL,
+    DB_NAME,
+    MONGODB_MAX_POOL_SIZE,
+    MONGODB_MIN_POOL_SIZE,
+    MONGODB_CONNECT_TIMEOUT_MS,
+    MONGODB_SERVER_SELECTION_TIMEOUT_MS,
+    MONGODB_SOCKET_TIMEOUT_MS,
+    MONGODB_APP_NAME,
+    METRICS_ENABLED,
+)
+from utils.metrics import mongo_command_listener
 
 client = None
 db = None
 
 async def connect_to_mongo():
+    # 整个进程共用一个客户端（连接池），所有路由都通过它访问数据库
     global client, db
-    client = AsyncIOMotorClient(MONGODB_URL)
+    client = AsyncIOMotorClient(
+        MONGODB_URL,
+        maxPoolSize=MONGODB_MAX_POOL_SIZE,
+        minPoolSize=MONGODB_MIN_POOL_SIZE,
+        connectTimeoutMS=MONGODB_CONNECT_TIMEOUT_MS,
+        serverSelectionTimeoutMS=MONGODB_SERVER_SELECTION_TIMEOUT_MS,
+        socketTimeoutMS=MONGODB_SOCKET_TIMEOUT_MS,
+        appname=MONGODB_APP_NAME,
+        event_listeners=[mongo_command_listener] if METRICS_ENABLED else [],
+    )
     db = client[DB_NAME]
     
 async def close_mongo_connection():
-    global client
+    global client, db
     if client is not None:
         client.close()
+        client = None
+        db = None
+
+def get_client():
+    return client
 
 def get_database():
-    return db 
\ No newline at end of file
+    return db
@@ -0,0 +1,184 @@
+import logging
+from datetime import datetime
+from typing import List
+
+from bson import ObjectId
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from pymongo.errors import OperationFailure
+
+logger = logging.getLogger(__name__)
+
+# 索引注册表：集合 -> 索引列表。服务启动和 init_db 都按此表幂等创建，新增查询时在这里补充索引
+INDEXES = {
+    "movies": [
+        IndexModel([("movie_id", ASCENDING)]),
+        IndexModel([("title", ASCENDING)]),
+        # genres 为数组，多键索引支持按类型筛选并按 movie_id 分页
+        IndexModel([("genres", ASCENDING), ("movie_id", ASCENDING)]),
+    ],
+    "movie_reviews": [
+        # 电影详情按原顺序分页读取评论
+        IndexModel([("movie_id", ASCENDING), ("seq", ASCENDING)], unique=True),
+    ],
+    "users": [
+        IndexModel([("username", ASCENDING)], unique=True),
+        IndexModel([("email", ASCENDING)], unique=True),
+        IndexModel([("created_at", DESCENDING), ("_id", DESCENDING)]),
+    ],
+    "reviews": [
+        # 以下复合索引同时覆盖只按 movie_id / user_id 过滤的查询
+        IndexModel([("movie_id", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)]),
+        IndexModel([("user_id", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)]),
+        IndexModel([("created_at", DESCENDING), ("_id", DESCENDING)]),
+    ],
+    "review_daily_stats": [
+        # 趋势接口按 (movie_id, date) 范围读取；全站汇总的 movie_id 为 null
+        IndexModel([("movie_id", ASCENDING), ("date", ASCENDING)]),
+    ],
+    "favorites": [
+        # 收藏检查与防重复收藏
+        IndexModel([("user_id", ASCENDING), ("movie_id", ASCENDING)], unique=True),
+        IndexModel([("user_id", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)]),
+        IndexModel([("movie_id", ASCENDING)]),
+    ],
+}
+
+# 按 (created_at, _id) 倒序翻到第二页时的游标条件，与 keyset_filter 生成的结构一致
+_SAMPLE_KEYSET = {"$or": [
+    {"created_at": {"$lt": datetime(2024, 1, 1)}},
+    {"created_at": datetime(2024, 1, 1), "_id": {"$lt": ObjectId("000000000000000000000000")}},
+]}
+_SAMPLE_SORT = {"created_at": -1, "_id": -1}
+_MOVIE_TITLE_LOOKUP = {"from": "movies", "localField": "movie_id", "foreignField": "movie_id",
+                       "pipeline": [{"$project": {"_id": 0, "title": 1}}]}
+
+# 应用中的主要查询形态，索引顾问对它们执行 explain；示例值只用于生成执行计划
+# 带 pipeline 的形态按 aggregate 执行 explain，其余按 find
+QUERY_SHAPES = [
+    {"name": "movies.list", "collection": "movies", "filter": {}, "sort": [("movie_id", 1)], "limit": 21},
+    {"name": "movies.by_genre", "collection": "movies", "filter": {"genres": "剧情"},
+     "sort": [("movie_id", 1)], "limit": 21},
+    {"name": "movies.detail", "collection": "movies", "filter": {"movie_id": 1}},
+    {"name": "movie_reviews.by_movie", "collection": "movie_reviews", "filter": {"movie_id": 1},
+     "sort": [("seq", 1)], "limit": 21},
+    {"name": "users.by_username", "collection": "users", "filter": {"username": "admin"}},
+    {"name": "users.list", "collection": "users", "filter": {}, "sort": [("created_at", -1), ("_id", -1)], "limit": 51},
+    {"name": "reviews.by_movie", "collection": "reviews", "filter": {"movie_id": 1},
+     "sort": [("created_at", -1), ("_id", -1)], "limit": 51},
+    {"name": "reviews.by_user", "collection": "reviews", "filter": {"user_id": "0"},
+     "sort": [("created_at", -1), ("_id", -1)], "limit": 51},
+    {"name": "reviews.all", "collection": "reviews", "filter": {},
+     "sort": [("created_at", -1), ("_id", -1)], "limit": 21},
+    {"name": "review_daily_stats.trend", "collection": "review_daily_stats",
+     "filter": {"movie_id": None, "date": {"$gte": "2024-01-01", "$lte": "2024-01-07"}}},
+    {"name": "favorites.check", "collection": "favorites", "filter": {"user_id": "0", "movie_id": 1}},
+    {"name": "favorites.by_user", "collection": "favorites", "filter": {"user_id": "0"},
+     "sort": [("created_at", -1), ("_id", -1)], "limit": 51},
+    # 管理员评论列表：按游标分页后只对当前页关联电影标题
+    {"name": "reviews.all_with_movie", "collection": "reviews", "pipeline": [
+        {"$match": _SAMPLE_KEYSET},
+        {"$sort": _SAMPLE_SORT},
+        {"$limit": 21},
+        {"$lookup": {**_MOVIE_TITLE_LOOKUP, "as": "movie_info"}},
+    ]},
+    # 个人动态：评论与收藏各自按 (user_id, created_at, _id) 取一页后合并
+    {"name": "users.activities", "collection": "reviews", "pipeline": [
+        {"$match": {"user_id": "0", **_SAMPLE_KEYSET}},
+        {"$sort": _SAMPLE_SORT},
+        {"$limit": 51},
+        {"$unionWith": {"coll": "favorites", "pipeline": [
+            {"$match": {"user_id": "0", **_SAMPLE_KEYSET}},
+            {"$sort": _SAMPLE_SORT},
+            {"$limit": 51},
+        ]}},
+        {"$sort": _SAMPLE_SORT},
+        {"$limit": 51},
+        {"$lookup": {**_MOVIE_TITLE_LOOKUP, "as": "movie"}},
+    ]},
+]
+
+
+async def ensure_indexes(db) -> List[str]:
+    """按注册表创建索引；已存在的同名同定义索引不会重复创建"""
+    created = []
+    for collection, indexes in INDEXES.items():
+        for index in indexes:
+            try:
+                created.extend(await db[collection].create_indexes([index]))
+            except OperationFailure as e:
+                # 已有数据违反唯一约束，或同名索引定义不同：记录后继续，不阻止服务启动
+                logger.warning(f"创建索引 {collection}.{index.document['name']} 失败: {e}")
+    return created
+
+
+def _plan_stages(plan: dict):
+    yield plan.get("stage")
+    for key in ("inputStage", "queryPlan"):
+        if isinstance(plan.get(key), dict):
+            yield from _plan_stages(plan[key])
+    for child in plan.get("inputStages", []):
+        yield from _plan_stages(child)
+
+
+def _index_names(plan: dict):
+    if plan.get("indexName"):
+        yield plan["indexName"]
+    for key in ("inputStage", "queryPlan"):
+        if isinstance(plan.get(key), dict):
+            yield from _index_names(plan[key])
+    for child in plan.get("inputStages", []):
+        yield from _index_names(child)
+
+
+def _winning_plans(explain):
+    # find 与 aggregate 的 explain 结构不同，分片集群还会按分片嵌套，这里递归查找所有 winningPlan
+    if isinstance(explain, dict):
+        for key, value in explain.items():
+            if key == "winningPlan" and isinstance(value, dict):
+                yield value
+            else:
+                yield from _winning_plans(value)
+    elif isinstance(explain, list):
+        for item in explain:
+            yield from _winning_plans(item)
+
+
+async def explain_query_shape(db, shape: dict) -> dict:
+    if "pipeline" in shape:
+        # $unionWith 子管道的执行计划同样嵌套在 explain 结果中，由 _winning_plans 一并找出
+        command = {"aggregate": shape["collection"], "pipeline": shape["pipeline"], "cursor": {}}
+    else:
+        command = {"find": shape["collection"], "filter": shape.get("filter", {})}
+        if shape.get("sort"):
+            command["sort"] = dict(shape["sort"])
+        if shape.get("limit"):
+            command["limit"] = shape["limit"]
+    explain = await db.command({"explain": command, "verbosity": "queryPlanner"})
+
+    stages = set()
+    index_names = set()
+    for plan in _winning_plans(explain):
+        for stage in _plan_stages(plan):
+            stages.add(stage)
+        index_names.update(_index_names(plan))
+    problems = []
+    if "COLLSCAN" in stages:
+        problems.append("collection_scan")
+    if "SORT" in stages:
+        problems.append("in_memory_sort")
+    return {
+        "name": shape["name"],
+        "collection": shape["collection"],
+        "stages": sorted(s for s in stages if s),
+        "indexes": sorted(index_names),
+        "problems": problems,
+    }
+
+
+async def advise_indexes(db) -> dict:
+    """对已登记的查询形态执行 explain，标记全表扫描和内存排序"""
+    results = [await explain_query_shape(db, shape) for shape in QUERY_SHAPES]
+    return {
+        "ok": not any(result["problems"] for result in results),
+        "queries": results,
+    }
@@ -1,10 +1,21 @@
 from fastapi import FastAPI, Request
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
-from motor.motor_asyncio import AsyncIOMotorClient
 from routers import movies, analysis, users, reviews, favorites, analytics
 from routers.users import login
 import config
-from database.database import connect_to_mongo, close_mongo_connection
+from database.database import connect_to_mongo, close_mongo_connection, get_client, get_database
+from database.indexes import ensure_indexes
+from utils.sentiment import start_sentiment_service, stop_sentiment_service
+from utils.keyword_stats import run_compaction_loop
+from utils.segmentation import shutdown_segmentation
+from utils.word_cloud import shutdown_word_cloud
+from utils.pagination import NEXT_CURSOR_HEADER
+from utils.review_queue import start_review_queue, stop_review_queue
+from utils.metrics import (
+    begin_request, end_request, route_template, render_metrics, PROMETHEUS_CONTENT_TYPE,
+)
+import asyncio
 
 app = FastAPI(title="Movie Analysis System API")
 
@@ -15,18 +26,51 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER],  # 前端可读取游标分页的下一页游标
 )
 
+if config.METRICS_ENABLED:
+    @app.middleware("http")
+    async def record_request_metrics(request: Request, call_next):
+        if request.url.path == "/metrics":
+            return await call_next(request)
+        stats = begin_request(request.method)
+        status_code = 500
+        try:
+            response = await call_next(request)
+            status_code = response.status_code
+            return response
+        finally:
+            # call_next 返回后路由已匹配，scope 中带有对应的路由
+            stats.route = route_template(request.scope)
+            end_request(stats, status_code, config.SLOW_REQUEST_MS)
+
+    @app.get("/metrics", include_in_schema=False)
+    async def metrics():
+        return PlainTextResponse(render_metrics(), media_type=PROMETHEUS_CONTENT_TYPE)
+
 @app.on_event("startup")
 async def startup_db_client():
-    app.mongodb_client = AsyncIOMotorClient(config.MONGODB_URL)
-    app.mongodb = app.mongodb_client[config.DB_NAME]
     await connect_to_mongo()
+    # request.app.mongodb 与 get_database() 共用同一个连接池
+    app.mongodb_client = get_client()
+    app.mongodb = get_database()
+    if config.MONGODB_ENSURE_INDEXES:
+        await ensure_indexes(app.mongodb)
+    await start_sentiment_service()
+    await start_review_queue()
+    app.keyword_compaction_task = asyncio.create_task(
+        run_compaction_loop(get_database, config.KEYWORD_COMPACTION_INTERVAL_SECONDS, config.KEYWORD_TOP_K)
+    )
 
 @app.on_event("shutdown")
 async def shutdown_db_client():
-    app.mongodb_client.close()
+    app.keyword_compaction_task.cancel()
+    await stop_review_queue()  # 先写完队列中的评论，再停止模型服务
+    await stop_sentiment_service()
     await close_mongo_connection()
+    shutdown_segmentation()
+    shutdown_word_cloud()
 
 # 包含路由
 app.include_router(users.router, prefix="/api/users", tags=["users"])
@@ -21,5 +21,15 @@ class Movie(BaseModel):
     img: Image
     source: str
 
+class MovieSummary(BaseModel):
+    # 列表接口使用：海报只返回图片地址，不内嵌图片内容
+    movie_id: int
+    title: str
+    genre: str
+    description: str
+    url_film: str
+    img_url: str
+    source: str
+
 class MovieDetail(Movie):
     reviews: List[Review]
\ No newline at end of file
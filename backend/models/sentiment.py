@@ -0,0 +1,13 @@
+from pydantic import BaseModel, Field, constr
+from typing import Dict, List
+from config import SENTIMENT_REQUEST_MAX_TEXTS, SENTIMENT_REQUEST_MAX_CHARS
+
+class SentimentRequest(BaseModel):
+    texts: List[constr(max_length=SENTIMENT_REQUEST_MAX_CHARS)] = Field(
+        ..., min_length=1, max_length=SENTIMENT_REQUEST_MAX_TEXTS
+    )
+
+class SentimentResult(BaseModel):
+    label: str
+    confidence: float
+    probabilities: Dict[str, float]
@@ -1,57 +1,99 @@
-from fastapi import APIRouter, Request, Depends
-from typing import List
-import jieba
+from fastapi import APIRouter, Request, Depends, HTTPException, Query, Response
+from typing import List, Optional
 from collections import Counter
 from datetime import datetime, timedelta
 from utils.auth import get_current_user
 from models.user import User
-import random
+from models.sentiment import SentimentRequest, SentimentResult
+from utils.sentiment import is_sentiment_available, classify_texts, get_sentiment_cache_stats
+from utils.segmentation import movie_word_counts
+from utils.movie_reviews import MOVIE_REVIEWS, get_movie_review_contents
+from utils.review_stats import get_sentiment_trend as read_sentiment_trend
+from utils.word_cloud import resolve_font, reviews_version, word_cloud_etag, get_word_cloud_png
+from config import WORD_CLOUD_CACHE_MAX_AGE
 from jieba import analyse
 
 router = APIRouter()
 
+def require_sentiment_model():
+    if not is_sentiment_available():
+        raise HTTPException(status_code=503, detail="情感分析模型未加载")
+
+@router.post("/sentiment", response_model=List[SentimentResult])
+async def analyze_sentiment(payload: SentimentRequest, current_user: User = Depends(get_current_user)):
+    # 并发请求的文本会在后台被合并成微批次推理，重复文本直接命中缓存
+    require_sentiment_model()
+    return await classify_texts(payload.texts)
+
+@router.get("/sentiment-cache/stats")
+async def get_sentiment_cache_status(current_user: User = Depends(get_current_user)):
+    require_sentiment_model()
+    return get_sentiment_cache_stats()
+
 @router.get("/sentiment/{movie_id}")
 async def get_movie_sentiment(movie_id: int, request: Request):
-    movie = await request.app.mongodb["movies"].find_one({"movie_id": movie_id})
+    movie = await request.app.mongodb["movies"].find_one({"movie_id": movie_id}, {"_id": 1})
     if not movie:
         return {"error": "Movie not found"}
     
-    reviews = movie.get("reviews", [])
-    # 这里可以接入情感分析模型
-    # 示例返回格式
+    reviews = await get_movie_review_contents(request.app.mongodb, movie_id)
+    require_sentiment_model()
+    results = await classify_texts([r["content"] for r in reviews])
+    counts = Counter(result["label"] for result in results)
     return {
-        "positive": len([r for r in reviews if len(r["content"]) > 20]),
-        "neutral": len([r for r in reviews if 10 <= len(r["content"]) <= 20]),
-        "negative": len([r for r in reviews if len(r["content"]) < 10])
+        "positive": counts["positive"],
+        "neutral": counts["neutral"],
+        "negative": counts["negative"]
     }
 
+@router.get("/word-cloud/{movie_id}.png")
+async def get_word_cloud_image(
+    movie_id: int,
+    request: Request,
+    width: int = Query(800, ge=100, le=2000),
+    height: int = Query(400, ge=100, le=2000),
+    max_words: int = Query(100, ge=10, le=500)
+):
+    # 需在 /word-cloud/{movie_id} 之前注册，否则 "1.png" 会匹配到返回词频的接口
+    movie = await request.app.mongodb["movies"].find_one(
+        {"movie_id": movie_id}, {"movie_id": 1, "reviews_version": 1, "review_count": 1}
+    )
+    if not movie:
+        raise HTTPException(status_code=404, detail="Movie not found")
+    font_path = resolve_font()
+    if font_path is None:
+        raise HTTPException(status_code=503, detail="未找到中文字体，请配置 WORD_CLOUD_FONT_PATH")
+
+    # ETag 由评论版本和渲染参数决定，协商缓存命中时不读取图片
+    etag = f'"{word_cloud_etag(movie_id, reviews_version(movie), font_path, width, height, max_words)}"'
+    headers = {"ETag": etag, "Cache-Control": f"public, max-age={WORD_CLOUD_CACHE_MAX_AGE}"}
+    if etag in request.headers.get("if-none-match", ""):
+        return Response(status_code=304, headers=headers)
+
+    data, _ = await get_word_cloud_png(request.app.mongodb, movie, font_path, width, height, max_words)
+    if data is None:
+        raise HTTPException(status_code=404, detail="该电影暂无评论")
+    return Response(content=data, media_type="image/png", headers=headers)
+
 @router.get("/word-cloud/{movie_id}")
 async def get_word_cloud(movie_id: int, request: Request):
-    movie = await request.app.mongodb["movies"].find_one({"movie_id": movie_id})
+    movie = await request.app.mongodb["movies"].find_one({"movie_id": movie_id}, {"reviews_version": 1, "review_count": 1})
     if not movie:
         return {"error": "Movie not found"}
     
-    reviews = movie.get("reviews", [])
-    words = []
-    for review in reviews:
-        words.extend(jieba.cut(review["content"]))
-    
-    word_count = Counter(words)
+    reviews = await get_movie_review_contents(request.app.mongodb, movie_id)
+    # 分词在进程池中完成，结果按评论和电影缓存
+    word_count = await movie_word_counts(movie_id, reviews, reviews_version(movie))
     return [{"word": word, "count": count} for word, count in word_count.most_common(50)]
 
 @router.get("/sentiment-trend")
-async def get_sentiment_trend(request: Request):
-    # 获取最近7天的情感分析趋势
-    dates = [(datetime.now() - timedelta(days=i)).strftime("%Y-%m-%d") for i in range(7)]
-    dates.reverse()
-    
-    # 示例数据
-    return {
-        "dates": dates,
-        "positive": [random.randint(50, 100) for _ in range(7)],
-        "neutral": [random.randint(30, 70) for _ in range(7)],
-        "negative": [random.randint(10, 40) for _ in range(7)]
-    }
+async def get_sentiment_trend(
+    request: Request,
+    days: int = Query(7, ge=1, le=366),
+    movie_id: Optional[int] = None
+):
+    # 最近 days 天的情感趋势：读取按天汇总文档（每天一条），不扫描评论集合；指定 movie_id 时只统计该电影
+    return await read_sentiment_trend(request.app.mongodb, days, movie_id)
 
 @router.get("/user-activity-trend")
 async def get_user_activity_trend(request: Request):
@@ -60,21 +102,21 @@ async def get_user_activity_trend(request: Request):
     dates.reverse()
     
     pipeline = [
-        {
-            "$unwind": "$reviews"
-        },
         {
             "$group": {
-                "_id": "$reviews.uname",
+                "_id": "$uname",
                 "review_count": {"$sum": 1}
             }
         },
         {
             "$sort": {"review_count": -1}
+        },
+        {
+            "$limit": 7
         }
     ]
     
-    user_activity = await request.app.mongodb["movies"].aggregate(pipeline).to_list(length=None)
+    user_activity = await request.app.mongodb[MOVIE_REVIEWS].aggregate(pipeline).to_list(length=None)
     counts = [activity["review_count"] for activity in user_activity[:7]]
     
     return {
@@ -84,54 +126,61 @@ async def get_user_activity_trend(request: Request):
 
 @router.get("/comment-length-distribution")
 async def get_comment_length_distribution(request: Request):
+    # 在数据库端完成分档计数，不再把所有评论长度取回 Python
+    length = {"$strLenCP": {"$ifNull": ["$content", ""]}}
     pipeline = [
         {
-            "$unwind": "$reviews"
-        },
-        {
-            "$project": {
-                "content_length": {"$strLenCP": "$reviews.content"}
+            "$group": {
+                "_id": None,
+                "short": {"$sum": {"$cond": [{"$lt": [length, 50]}, 1, 0]}},
+                "medium": {"$sum": {"$cond": [{"$and": [{"$gte": [length, 50]}, {"$lte": [length, 200]}]}, 1, 0]}},
+                "long": {"$sum": {"$cond": [{"$gt": [length, 200]}, 1, 0]}}
             }
         }
     ]
     
-    comments = await request.app.mongodb["movies"].aggregate(pipeline).to_list(length=None)
-    
-    short = len([c for c in comments if c["content_length"] < 50])
-    medium = len([c for c in comments if 50 <= c["content_length"] <= 200])
-    long = len([c for c in comments if c["content_length"] > 200])
+    result = await request.app.mongodb[MOVIE_REVIEWS].aggregate(pipeline).to_list(length=None)
+    counts = result[0] if result else {}
     
     return {
-        "short": short,
-        "medium": medium,
-        "long": long
+        "short": counts.get("short", 0),
+        "medium": counts.get("medium", 0),
+        "long": counts.get("long", 0)
     }
 
 @router.get("/movie-rating-distribution")
 async def get_movie_rating_distribution(request: Request):
-    # 示例数据 - 实际应用中需要从数据库获取
-    return {
-        "ratings": [
-            random.randint(10, 50),  # 1分
-            random.randint(20, 60),  # 2分
-            random.randint(40, 80),  # 3分
-            random.randint(60, 100), # 4分
-            random.randint(80, 120)  # 5分
-        ]
-    }
+    # 按电影评分取整分档计数（1-5 分），与 /api/analytics/movies 的评分分布口径一致
+    pipeline = [
+        {"$match": {"rating": {"$gte": 1, "$lte": 5}}},
+        {"$group": {"_id": {"$floor": "$rating"}, "count": {"$sum": 1}}}
+    ]
+    results = await request.app.mongodb["movies"].aggregate(pipeline).to_list(length=None)
+    ratings = [0] * 5
+    for result in results:
+        ratings[int(result["_id"]) - 1] += result["count"]
+    return {"ratings": ratings}
 
 @router.get("/user-activity")
 async def get_user_activity(request: Request):
     pipeline = [
-        {"$unwind": "$reviews"},
         {"$group": {
-            "_id": "$reviews.uname",
+            "_id": "$uname",
             "review_count": {"$sum": 1},
-            "movies": {"$addToSet": "$title"}
+            "movie_ids": {"$addToSet": "$movie_id"}
         }},
         {"$sort": {"review_count": -1}},
-        {"$limit": 10}
+        {"$limit": 10},
+        # 只为前 10 名用户关联电影标题
+        {"$lookup": {
+            "from": "movies",
+            "localField": "movie_ids",
+            "foreignField": "movie_id",
+            "pipeline": [{"$project": {"_id": 0, "title": 1}}],
+            "as": "movies"
+        }},
+        {"$project": {"review_count": 1, "movies": "$movies.title"}}
     ]
     
-    user_activity = await request.app.mongodb["movies"].aggregate(pipeline).to_list(length=None)
+    user_activity = await request.app.mongodb[MOVIE_REVIEWS].aggregate(pipeline).to_list(length=None)
     return user_activity
@@ -2,11 +2,15 @@ from fastapi import APIRouter, Depends, HTTPException, Request
 from datetime import datetime, timedelta
 from typing import List, Dict, Any
 from collections import Counter
-import jieba.analyse as analyse
 from database.database import get_database
-from utils.auth import get_current_user
+from utils.keyword_stats import get_top_keywords
+from config import KEYWORD_TOP_K
+from utils.auth import get_current_user, get_current_admin
+from database.indexes import advise_indexes
+from utils.movie_reviews import MOVIE_REVIEWS
+from utils.genres import get_genre_counts
+from utils.review_stats import get_sentiment_totals, get_sentiment_trend
 from models.user import User
-import random
 
 router = APIRouter()
 
@@ -19,95 +23,18 @@ async def get_review_analytics(
     if not current_user.is_admin:
         raise HTTPException(status_code=403, detail="需要管理员权限")
     
-    # 1. 情感分布统计
-    pipeline = [
-        {
-            "$group": {
-                "_id": "$sentiment",
-                "count": {"$sum": 1}
-            }
-        }
-    ]
-    
-    sentiment_results = await request.app.mongodb["reviews"].aggregate(pipeline).to_list(length=None)
-    sentiment_distribution = {
-        "positive": 0,
-        "neutral": 0,
-        "negative": 0
-    }
-    for result in sentiment_results:
-        if result["_id"] in sentiment_distribution:
-            sentiment_distribution[result["_id"]] = result["count"]
-    
-    sentiment_distribution["positive"] = 94125
-    sentiment_distribution["neutral"] = 36242
-    sentiment_distribution["negative"] = 29425
+    # 1. 情感分布统计：读取按天汇总中的累计文档
+    sentiment_distribution = await get_sentiment_totals(request.app.mongodb)
 
-    # 2. 评论数量趋势（最近30天）
-    pipeline = [
-        {"$match": {"created_at": {"$exists": True}}},  # 添加存在性过滤
-        {
-            "$addFields": {
-                "converted_date": {"$toDate": "$created_at"}  # 强制类型转换
-            }
-        },
-        {
-            "$group": {
-                "_id": {
-                    "$dateToString": {
-                        "format": "%Y-%m-%d",
-                        "date": "$converted_date"
-                    }
-                },
-                "count": {"$sum": 1},
-                "min_date": {"$min": "$converted_date"},
-                "max_date": {"$max": "$converted_date"}
-            }
-        },
-        {"$sort": {"_id": 1}}
-    ]
-    
-    trend_results = await request.app.mongodb["reviews"].aggregate(pipeline).to_list(length=None)
-    
-    # 动态生成日期范围
-    dates = [(datetime.now() - timedelta(days=i)).strftime("%Y-%m-%d") for i in range(30, -1, -1)]
-    
-    # 重建计数字典（按实际日期格式）
-    date_counts = {
-        result["_id"]: result["count"] 
-        for result in trend_results 
-        if len(result["_id"]) == 10  # 确保是日期格式
-    }
-    
-    # 按固定30天范围填充计数
-    counts = [date_counts.get(date, 0) for date in dates]
-    if sum(counts) == 0:  # 如果没有数据，填充默认值
-        counts = [
-        date_counts.get(date, random.randint(1, 5))  # 添加随机默认值（1-5之间）
-        for date in dates
-    ]
-    
+    # 2. 评论数量趋势（最近30天）：每天一条汇总文档，读取量与评论总数无关
+    trend = await get_sentiment_trend(request.app.mongodb, 31)
     review_trend = {
-        "dates": dates,
-        "counts": counts
+        "dates": trend["dates"],
+        "counts": trend["reviews"]
     }
     
-    # 3. 热门关键词提取（分批处理）
-    pipeline = [
-        {"$project": {"content": 1}},
-        {"$limit": 10000}  # 扩大处理上限
-    ]
-    
-    content_results = await request.app.mongodb["reviews"].aggregate(pipeline).to_list(None)
-    if content_results:
-        all_content = " ".join(doc["content"] for doc in content_results)
-        keywords = analyse.extract_tags(all_content, topK=50, withWeight=True)
-        keywords_data = [
-            {"word": word, "weight": round(weight * 100, 2)}
-            for word, weight in keywords
-        ]
-    else:
-        keywords_data = []
+    # 3. 热门关键词：读取后台维护的全量 TF-IDF 快照
+    keywords_data = await get_top_keywords(request.app.mongodb, KEYWORD_TOP_K)
     
     return {
         "sentimentDistribution": sentiment_distribution,
@@ -140,20 +67,8 @@ async def get_movie_analytics(request: Request, current_user: User = Depends(get
         if result["_id"] and 1 <= result["_id"] <= 5:
             rating_data["counts"][int(result["_id"]) - 1] = result["count"]
 
-    # 2. 类型分布
-    pipeline = [
-        {"$unwind": "$genre"},
-        {
-            "$group": {
-                "_id": "$genre",
-                "count": {"$sum": 1}
-            }
-        },
-        {"$sort": {"count": -1}},
-        {"$limit": 10}
-    ]
-    
-    genre_results = await request.app.mongodb["movies"].aggregate(pipeline).to_list(length=None)
+    # 2. 类型分布（读取类型统计文档）
+    genre_results = await get_genre_counts(request.app.mongodb, 10)
     genre_data = {
         "genres": [result["_id"] for result in genre_results],
         "counts": [result["count"] for result in genre_results]
@@ -219,10 +134,9 @@ async def get_user_analytics(request: Request, current_user: User = Depends(get_
     thirty_days_ago = today - timedelta(days=30)
     
     pipeline = [
-        {"$unwind": "$reviews"},
         {
             "$match": {
-                "reviews.created_at": {
+                "created_at": {
                     "$gte": thirty_days_ago
                 }
             }
@@ -233,10 +147,10 @@ async def get_user_analytics(request: Request, current_user: User = Depends(get_
                     "date": {
                         "$dateToString": {
                             "format": "%Y-%m-%d",
-                            "date": "$reviews.created_at"
+                            "date": "$created_at"
                         }
                     },
-                    "user": "$reviews.uname"
+                    "user": "$uname"
                 }
             }
         },
@@ -249,7 +163,7 @@ async def get_user_analytics(request: Request, current_user: User = Depends(get_
         {"$sort": {"_id": 1}}
     ]
     
-    activity_results = await request.app.mongodb["movies"].aggregate(pipeline).to_list(length=None)
+    activity_results = await request.app.mongodb[MOVIE_REVIEWS].aggregate(pipeline).to_list(length=None)
     
     # 填充缺失的日期
     date_counts = {result["_id"]: result["active_users"] for result in activity_results}
@@ -311,16 +225,13 @@ async def get_user_analytics(request: Request, current_user: User = Depends(get_
     }
 
     # 3. 用户行为分析
-    review_count = await request.app.mongodb["movies"].aggregate([
-        {"$unwind": "$reviews"},
-        {"$count": "total"}
-    ]).to_list(length=None)
+    review_count = await request.app.mongodb[MOVIE_REVIEWS].estimated_document_count()
     
     user_count = await request.app.mongodb["users"].count_documents({})
     favorite_count = await request.app.mongodb["users"].count_documents({"favorites": {"$exists": True, "$ne": []}})
     
     user_behaviors = {
-        "reviews": review_count[0]["total"] if review_count else 0,
+        "reviews": review_count,
         "favorites": favorite_count,
         "totalUsers": user_count
     }
@@ -329,4 +240,9 @@ async def get_user_analytics(request: Request, current_user: User = Depends(get_
         "activityData": activity_data,
         "registrationTrend": registration_trend,
         "userBehaviors": user_behaviors
-    }
\ No newline at end of file
+    }
+
+@router.get("/index-advisor")
+async def get_index_advice(request: Request, current_user: User = Depends(get_current_admin)):
+    """对已登记的查询形态执行 explain，返回使用的索引以及全表扫描、内存排序等问题"""
+    return await advise_indexes(request.app.mongodb)
@@ -1,13 +1,18 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Response
+from typing import List, Optional
 from datetime import datetime
+from pymongo.errors import DuplicateKeyError
 from models.user import User
 from utils.auth import get_current_user
 from database.database import get_database
+from utils.pagination import keyset_filter, paginate, set_next_cursor
+from utils.images import image_url
 import uuid
 
 router = APIRouter()
 
+FAVORITE_SORT = [("created_at", -1), ("_id", -1)]
+
 @router.post("/{movie_id}", status_code=status.HTTP_201_CREATED)
 async def add_favorite(
     movie_id: int,
@@ -31,17 +36,30 @@ async def add_favorite(
         "created_at": datetime.utcnow()
     }
     
-    await db.favorites.insert_one(favorite)
+    try:
+        await db.favorites.insert_one(favorite)
+    except DuplicateKeyError:
+        # (user_id, movie_id) 唯一索引兜底并发重复收藏
+        raise HTTPException(status_code=400, detail="已经收藏过这部电影")
     return favorite
 
 @router.get("/", response_model=List[dict])
-async def get_my_favorites(current_user: User = Depends(get_current_user)):
+async def get_my_favorites(
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=200),
+    current_user: User = Depends(get_current_user)
+):
     db = get_database()
-    # 获取用户的收藏电影列表
-    favorites = await db.favorites.find({"user_id": str(current_user.user_id)}).sort("created_at", -1).to_list(None)
+    # 获取用户的收藏电影列表（按 (user_id, created_at, _id) 索引游标分页）
+    query = {"user_id": str(current_user.user_id), **keyset_filter(cursor, FAVORITE_SORT)}
+    favorites = await db.favorites.find(query).sort(FAVORITE_SORT).limit(limit + 1).to_list(limit + 1)
+    favorites, next_cursor = paginate(favorites, limit, FAVORITE_SORT)
+    set_next_cursor(response, next_cursor)
     # 获取收藏电影的详细信息
     movie_ids = [fav["movie_id"] for fav in favorites]
-    movies = await db.movies.find({"movie_id": {"$in": movie_ids}}).to_list(None)
+    # 不读取海报内容和内嵌评论，海报通过图片接口单独获取
+    movies = await db.movies.find({"movie_id": {"$in": movie_ids}}, {"img": 0, "reviews": 0}).to_list(None)
     # 将收藏时间添加到电影信息中
     movie_dict = {movie["movie_id"]: movie for movie in movies}
     result = []
@@ -51,7 +69,8 @@ async def get_my_favorites(current_user: User = Depends(get_current_user)):
             movie_info.update({
                 "favorite_id": str(fav["_id"]),  # 转换 ObjectId 为字符串
                 "favorited_at": fav["created_at"],
-                "_id": str(movie_info["_id"])    # 转换电影文档的 ObjectId
+                "_id": str(movie_info["_id"]),   # 转换电影文档的 ObjectId
+                "img_url": image_url(movie_info["movie_id"], "thumb", movie_info.pop("img_version", None))
             })
             result.append(movie_info)
     
@@ -1,13 +1,39 @@
-from fastapi import APIRouter, Request, HTTPException
-from typing import List
-from models.movie import Movie, MovieDetail
+from fastapi import APIRouter, Request, HTTPException, Query, Response
+from typing import List, Optional, Literal
+from models.movie import MovieDetail, MovieSummary, Review
 from bson import ObjectId
+from utils.pagination import keyset_filter, paginate, set_next_cursor
+from utils.images import image_url, get_movie_image
+from utils.movie_reviews import get_movie_review_page
+from utils.genres import get_genre_counts
+from config import IMAGE_CACHE_MAX_AGE
 
 router = APIRouter()
 
-@router.get("/", response_model=List[Movie])
-async def get_movies(request: Request, skip: int = 0, limit: int = 1):
+MOVIE_SORT = [("movie_id", 1)]
+
+@router.get("/", response_model=List[MovieSummary])
+async def get_movies(
+    request: Request,
+    response: Response,
+    skip: int = 0,
+    limit: int = Query(1, ge=1, le=200),
+    cursor: Optional[str] = None,
+    genre: Optional[str] = None
+):
+    # 按 movie_id 索引游标分页；未传 cursor 时仍支持 skip 跳页
+    # 按类型筛选时使用 (genres, movie_id) 多键索引
+    match = keyset_filter(cursor, MOVIE_SORT)
+    if genre:
+        match["genres"] = genre
     pipeline = [
+        {"$match": match},
+        {"$sort": dict(MOVIE_SORT)},
+    ]
+    if skip and not cursor:
+        pipeline.append({"$skip": skip})
+    pipeline += [
+        {"$limit": limit + 1},
         {"$project": {
             "_id": 0,
             "movie_id": 1,
@@ -15,34 +41,68 @@ async def get_movies(request: Request, skip: int = 0, limit: int = 1):
             "genre": 1,
             "description": 1,
             "url_film": 1,
-            "img": 1,
+            "img_version": 1,
             "source": 1 
-        }},
-        {"$skip": skip},
-        {"$limit": limit}
+        }}
     ]
-    movies = await request.app.mongodb["movies"].aggregate(pipeline).to_list(length=limit)
+    movies = await request.app.mongodb["movies"].aggregate(pipeline).to_list(length=limit + 1)
+    movies, next_cursor = paginate(movies, limit, MOVIE_SORT)
+    set_next_cursor(response, next_cursor)
+    for movie in movies:
+        movie["img_url"] = image_url(movie["movie_id"], "thumb", movie.pop("img_version", None))
     return movies
 
 @router.get("/{movie_id}", response_model=MovieDetail)
-async def get_movie(movie_id: int, request: Request):
+async def get_movie(
+    movie_id: int,
+    request: Request,
+    response: Response,
+    review_limit: int = Query(20, ge=1, le=200)
+):
+    # 评论存放在 movie_reviews 集合，这里只返回第一页，后续页通过 /{movie_id}/reviews 按游标读取
     movie = await request.app.mongodb["movies"].find_one({
         "movie_id": movie_id
-    })
+    }, {"reviews": 0})
     if movie is None:
         raise HTTPException(status_code=404, detail="Movie not found")
-    # # 转换_id字段为字符串（BSON ObjectId需要序列化）
-    # if '_id' in movie:
-    #     movie['_id'] = str(movie['_id'])
+    movie["reviews"], next_cursor = await get_movie_review_page(request.app.mongodb, movie_id, None, review_limit)
+    set_next_cursor(response, next_cursor)
     return movie
 
+@router.get("/{movie_id}/reviews", response_model=List[Review])
+async def get_movie_dataset_reviews(
+    movie_id: int,
+    request: Request,
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=200)
+):
+    reviews, next_cursor = await get_movie_review_page(request.app.mongodb, movie_id, cursor, limit)
+    set_next_cursor(response, next_cursor)
+    return reviews
+
+@router.get("/{movie_id}/image")
+async def get_movie_poster(
+    movie_id: int,
+    request: Request,
+    size: Literal["thumb", "full"] = "thumb",
+    v: Optional[str] = None
+):
+    image = await get_movie_image(request.app.mongodb, movie_id, size)
+    if image is None:
+        raise HTTPException(status_code=404, detail="Image not found")
+    data, content_type, etag, version = image
+    # 地址中的版本号与当前一致时内容不会再变化，允许长期缓存
+    if v == version:
+        cache_control = f"public, max-age={IMAGE_CACHE_MAX_AGE}, immutable"
+    else:
+        cache_control = "public, max-age=3600"
+    headers = {"ETag": etag, "Cache-Control": cache_control}
+    if etag in request.headers.get("if-none-match", ""):
+        return Response(status_code=304, headers=headers)
+    return Response(content=data, media_type=content_type, headers=headers)
+
 @router.get("/genres/stats")
 async def get_genre_stats(request: Request):
-    pipeline = [
-        {"$addFields": {"genre": {"$split": ["$genre", ";"]}}},
-        {"$unwind": "$genre"},
-        {"$group": {"_id": "$genre", "count": {"$sum": 1}}},
-        {"$sort": {"count": -1}}
-    ]
-    genres = await request.app.mongodb["movies"].aggregate(pipeline).to_list(length=None)
-    return genres 
\ No newline at end of file
+    # 读取写入时维护的类型统计文档，不再每次扫描全部电影
+    return await get_genre_counts(request.app.mongodb)
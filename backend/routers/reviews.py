@@ -1,39 +1,75 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Response
 from typing import List, Optional
 from datetime import datetime
 from bson import ObjectId
 from models.user import User
 from utils.auth import get_current_user
 from database.database import get_database
+from utils.keyword_stats import record_review
+from utils.review_stats import record_review_stats
+from utils.review_queue import get_review_queue, ReviewQueueFull, STATUS_PENDING, STATUS_SCORED, STATUS_FAILED
+from utils.pagination import keyset_filter, paginate, set_next_cursor, estimated_count
+from utils.images import image_url
 import uuid
 
 router = APIRouter()
 
-@router.post("/", status_code=status.HTTP_201_CREATED)
+# 评论列表统一按 (created_at, _id) 倒序做游标分页
+REVIEW_SORT = [("created_at", -1), ("_id", -1)]
+
+@router.post("/", status_code=status.HTTP_202_ACCEPTED)
 async def create_review(
     movie_id: int,
     content: str,
-    sentiment: str,
+    sentiment: Optional[str] = None,  # 已弃用：情感标签由服务端模型给出，客户端传入的值被忽略
     current_user: User = Depends(get_current_user)
 ):
-    db = get_database()
+    queue = get_review_queue()
+    if queue is None:
+        raise HTTPException(status_code=503, detail="评论服务未就绪")
     review = {
         "_id": str(uuid.uuid4()),
         "user_id": str(current_user.user_id),
         "movie_id": movie_id,
         "content": content,
-        "sentiment": sentiment,
+        "sentiment": None,
         "created_at": datetime.utcnow(),
         "username": current_user.username  # 添加用户名方便前端显示
     }
     
-    await db.reviews.insert_one(review)
-    return review
+    # 只入队并立即返回，后台批量打分后写入数据库
+    try:
+        queue.submit(review)
+    except ReviewQueueFull:
+        raise HTTPException(status_code=503, detail="评论提交繁忙，请稍后重试", headers={"Retry-After": "1"})
+    return {**review, "status": STATUS_PENDING}
+
+@router.get("/{review_id}/status")
+async def get_review_status(review_id: str, current_user: User = Depends(get_current_user)):
+    queue = get_review_queue()
+    if queue is not None and review_id in queue.pending:
+        return {"_id": review_id, "status": STATUS_PENDING, "sentiment": None}
+    if queue is not None and review_id in queue.failed:
+        return {"_id": review_id, "status": STATUS_FAILED, "sentiment": queue.failed[review_id].get("sentiment")}
+    db = get_database()
+    review = await db.reviews.find_one({"_id": review_id}, {"status": 1, "sentiment": 1})
+    if not review:
+        raise HTTPException(status_code=404, detail="评论不存在")
+    return {"_id": review_id, "status": review.get("status", STATUS_SCORED), "sentiment": review.get("sentiment")}
 
 @router.get("/movie/{movie_id}", response_model=List[dict])
-async def get_movie_reviews(movie_id: int):
+async def get_movie_reviews(
+    movie_id: int,
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=200)
+):
     db = get_database()
-    reviews = await db.reviews.find({"movie_id": movie_id}).sort("created_at", -1).to_list(None)
+    # 使用 (movie_id, created_at, _id) 索引，翻页深度不影响查询耗时
+    query = {"movie_id": movie_id, **keyset_filter(cursor, REVIEW_SORT)}
+    reviews = await db.reviews.find(query).sort(REVIEW_SORT).limit(limit + 1).to_list(limit + 1)
+    reviews, next_cursor = paginate(reviews, limit, REVIEW_SORT)
+    set_next_cursor(response, next_cursor)
     return reviews
 
 @router.get("/user/me", response_model=List[dict])
@@ -45,6 +81,7 @@ async def get_my_reviews(current_user: User = Depends(get_current_user)):
             "from": "movies",
             "localField": "movie_id",
             "foreignField": "movie_id",
+            "pipeline": [{"$project": {"_id": 0, "title": 1, "img_version": 1}}],
             "as": "movie_info"
         }},
         {"$unwind": {"path": "$movie_info", "preserveNullAndEmptyArrays": True}},
@@ -56,12 +93,15 @@ async def get_my_reviews(current_user: User = Depends(get_current_user)):
             "created_at": 1,
             "movie_id": 1,
             "movie_title": "$movie_info.title",
-            "movie_img": "$movie_info.img.content",  # 添加电影图片字段
+            "img_version": "$movie_info.img_version",
             "username": 1
         }}
     ]
     
     reviews = await db.reviews.aggregate(pipeline).to_list(None)
+    for review in reviews:
+        # 电影海报只返回图片地址
+        review["movie_img_url"] = image_url(review["movie_id"], "thumb", review.pop("img_version", None))
     return reviews
 
 @router.delete("/{review_id}")
@@ -79,6 +119,8 @@ async def delete_review(
         raise HTTPException(status_code=403, detail="没有权限删除此评论")
     
     await db.reviews.delete_one({"_id": review_id})
+    await record_review(db, review.get("content", ""), sign=-1)
+    await record_review_stats(db, [review], sign=-1)
     return {"message": "评论已删除"} 
 
 # backend/routers/reviews.py 添加新接口
@@ -86,7 +128,8 @@ async def delete_review(
 @router.get("/all", response_model=dict)
 async def get_all_reviews(
     skip: int = 0, 
-    limit: int = 20,
+    limit: int = Query(20, ge=1, le=200),
+    cursor: Optional[str] = None,
     current_user: User = Depends(get_current_user)
 ):
     # 检查用户是否为管理员
@@ -97,19 +140,26 @@ async def get_all_reviews(
         )
     
     db = get_database()
-    # 获取评论总数
-    total = await db.reviews.count_documents({})
+    # 评论总数使用缓存的估算值，避免每页都做全量计数
+    total = await estimated_count(db.reviews)
     
-    # 聚合查询，关联电影信息
+    # 先按 (created_at, _id) 索引分页，再只对当前页关联电影信息
     pipeline = [
+        {"$match": keyset_filter(cursor, REVIEW_SORT)},
+        {"$sort": dict(REVIEW_SORT)},
+    ]
+    if skip and not cursor:
+        pipeline.append({"$skip": skip})  # 兼容按页码跳转的旧调用方式
+    pipeline += [
+        {"$limit": limit + 1},
         {"$lookup": {
             "from": "movies",
             "localField": "movie_id",
             "foreignField": "movie_id",
+            "pipeline": [{"$project": {"_id": 0, "title": 1}}],
             "as": "movie_info"
         }},
         {"$unwind": {"path": "$movie_info", "preserveNullAndEmptyArrays": True}},
-        {"$sort": {"created_at": -1}},
         {"$project": {
             "_id": 1,
             "user_id": 1,
@@ -119,19 +169,14 @@ async def get_all_reviews(
             "created_at": 1,
             "username": 1,
             "movie_title": "$movie_info.title"
-        }},
-        {
-            "$facet": {
-                "metadata": [{"$count": "total"}],
-                "data": [{"$skip": skip}, {"$limit": limit}]
-            }
-        },
-        {"$unwind": "$metadata"}
+        }}
     ]
     
     result = await db.reviews.aggregate(pipeline).to_list(None)
+    data, next_cursor = paginate(result, limit, REVIEW_SORT)
     
     return {
-        "total": result[0]["metadata"]["total"] if result else 0,
-        "data": result[0]["data"] if result else []
-    }
\ No newline at end of file
+        "total": total,
+        "data": data,
+        "next_cursor": next_cursor
+    }
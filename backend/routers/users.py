@@ -1,24 +1,33 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Request, UploadFile, File
+from fastapi import APIRouter, Depends, HTTPException, status, Request, UploadFile, File, Query, Response
 from fastapi.security import OAuth2PasswordRequestForm, OAuth2PasswordBearer
-from typing import List
+from typing import List, Optional
 from datetime import timedelta, datetime
 from models.user import UserCreate, User, Token, UserUpdate, PasswordUpdate
 from utils.auth import (
-    verify_password,
-    get_password_hash,
+    verify_password_async,
+    verify_and_update_password_async,
+    get_password_hash_async,
     create_access_token,
     get_current_user,
     get_current_admin,
+    invalidate_user_cache,
     ACCESS_TOKEN_EXPIRE_MINUTES
 )
 from models.user import Activity
 from database.database import get_database
+from utils.pagination import keyset_filter, paginate, set_next_cursor
 from bson import ObjectId
 import os
 import shutil
 
 router = APIRouter()
 
+USER_SORT = [("created_at", -1), ("_id", -1)]
+# 个人动态合并评论与收藏，同样按 (created_at, _id) 倒序
+ACTIVITY_SORT = [("created_at", -1), ("_id", -1)]
+# 动态关联的电影已被删除时显示的标题
+DELETED_MOVIE_TITLE = "电影已删除"
+
 @router.post("/register", response_model=User)
 async def register(user: UserCreate, request: Request = None):
     # 检查用户名是否已存在
@@ -30,13 +39,14 @@ async def register(user: UserCreate, request: Request = None):
     
     # 创建新用户
     user_dict = user.dict()
-    user_dict["password"] = get_password_hash(user.password)
+    user_dict["password"] = await get_password_hash_async(user.password)
     user_dict["_id"] = str(ObjectId())
     
     await request.app.mongodb["users"].insert_one(user_dict)
     
     return {
-        "id": user_dict["_id"],
+        "_id": user_dict["_id"],
+        "user_id": user.user_id,
         "username": user.username,
         "email": user.email,
         "is_admin": user.is_admin,
@@ -49,12 +59,18 @@ async def login(
     request: Request = None
 ):
     user = await request.app.mongodb["users"].find_one({"username": form_data.username})
-    if not user or not verify_password(form_data.password, user["password"]):
+    valid, new_hash = (False, None)
+    if user:
+        valid, new_hash = await verify_and_update_password_async(form_data.password, user["password"])
+    if not valid:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
+    if new_hash:
+        # BCRYPT_ROUNDS 调整后，旧密码在登录成功时按新代价重新哈希
+        await request.app.mongodb["users"].update_one({"_id": user["_id"]}, {"$set": {"password": new_hash}})
     
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
@@ -66,10 +82,16 @@ async def login(
 
 @router.get("/users", response_model=list[User])
 async def get_users(
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=200),
     current_user: User = Depends(get_current_admin),
     request: Request = None
 ):
-    raw_users = await request.app.mongodb["users"].find().to_list(length=None)
+    query = keyset_filter(cursor, USER_SORT)
+    raw_users = await request.app.mongodb["users"].find(query).sort(USER_SORT).limit(limit + 1).to_list(limit + 1)
+    raw_users, next_cursor = paginate(raw_users, limit, USER_SORT)
+    set_next_cursor(response, next_cursor)
     users = []
     for user in raw_users:
         user["_id"] = str(user["_id"])  # 转换ObjectId为字符串
@@ -92,6 +114,7 @@ async def update_profile(
         {"_id": current_user.user_id},  # 直接使用当前用户ID
         {"$set": user_update.dict(exclude_unset=True)}
     )
+    invalidate_user_cache(current_user.username)
     return {"message": "Profile updated successfully"}
 
 # 修改密码
@@ -101,14 +124,16 @@ async def change_password(
     current_user: User = Depends(get_current_user)  # 替换token参数
 ):
     db = get_database()
-    # 直接使用内存中的当前用户对象验证密码
-    if not verify_password(password_update.currentPassword, current_user.password):
+    # 缓存中的用户对象不含密码哈希，从数据库读取后再验证
+    stored = await db.users.find_one({"username": current_user.username}, {"password": 1})
+    if not stored or not await verify_password_async(password_update.currentPassword, stored["password"]):
         raise HTTPException(400, "Current password is incorrect")
     
     await db.users.update_one(
         {"_id": current_user.user_id},
-        {"$set": {"password": get_password_hash(password_update.newPassword)}}
+        {"$set": {"password": await get_password_hash_async(password_update.newPassword)}}
     )
+    invalidate_user_cache(current_user.username)
     return {"message": "Password changed successfully"}
 
 # 上传头像
@@ -138,42 +163,57 @@ async def upload_avatar(
         {"_id": current_user.user_id},
         {"$set": {"avatar": avatar_url}}
     )
+    invalidate_user_cache(current_user.username)
     
     return {"url": avatar_url}
 
 # 获取用户动态
 @router.get("/activities", response_model=List[Activity])
-async def get_user_activities(current_user: User = Depends(get_current_user)):
+async def get_user_activities(
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=200),
+    current_user: User = Depends(get_current_user)
+):
     db = get_database()
-    activities = []
-    
-    # 获取评论
-    reviews = await db.reviews.find({"user_id": str(current_user.user_id)}).to_list(None)
-    for review in reviews:
-        movie = await db.movies.find_one({"_id": review["movie_id"]})
-        if movie:
-            activities.append({
-                "type": "review",
-                "movie_id": str(movie["_id"]),
-                "movie_title": movie["title"],
-                "content": review["content"],
-                "sentiment": review["sentiment"],
-                "created_at": review["created_at"]
-            })
-    
-    # 获取收藏
-    favorites = await db.favorites.find({"user_id": str(current_user.user_id)}).to_list(None)
-    for favorite in favorites:
-        movie = await db.movies.find_one({"_id": favorite["movie_id"]})
-        if movie:
-            activities.append({
-                "type": "favorite",
-                "movie_id": str(movie["_id"]),
-                "movie_title": movie["title"],
-                "created_at": favorite["created_at"]
-            })
-    
-    # 按时间排序，最新的在前面
-    activities.sort(key=lambda x: x["created_at"], reverse=True)
-    
-    return activities 
\ No newline at end of file
+    user_id = str(current_user.user_id)
+    # 评论和收藏各自走 (user_id, created_at, _id) 索引只取一页，合并排序后再一次性关联电影标题
+    match = {"user_id": user_id, **keyset_filter(cursor, ACTIVITY_SORT)}
+    sort = dict(ACTIVITY_SORT)
+    pipeline = [
+        {"$match": match},
+        {"$sort": sort},
+        {"$limit": limit + 1},
+        {"$project": {"type": "review", "movie_id": 1, "content": 1, "sentiment": 1, "created_at": 1}},
+        {"$unionWith": {"coll": "favorites", "pipeline": [
+            {"$match": match},
+            {"$sort": sort},
+            {"$limit": limit + 1},
+            {"$project": {"type": "favorite", "movie_id": 1, "created_at": 1}},
+        ]}},
+        {"$sort": sort},
+        {"$limit": limit + 1},
+        {"$lookup": {
+            "from": "movies",
+            "localField": "movie_id",
+            "foreignField": "movie_id",
+            "pipeline": [{"$project": {"_id": 0, "title": 1}}],
+            "as": "movie"
+        }},
+    ]
+    activities = await db.reviews.aggregate(pipeline).to_list(None)
+    activities, next_cursor = paginate(activities, limit, ACTIVITY_SORT)
+    set_next_cursor(response, next_cursor)
+
+    # 电影已被删除的动态保留并显示占位标题，保证每页条数与游标一致
+    return [
+        {
+            "type": activity["type"],
+            "movie_id": activity["movie_id"],
+            "movie_title": activity["movie"][0]["title"] if activity["movie"] else DELETED_MOVIE_TITLE,
+            "content": activity.get("content"),
+            "sentiment": activity.get("sentiment"),
+            "created_at": activity["created_at"]
+        }
+        for activity in activities
+    ]
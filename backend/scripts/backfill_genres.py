@@ -0,0 +1,27 @@
+import asyncio
+from motor.motor_asyncio import AsyncIOMotorClient
+import sys
+import os
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import MONGODB_URL, DB_NAME
+from database.indexes import ensure_indexes
+from utils.genres import backfill_genres, get_genre_counts
+
+async def main():
+    client = AsyncIOMotorClient(MONGODB_URL)
+    db = client[DB_NAME]
+    print("为已有电影补齐 genres 字段...")
+    updated = await backfill_genres(db)
+    print(f"共更新 {updated} 部电影")
+    await ensure_indexes(db)
+    genres = await get_genre_counts(db)
+    print(f"类型统计：共 {len(genres)} 个类型")
+    for genre in genres[:10]:
+        print(f"  {genre['_id']}: {genre['count']}")
+    client.close()
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,25 @@
+import asyncio
+from motor.motor_asyncio import AsyncIOMotorClient
+import sys
+import os
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import MONGODB_URL, DB_NAME
+from database.indexes import ensure_indexes
+from utils.review_stats import rebuild_review_stats, get_sentiment_totals
+
+async def main():
+    client = AsyncIOMotorClient(MONGODB_URL)
+    db = client[DB_NAME]
+    print("从 reviews 集合重建评论按天统计（请在没有评论写入时执行）...")
+    count = await rebuild_review_stats(db)
+    print(f"共生成 {count} 条电影每日统计")
+    await ensure_indexes(db)
+    totals = await get_sentiment_totals(db)
+    print(f"情感累计：positive {totals['positive']}，neutral {totals['neutral']}，negative {totals['negative']}")
+    client.close()
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,393 @@
+import argparse
+import asyncio
+import base64
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+import uuid
+from collections import Counter
+from datetime import datetime, timedelta
+
+import numpy as np
+from motor.motor_asyncio import AsyncIOMotorClient
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import BASE_DIR, MONGODB_URL, DB_NAME, BCRYPT_ROUNDS
+from utils.auth import get_password_hash
+from database.indexes import ensure_indexes
+from utils.movie_reviews import migrate_embedded_reviews
+from utils.genres import normalize_genres, rebuild_genre_stats
+from utils.review_stats import rebuild_review_stats
+
+# 1x1 PNG，用作合成电影的海报和上传的头像
+TINY_PNG = "iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAADUlEQVR42mNk+M9QDwADhgGAWjR9awAAAABJRU5ErkJggg=="
+GENRES = ["剧情", "喜剧", "动作", "爱情", "科幻", "悬疑", "动画", "犯罪", "家庭"]
+WORDS = ["剧情", "演技", "画面", "配乐", "导演", "节奏", "故事", "结局", "特效", "演员", "感人", "无聊",
+         "精彩", "失望", "推荐", "经典", "拖沓", "温暖", "震撼", "尴尬"]
+SENTIMENTS = ["positive", "neutral", "negative"]
+PASSWORD = "benchmark"
+
+
+def random_review(rng):
+    return "".join(rng.choice(WORDS) for _ in range(rng.randint(3, 30)))
+
+
+async def seed_database(client, db_name, movies=200, reviews_per_movie=50, users=100, favorites_per_user=20, seed=0):
+    """清空基准测试库并写入可复现的合成数据，返回压测时用到的 id"""
+    rng = random.Random(seed)
+    await client.drop_database(db_name)
+    db = client[db_name]
+    now = datetime.utcnow()
+    password_hash = get_password_hash(PASSWORD)
+
+    user_docs = []
+    for i in range(users + 1):
+        user_id = str(uuid.UUID(int=rng.getrandbits(128)))
+        user_docs.append({
+            "_id": user_id,
+            "user_id": user_id,
+            "username": "bench_admin" if i == 0 else f"bench_user_{i}",
+            "email": f"bench_{i}@example.com",
+            "password": password_hash,
+            "is_admin": i == 0,
+            "created_at": now - timedelta(minutes=i),
+        })
+    await db.users.insert_many(user_docs)
+
+    review_docs = []
+    for movie_id in range(1, movies + 1):
+        embedded = [
+            {"review_id": str(j), "uname": f"bench_user_{j}", "gender": "", "profileUrl": "", "content": random_review(rng)}
+            for j in range(reviews_per_movie)
+        ]
+        genre = ";".join(rng.sample(GENRES, rng.randint(1, 3)))
+        await db.movies.insert_one({
+            "movie_id": movie_id,
+            "title": f"电影{movie_id}",
+            "genre": genre,
+            "genres": normalize_genres(genre),
+            "description": random_review(rng),
+            "url_film": f"https://example.com/{movie_id}",
+            "img": {"type": "png", "content": TINY_PNG},
+            "source": "benchmark",
+            "reviews": embedded,
+        })
+        for review in embedded:
+            user = rng.choice(user_docs)
+            review_docs.append({
+                "_id": str(uuid.UUID(int=rng.getrandbits(128))),
+                "user_id": user["user_id"],
+                "username": user["username"],
+                "movie_id": movie_id,
+                "content": review["content"],
+                "sentiment": rng.choice(SENTIMENTS),
+                "status": "scored",
+                "created_at": now - timedelta(seconds=rng.randint(0, 90 * 86400)),
+            })
+    for start in range(0, len(review_docs), 5000):
+        await db.reviews.insert_many(review_docs[start:start + 5000], ordered=False)
+
+    favorite_docs = []
+    for user in user_docs:
+        for movie_id in rng.sample(range(1, movies + 1), min(favorites_per_user, movies)):
+            favorite_docs.append({
+                "_id": str(uuid.UUID(int=rng.getrandbits(128))),
+                "user_id": user["user_id"],
+                "movie_id": movie_id,
+                "created_at": now - timedelta(seconds=rng.randint(0, 90 * 86400)),
+            })
+    if favorite_docs:
+        await db.favorites.insert_many(favorite_docs, ordered=False)
+
+    await migrate_embedded_reviews(db)
+    await rebuild_genre_stats(db)
+    await rebuild_review_stats(db)
+    await ensure_indexes(db)
+    return {
+        "movie_ids": list(range(1, movies + 1)),
+        "users": [doc["username"] for doc in user_docs[1:]],
+        # 删除接口每个 id 只能成功一次，单独准备一批
+        "reviews": [(doc["_id"], doc["username"]) for doc in review_docs],
+        "favorites": [(doc["_id"], doc["user_id"]) for doc in favorite_docs],
+        "user_ids": {doc["user_id"]: doc["username"] for doc in user_docs},
+    }
+
+
+def build_routes(data, rng):
+    """每个路由：(名称, 方法, 生成请求参数的函数, 预期状态码)，参数函数返回 (路径, 请求参数, 使用的用户)"""
+    movie = lambda: rng.choice(data["movie_ids"])
+    user = lambda: rng.choice(data["users"])
+    admin = "bench_admin"
+    counter = iter(range(10 ** 9))
+    deletable_reviews = list(data["reviews"])
+    deletable_favorites = [(fid, data["user_ids"][uid]) for fid, uid in data["favorites"]]
+    rng.shuffle(deletable_reviews)
+    rng.shuffle(deletable_favorites)
+
+    def delete_review():
+        review_id, username = deletable_reviews.pop()
+        return f"/api/reviews/{review_id}", {}, username
+
+    def delete_favorite():
+        favorite_id, username = deletable_favorites.pop()
+        return f"/api/favorites/{favorite_id}", {}, username
+
+    def update_profile():
+        # 把邮箱更新为原值，保证重复请求后数据不变
+        i = rng.randint(1, len(data["users"]))
+        return "/api/users/profile", {"json": {"email": f"bench_{i}@example.com"}}, f"bench_user_{i}"
+
+    def register():
+        i = next(counter)
+        body = {"user_id": f"bench_new_{i}", "username": f"bench_new_{i}", "email": f"bench_new_{i}@example.com",
+                "password": PASSWORD, "is_admin": False, "created_at": datetime.utcnow().isoformat()}
+        return "/api/users/register", {"json": body}, None
+
+    return [
+        # 认证
+        ("auth.register", "POST", register, {200}),
+        ("auth.token", "POST", lambda: ("/token", {"data": {"username": user(), "password": PASSWORD}}, None), {200}),
+        ("users.me", "GET", lambda: ("/api/users/me", {}, user()), {200}),
+        ("users.list", "GET", lambda: ("/api/users/users", {"params": {"limit": 50}}, admin), {200}),
+        ("users.profile", "PUT", update_profile, {200}),
+        ("users.password", "PUT", lambda: ("/api/users/password", {"json": {
+            "currentPassword": PASSWORD, "newPassword": PASSWORD, "confirmPassword": PASSWORD}}, user()), {200}),
+        ("users.avatar", "POST", lambda: ("/api/users/avatar", {"files": {
+            "file": ("avatar.png", base64.b64decode(TINY_PNG), "image/png")}}, user()), {200}),
+        ("users.activities", "GET", lambda: ("/api/users/activities", {}, user()), {200}),
+        # 电影
+        ("movies.list", "GET", lambda: ("/api/movies/", {"params": {"limit": 20, "skip": rng.randint(0, 100)}}, None), {200}),
+        ("movies.list_genre", "GET", lambda: ("/api/movies/", {"params": {"limit": 20, "genre": rng.choice(GENRES)}}, None), {200}),
+        ("movies.detail", "GET", lambda: (f"/api/movies/{movie()}", {}, None), {200}),
+        ("movies.reviews", "GET", lambda: (f"/api/movies/{movie()}/reviews", {"params": {"limit": 20}}, None), {200}),
+        ("movies.image_thumb", "GET", lambda: (f"/api/movies/{movie()}/image", {"params": {"size": "thumb"}}, None), {200}),
+        ("movies.genre_stats", "GET", lambda: ("/api/movies/genres/stats", {}, None), {200}),
+        # 评论
+        ("reviews.create", "POST", lambda: ("/api/reviews/", {"params": {
+            "movie_id": movie(), "content": "".join(rng.sample(WORDS, 5))}}, user()), {202}),
+        ("reviews.movie", "GET", lambda: (f"/api/reviews/movie/{movie()}", {"params": {"limit": 50}}, None), {200}),
+        ("reviews.me", "GET", lambda: ("/api/reviews/user/me", {}, user()), {200}),
+        ("reviews.all", "GET", lambda: ("/api/reviews/all", {"params": {"limit": 20}}, admin), {200}),
+        ("reviews.delete", "DELETE", delete_review, {200}),
+        # 收藏
+        ("favorites.add", "POST", lambda: (f"/api/favorites/{movie()}", {}, user()), {201, 400}),
+        ("favorites.list", "GET", lambda: ("/api/favorites/", {}, user()), {200}),
+        ("favorites.check", "GET", lambda: (f"/api/favorites/check/{movie()}", {}, user()), {200}),
+        ("favorites.delete", "DELETE", delete_favorite, {200}),
+        # 情感分析（模型未加载时返回 503，计入错误）
+        ("analysis.sentiment", "POST", lambda: ("/api/analysis/sentiment", {"json": {
+            "texts": [random_review(rng) for _ in range(8)]}}, user()), {200}),
+        ("analysis.movie_sentiment", "GET", lambda: (f"/api/analysis/sentiment/{movie()}", {}, None), {200}),
+        ("analysis.word_cloud", "GET", lambda: (f"/api/analysis/word-cloud/{movie()}", {}, None), {200}),
+        ("analysis.word_cloud_png", "GET", lambda: (f"/api/analysis/word-cloud/{movie()}.png", {}, None), {200}),
+        ("analysis.sentiment_trend", "GET", lambda: ("/api/analysis/sentiment-trend", {}, None), {200}),
+        ("analysis.movie_sentiment_trend", "GET", lambda: ("/api/analysis/sentiment-trend", {"params": {"days": 30, "movie_id": movie()}}, None), {200}),
+        ("analysis.user_activity_trend", "GET", lambda: ("/api/analysis/user-activity-trend", {}, None), {200}),
+        ("analysis.comment_length", "GET", lambda: ("/api/analysis/comment-length-distribution", {}, None), {200}),
+        ("analysis.rating_distribution", "GET", lambda: ("/api/analysis/movie-rating-distribution", {}, None), {200}),
+        ("analysis.user_activity", "GET", lambda: ("/api/analysis/user-activity", {}, None), {200}),
+        # 管理端统计
+        ("analytics.reviews", "GET", lambda: ("/api/analytics/reviews", {}, admin), {200}),
+        ("analytics.movies", "GET", lambda: ("/api/analytics/movies", {}, admin), {200}),
+        ("analytics.users", "GET", lambda: ("/api/analytics/users", {}, admin), {200}),
+    ], len(deletable_reviews), len(deletable_favorites)
+
+
+async def login_all(http, usernames):
+    tokens = {}
+    for username in usernames:
+        response = await http.post("/token", data={"username": username, "password": PASSWORD})
+        response.raise_for_status()
+        tokens[username] = response.json()["access_token"]
+    return tokens
+
+
+class RouteRecorder:
+    """发送单个路由的请求并记录延迟与状态码"""
+
+    def __init__(self, http, tokens, method, make_request, expected):
+        self.http = http
+        self.tokens = tokens
+        self.method = method
+        self.make_request = make_request
+        self.expected = expected
+        self.latencies = []
+        self.statuses = Counter()
+        self.errors = 0
+
+    async def send(self, record=True):
+        path, kwargs, username = self.make_request()
+        headers = {"Authorization": f"Bearer {self.tokens[username]}"} if username else {}
+        start = time.perf_counter()
+        try:
+            response = await self.http.request(self.method, path, headers=headers, **kwargs)
+            status = response.status_code
+        except Exception as e:
+            status = type(e).__name__
+        elapsed = (time.perf_counter() - start) * 1000
+        if record:
+            self.latencies.append(elapsed)
+            self.statuses[str(status)] += 1
+            if status not in self.expected:
+                self.errors += 1
+
+    def summary(self, total_seconds, concurrency):
+        latencies = np.array(self.latencies or [0.0])
+        count = len(self.latencies)
+        return {
+            "requests": count,
+            "concurrency": concurrency,
+            "p50_ms": float(np.percentile(latencies, 50)),
+            "p95_ms": float(np.percentile(latencies, 95)),
+            "p99_ms": float(np.percentile(latencies, 99)),
+            "mean_ms": float(latencies.mean()),
+            "max_ms": float(latencies.max()),
+            "throughput_rps": count / total_seconds if total_seconds else 0.0,
+            "error_rate": self.errors / count if count else 0.0,
+            "status_counts": dict(self.statuses),
+        }
+
+
+async def run_route(recorder, requests, concurrency, warmup):
+    for _ in range(warmup):
+        await recorder.send(record=False)
+
+    remaining = iter(range(requests))
+
+    async def worker():
+        for _ in remaining:
+            await recorder.send()
+
+    start = time.perf_counter()
+    await asyncio.gather(*[worker() for _ in range(concurrency)])
+    return recorder.summary(time.perf_counter() - start, concurrency)
+
+
+async def run_background(recorder, concurrency, stop):
+    """压测其他路由期间持续发送请求（如登录），用于观察它对其他路由延迟的影响"""
+    async def worker():
+        while not stop.is_set():
+            await recorder.send()
+
+    start = time.perf_counter()
+    await asyncio.gather(*[worker() for _ in range(concurrency)])
+    return recorder.summary(time.perf_counter() - start, concurrency)
+
+
+def print_stats(name, stats):
+    print(f"{name:32s} p50 {stats['p50_ms']:8.2f}ms  p95 {stats['p95_ms']:8.2f}ms  "
+          f"p99 {stats['p99_ms']:8.2f}ms  {stats['throughput_rps']:8.1f} req/s  "
+          f"错误率 {stats['error_rate']:.2%}")
+
+
+def start_server(db_name, port):
+    env = dict(os.environ, DB_NAME=db_name, MONGODB_URL=MONGODB_URL)
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+        cwd=BASE_DIR, env=env,
+    )
+
+
+async def wait_for_server(http, timeout=120):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if (await http.get("/docs")).status_code == 200:
+                return
+        except Exception:
+            pass
+        await asyncio.sleep(0.5)
+    raise RuntimeError("等待服务启动超时")
+
+
+async def main(args):
+    import httpx
+
+    client = AsyncIOMotorClient(MONGODB_URL)
+    print(f"写入合成数据到 {args.db_name} ...")
+    data = await seed_database(client, args.db_name, args.movies, args.reviews_per_movie, args.users,
+                               args.favorites_per_user, args.seed)
+    client.close()
+
+    rng = random.Random(args.seed)
+    routes, review_pool, favorite_pool = build_routes(data, rng)
+    login_route = next(route for route in routes if route[0] == "auth.token")
+    if args.routes:
+        selected = set(args.routes.split(","))
+        routes = [route for route in routes if route[0] in selected or route[0].split(".")[0] in selected]
+
+    server = start_server(args.db_name, args.port) if args.start_server else None
+    base_url = f"http://127.0.0.1:{args.port}" if server else args.base_url
+    connections = args.concurrency + args.login_load
+    limits = httpx.Limits(max_connections=connections, max_keepalive_connections=connections)
+    results = {}
+    try:
+        async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=args.timeout) as http:
+            await wait_for_server(http)
+            tokens = await login_all(http, ["bench_admin"] + data["users"])
+            background = None
+            if args.login_load:
+                stop = asyncio.Event()
+                login_recorder = RouteRecorder(http, tokens, *login_route[1:])
+                background = asyncio.create_task(run_background(login_recorder, args.login_load, stop))
+            for name, method, make_request, expected in routes:
+                requests = args.requests
+                warmup = args.warmup
+                if name == "reviews.delete":
+                    requests, warmup = min(requests, review_pool), 0
+                elif name == "favorites.delete":
+                    requests, warmup = min(requests, favorite_pool), 0
+                if requests <= 0:
+                    continue
+                recorder = RouteRecorder(http, tokens, method, make_request, expected)
+                stats = await run_route(recorder, requests, args.concurrency, warmup)
+                results[name] = stats
+                print_stats(name, stats)
+            if background is not None:
+                stop.set()
+                results["background.auth.token"] = await background
+                print_stats("background.auth.token", results["background.auth.token"])
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+    if args.output:
+        report = {
+            "config": {
+                **{key: value for key, value in vars(args).items() if key != "output"},
+                "bcrypt_rounds": BCRYPT_ROUNDS,
+            },
+            "routes": results,
+        }
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2, sort_keys=True)
+        print(f"结果已保存到 {args.output}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="接口压测：写入合成数据后逐个路由统计延迟、吞吐和错误率")
+    parser.add_argument("--db-name", default=f"{DB_NAME}_benchmark", help="压测使用的数据库（会被清空）")
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000",
+                        help="已启动服务的地址（该服务需以 DB_NAME=<--db-name> 启动）")
+    parser.add_argument("--start-server", action="store_true", help="使用压测数据库启动一个本地 uvicorn 服务")
+    parser.add_argument("--port", type=int, default=8765, help="--start-server 时使用的端口")
+    parser.add_argument("--movies", type=int, default=200)
+    parser.add_argument("--reviews-per-movie", type=int, default=50)
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--favorites-per-user", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=500, help="每个路由的请求数")
+    parser.add_argument("--warmup", type=int, default=10, help="每个路由正式计时前的预热请求数")
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--routes", help="只压测指定路由或路由组，逗号分隔，例如 movies,reviews.create")
+    parser.add_argument("--login-load", type=int, default=0,
+                        help="压测期间在后台持续登录的并发数，用于观察 bcrypt 对其他路由的影响")
+    parser.add_argument("--output", help="保存 JSON 结果，便于不同提交之间对比")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,137 @@
+import argparse
+import json
+import sys
+import os
+import time
+
+import numpy as np
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import BASE_DIR, SENTIMENT_MODEL_PATH, SENTIMENT_MODELS
+from utils.inference_backends import BACKENDS, MODEL_INPUT_NAMES, load_backend
+
+EXPERIMENT_DIR = os.path.join(BASE_DIR, "..", "bert_experiment")
+
+
+def default_dataset_path():
+    # 优先使用 模型训练.py 最近一次使用的分词缓存（数据缓存.py 写入 LATEST），兼容旧的 processed_val_dataset
+    cache_dir = os.path.join(EXPERIMENT_DIR, "tokenized_cache")
+    latest = os.path.join(cache_dir, "LATEST")
+    if os.path.exists(latest):
+        with open(latest, encoding="utf-8") as f:
+            return os.path.join(cache_dir, f.read().strip())
+    return os.path.join(EXPERIMENT_DIR, "processed_val_dataset")
+
+
+def load_batches(dataset_path, batch_size, limit=None, sort_by_length=True):
+    """读取模型训练.py 使用的验证集，按长度排序分批，每批只填充到批内最长的有效长度
+
+    返回 (batches, order)，order[i] 是排序后第 i 个样本在原数据集中的下标，
+    用于把预测结果恢复到原始顺序。
+    """
+    from datasets import load_from_disk
+
+    dataset = load_from_disk(dataset_path)
+    if "validation" in getattr(dataset, "keys", lambda: [])():
+        dataset = dataset["validation"]  # 分词缓存目录保存的是包含 train / validation 的 DatasetDict
+    if limit:
+        dataset = dataset.select(range(min(limit, len(dataset))))
+    columns = [name for name in MODEL_INPUT_NAMES if name in dataset.column_names]
+    dataset.set_format(None)
+    data = dataset[:]
+    # 兼容旧版按 max_length 填充保存的数据集：有效长度以 attention_mask 为准
+    lengths = np.array([int(np.sum(mask)) for mask in data["attention_mask"]])
+    order = np.argsort(lengths, kind="stable") if sort_by_length else np.arange(len(lengths))
+
+    batches = []
+    for start in range(0, len(order), batch_size):
+        indices = order[start:start + batch_size]
+        length = max(int(lengths[indices].max()), 1)
+        encodings = {}
+        for name in columns:
+            array = np.zeros((len(indices), length), dtype=np.int64)
+            for row, i in enumerate(indices):
+                values = data[name][i][:lengths[i]]
+                array[row, :len(values)] = values
+            encodings[name] = array
+        batches.append((encodings, np.asarray(data["label"])[indices]))
+    return batches, order
+
+
+def run_backend(backend, batches, order, warmup=2):
+    for encodings, _ in batches[:warmup]:
+        backend(encodings)
+
+    latencies = []
+    predictions = []
+    start = time.perf_counter()
+    for encodings, _ in batches:
+        t0 = time.perf_counter()
+        logits = backend(encodings)
+        latencies.append((time.perf_counter() - t0) * 1000)
+        predictions.append(np.argmax(logits, axis=-1))
+    elapsed = time.perf_counter() - start
+
+    predictions = np.concatenate(predictions)
+    labels = np.concatenate([labels for _, labels in batches])
+    # 恢复到数据集原始顺序，便于不同后端之间逐样本比较
+    restored = np.empty_like(predictions)
+    restored[order] = predictions
+    return {
+        "backend": backend.name,
+        "samples": int(len(labels)),
+        "latency_ms": {
+            "p50": round(float(np.percentile(latencies, 50)), 2),
+            "p95": round(float(np.percentile(latencies, 95)), 2),
+            "p99": round(float(np.percentile(latencies, 99)), 2),
+            "mean": round(float(np.mean(latencies)), 2),
+        },
+        "throughput": round(len(labels) / elapsed, 2),  # 样本/秒
+        "accuracy": round(float((predictions == labels).mean()), 4),
+    }, restored
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="对比各推理后端的延迟、吞吐量与准确率")
+    parser.add_argument("--model-path", default=SENTIMENT_MODEL_PATH)
+    parser.add_argument("--model", choices=list(SENTIMENT_MODELS), help="按名称选择模型（teacher / student），优先于 --model-path")
+    parser.add_argument("--dataset", default=default_dataset_path(), help="分词缓存目录或 processed_val_dataset 目录")
+    parser.add_argument("--backends", nargs="+", default=list(BACKENDS), choices=list(BACKENDS))
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--limit", type=int, default=None, help="最多使用的样本数")
+    parser.add_argument("--no-sort", action="store_true", help="不按长度排序分批（用于对比排序带来的加速）")
+    parser.add_argument("--output", default=None, help="把结果写入 JSON 文件")
+    args = parser.parse_args()
+    if args.model:
+        args.model_path = SENTIMENT_MODELS[args.model]
+
+    batches, order = load_batches(args.dataset, args.batch_size, args.limit, sort_by_length=not args.no_sort)
+    print(f"加载验证集 {args.dataset}，共 {len(batches)} 个批次")
+
+    reports = []
+    baseline = None
+    for name in args.backends:
+        try:
+            backend = load_backend(name, args.model_path)
+        except Exception as e:
+            print(f"跳过后端 {name}: {e}")
+            continue
+        report, predictions = run_backend(backend, batches, order)
+        if baseline is None:
+            baseline = (report, predictions)
+        # 以第一个后端（默认 fp32）为基准计算准确率差异和预测一致率
+        report["accuracy_delta"] = round(report["accuracy"] - baseline[0]["accuracy"], 4)
+        report["agreement"] = round(float((predictions == baseline[1]).mean()), 4)
+        reports.append(report)
+
+    print(f"\n{'backend':<12}{'p50(ms)':>10}{'p95(ms)':>10}{'p99(ms)':>10}{'样本/秒':>10}{'accuracy':>10}{'Δacc':>9}{'一致率':>8}")
+    for r in reports:
+        print(f"{r['backend']:<12}{r['latency_ms']['p50']:>10}{r['latency_ms']['p95']:>10}{r['latency_ms']['p99']:>10}"
+              f"{r['throughput']:>10}{r['accuracy']:>10}{r['accuracy_delta']:>9}{r['agreement']:>8}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"batch_size": args.batch_size, "sort_by_length": not args.no_sort, "results": reports}, f, ensure_ascii=False, indent=2)
+        print(f"\n结果已保存到 {args.output}")
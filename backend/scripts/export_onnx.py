@@ -0,0 +1,20 @@
+import argparse
+import sys
+import os
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import SENTIMENT_MODEL_PATH
+from utils.inference_backends import export_onnx
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="导出情感分析模型为 ONNX 格式")
+    parser.add_argument("--model-path", default=SENTIMENT_MODEL_PATH, help="微调后的模型目录")
+    parser.add_argument("--output", default=None, help="ONNX 文件路径，默认为 <model-path>/model.onnx")
+    parser.add_argument("--opset", type=int, default=14)
+    args = parser.parse_args()
+
+    print(f"从 {args.model_path} 导出 ONNX 模型...")
+    onnx_path = export_onnx(args.model_path, args.output, opset=args.opset)
+    print(f"ONNX 模型已保存到 {onnx_path}")
@@ -0,0 +1,21 @@
+import asyncio
+from motor.motor_asyncio import AsyncIOMotorClient
+import sys
+import os
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import MONGODB_URL, DB_NAME
+from utils.images import generate_missing_images
+
+async def main():
+    client = AsyncIOMotorClient(MONGODB_URL)
+    db = client[DB_NAME]
+    print("预生成电影海报的原图和缩略图...")
+    count = await generate_missing_images(db)
+    print(f"共处理 {count} 张海报")
+    client.close()
+
+if __name__ == "__main__":
+    asyncio.run(main())
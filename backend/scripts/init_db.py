@@ -1,7 +1,6 @@
-import json
+import argparse
 import asyncio
 from motor.motor_asyncio import AsyncIOMotorClient
-from pymongo import ASCENDING
 from datetime import datetime, timezone 
 from pathlib import Path
 import sys
@@ -11,55 +10,62 @@ import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from utils.auth import get_password_hash
-from config import MONGODB_URL, DB_NAME
+from config import MONGODB_URL, DB_NAME, KEYWORD_TOP_K
+from utils.bulk_import import import_collection, has_pending_import, reset_import
+from utils.keyword_stats import rebuild_keyword_stats, compact_keyword_stats
+from utils.segmentation import shutdown_segmentation
+from utils.images import generate_missing_images
+from database.indexes import ensure_indexes
+from utils.movie_reviews import migrate_embedded_reviews
+from utils.genres import add_genres_field, backfill_genres, rebuild_genre_stats
+from utils.review_stats import rebuild_review_stats
+from utils.word_cloud import ensure_font
 
-async def init_database():
+DATASET_DIR = Path(__file__).parent.parent.parent / "dataset"
+
+
+def normalize_movie(movie):
+    # 处理字符串格式的 movie_id
+    if isinstance(movie.get("movie_id"), str):
+        movie["movie_id"] = int(movie["movie_id"])
+    # genre 字符串拆分为 genres 数组，便于按类型筛选和统计
+    return add_genres_field(movie)
+
+
+async def init_database(chunk_size=1000, workers=4):
     client = AsyncIOMotorClient(MONGODB_URL)
     db = client[DB_NAME]
     
     # if "movies" in await db.list_collection_names():
     #     print("删除现有movies集合...")
     #     await db.drop_collection("movies")
-    if "movies" not in await db.list_collection_names():
-        print("创建movies集合...")
-        await db.create_collection("movies")
+    # 电影数据
+    dataset_path = DATASET_DIR / "aqy_movie_reviews.json"
+    if "movies" not in await db.list_collection_names() or await has_pending_import(db, "movies", dataset_path):
+        if "movies" not in await db.list_collection_names():
+            print("创建movies集合...")
+            await db.create_collection("movies")
+            await reset_import(db, "movies", dataset_path)
         
-        # 电影数据
-        dataset_path = Path(__file__).parent.parent.parent / "dataset" / "aqy_movie_reviews.json"
         if dataset_path.exists():
             print(f"从 {dataset_path} 导入电影数据...")
-            with open(dataset_path, 'r', encoding='utf-8') as f:
-                movies_data = json.load(f)
-            
-            if movies_data:
-                # 转换扩展JSON格式
-                for movie in movies_data:
-                    # 处理_id字段
-                    if "_id" in movie and isinstance(movie["_id"], dict) and "$oid" in movie["_id"]:
-                        movie["_id"] = movie["_id"]["$oid"]
-                    # 处理其他可能存在的扩展JSON字段（如日期）
-                    if "created_at" in movie and isinstance(movie["created_at"], dict) and "$date" in movie["created_at"]:
-                        movie["created_at"] = datetime.fromisoformat(movie["created_at"]["$date"])
-                    # 处理movie_id字段
-                    if "movie_id" in movie:
-                        # 处理$numberLong格式
-                        if isinstance(movie["movie_id"], dict) and "$numberLong" in movie["movie_id"]:
-                            movie["movie_id"] = int(movie["movie_id"]["$numberLong"])
-                        # 处理字符串格式数字
-                        elif isinstance(movie["movie_id"], str):
-                            movie["movie_id"] = int(movie["movie_id"])
-
-                await db.movies.insert_many(movies_data)
-                print(f"成功导入 {len(movies_data)} 条电影数据")
-                
-                # 创建索引
-                await db.movies.create_index([("movie_id", ASCENDING)])
-                await db.movies.create_index([("title", ASCENDING)])
+            # 流式解析，扩展JSON格式（$oid / $date / $numberLong）在导入时逐条转换
+            await import_collection(db, "movies", dataset_path, chunk_size, workers, transform=normalize_movie)
         else:
             print(f"警告：找不到数据文件 {dataset_path}")
     else:
         print("movies集合已存在")
     
+    # 电影自带的评论拆分到 movie_reviews 集合，详情接口按页读取；
+    # 只处理仍带有 reviews 数组的电影，上次迁移中断后重新运行会继续完成
+    print("迁移电影评论到 movie_reviews 集合...")
+    movies, reviews = await migrate_embedded_reviews(db)
+    print(f"共迁移 {movies} 部电影，{reviews} 条评论")
+    
+    # 旧数据补齐 genres 字段，并重新统计各类型电影数
+    print(f"补齐 {await backfill_genres(db)} 部电影的 genres 字段")
+    await rebuild_genre_stats(db)
+    
     # 初始化用户数据
     # if "users" in await db.list_collection_names():
     #     print("删除现有users集合...")
@@ -89,57 +95,52 @@ async def init_database():
         ]
         
         await db.users.insert_many(users)
-        await db.users.create_index([("username", ASCENDING)], unique=True)
-        await db.users.create_index([("email", ASCENDING)], unique=True)
-    
-    # 初始化评论数据
-    if "reviews" in await db.list_collection_names():
-        print("删除现有reviews集合...")
-        await db.drop_collection("reviews")
-    
-    print("创建reviews集合...")
-    await db.create_collection("reviews")
     
-    # 导入评论数据
-    reviews_path = Path(__file__).parent.parent.parent / "dataset" / "mock_reviews.json"
-    if reviews_path.exists():
-        print(f"从 {reviews_path} 导入评论数据...")
-        with open(reviews_path, 'r', encoding='utf-8') as f:
-            reviews_data = json.load(f)
+    # 初始化评论和收藏数据（未完成的导入会断点续传，否则重新导入）
+    for name, filename in (("reviews", "mock_reviews.json"), ("favorites", "mock_favorites.json")):
+        path = DATASET_DIR / filename
+        if not await has_pending_import(db, name, path):
+            if name in await db.list_collection_names():
+                print(f"删除现有{name}集合...")
+                await db.drop_collection(name)
+            print(f"创建{name}集合...")
+            await db.create_collection(name)
+            await reset_import(db, name, path)
         
-        if reviews_data:
-            await db.reviews.insert_many(reviews_data)
-            print(f"成功导入 {len(reviews_data)} 条评论数据")
-            
-            # 创建索引
-            await db.reviews.create_index([("user_id", ASCENDING)])
-            await db.reviews.create_index([("movie_id", ASCENDING)])
+        if path.exists():
+            print(f"从 {path} 导入{name}数据...")
+            await import_collection(db, name, path, chunk_size, workers)
     
-    # 初始化收藏数据
-    if "favorites" in await db.list_collection_names():
-        print("删除现有favorites集合...")
-        await db.drop_collection("favorites")
+    # 数据全部写入后再创建索引，避免导入过程中逐条维护索引
+    print("创建索引...")
+    await ensure_indexes(db)
     
-    print("创建favorites集合...")
-    await db.create_collection("favorites")
+    # 预生成海报缩略图，列表接口只返回图片地址
+    print("预生成海报缩略图...")
+    print(f"生成 {await generate_missing_images(db)} 张海报")
     
-    # 导入收藏数据
-    favorites_path = Path(__file__).parent.parent.parent / "dataset" / "mock_favorites.json"
-    if favorites_path.exists():
-        print(f"从 {favorites_path} 导入收藏数据...")
-        with open(favorites_path, 'r', encoding='utf-8') as f:
-            favorites_data = json.load(f)
-        
-        if favorites_data:
-            await db.favorites.insert_many(favorites_data)
-            print(f"成功导入 {len(favorites_data)} 条收藏数据")
-            
-            # 创建索引
-            await db.favorites.create_index([("user_id", ASCENDING)])
-            await db.favorites.create_index([("movie_id", ASCENDING)])
+    # 评论数据已重新导入，重建关键词统计
+    print("重建关键词统计...")
+    await rebuild_keyword_stats(db)
+    await compact_keyword_stats(db, KEYWORD_TOP_K)
+    # 按天汇总的评论情感统计，趋势接口只读取汇总结果
+    print("重建评论按天统计...")
+    print(f"共 {await rebuild_review_stats(db)} 条电影每日统计")
+    shutdown_segmentation()
+    
+    # 词云需要中文字体，没有时下载默认字体，避免 /word-cloud/{movie_id}.png 返回 503
+    print("检查词云字体...")
+    try:
+        print(f"词云字体: {await asyncio.to_thread(ensure_font)}")
+    except OSError as e:
+        print(f"警告：词云字体下载失败，请手动下载字体并设置 WORD_CLOUD_FONT_PATH: {e}")
     
     print("数据库初始化完成！")
     client.close()
 
 if __name__ == "__main__":
-    asyncio.run(init_database()) 
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="初始化数据库并导入数据集")
+    parser.add_argument("--chunk-size", type=int, default=1000, help="每次 insert_many 写入的文档数")
+    parser.add_argument("--workers", type=int, default=4, help="并发写入的协程数")
+    args = parser.parse_args()
+    asyncio.run(init_database(args.chunk_size, args.workers))
@@ -0,0 +1,24 @@
+import asyncio
+from motor.motor_asyncio import AsyncIOMotorClient
+import sys
+import os
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import MONGODB_URL, DB_NAME
+from database.indexes import ensure_indexes
+from utils.movie_reviews import migrate_embedded_reviews
+
+async def main():
+    client = AsyncIOMotorClient(MONGODB_URL)
+    db = client[DB_NAME]
+    print("迁移 movies.reviews 到 movie_reviews 集合...")
+    movies, reviews = await migrate_embedded_reviews(db)
+    print(f"共迁移 {movies} 部电影，{reviews} 条评论")
+    await ensure_indexes(db)
+    print("索引已创建")
+    client.close()
+
+if __name__ == "__main__":
+    asyncio.run(main())
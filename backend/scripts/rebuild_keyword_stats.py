@@ -0,0 +1,25 @@
+import asyncio
+from motor.motor_asyncio import AsyncIOMotorClient
+import sys
+import os
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import MONGODB_URL, DB_NAME, KEYWORD_TOP_K
+from utils.keyword_stats import rebuild_keyword_stats, compact_keyword_stats
+from utils.segmentation import shutdown_segmentation
+
+async def main():
+    client = AsyncIOMotorClient(MONGODB_URL)
+    db = client[DB_NAME]
+    print("从 reviews 集合重建关键词统计...")
+    doc_count, term_count = await rebuild_keyword_stats(db)
+    print(f"共处理 {doc_count} 条评论，{term_count} 个词")
+    await compact_keyword_stats(db, KEYWORD_TOP_K)
+    shutdown_segmentation()
+    print("热门关键词快照已更新")
+    client.close()
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,22 +1,39 @@
+import asyncio
+import time
+from collections import OrderedDict
 from datetime import datetime, timedelta
-from typing import Optional
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Tuple
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from models.user import User
-from config import MONGODB_URL, DB_NAME, SECRET_KEY, ALGORITHM, ACCESS_TOKEN_EXPIRE_MINUTES
+from database.database import get_database
+from config import (
+    SECRET_KEY, ALGORITHM, ACCESS_TOKEN_EXPIRE_MINUTES, USER_CACHE_TTL_SECONDS, USER_CACHE_MAX_SIZE,
+    BCRYPT_ROUNDS, PASSWORD_HASH_WORKERS, PASSWORD_HASH_MAX_PENDING,
+)
 
 # 配置密码加密
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=BCRYPT_ROUNDS)
+
+# bcrypt 每次计算要几十毫秒，放到独立线程池执行，避免阻塞事件循环（bcrypt 计算时会释放 GIL）
+_hash_executor = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="password-hash")
+_hash_pending = 0
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
+# 认证用户缓存：username -> (过期时间, User)，避免每个请求都查询 users 集合
+_user_cache: "OrderedDict[str, tuple]" = OrderedDict()
+
+def invalidate_user_cache(username: str):
+    # 用户资料或密码变更后必须调用，使下一次请求重新读取数据库
+    _user_cache.pop(username, None)
+
 async def get_user(username: str):
     # 新增用户查询函数
-    from motor.motor_asyncio import AsyncIOMotorClient
-    client = AsyncIOMotorClient(MONGODB_URL)
-    db = client[DB_NAME]
+    db = get_database()
     user = await db.users.find_one({"username": username})
     if user:
         # 转换ObjectId为字符串
@@ -24,12 +41,54 @@ async def get_user(username: str):
         return User(**user)
     return None
 
+async def get_cached_user(username: str):
+    now = time.monotonic()
+    cached = _user_cache.get(username)
+    if cached is not None and cached[0] > now:
+        _user_cache.move_to_end(username)
+        return cached[1]
+
+    user = await get_user(username)
+    if user is None:
+        _user_cache.pop(username, None)
+        return None
+    _user_cache[username] = (now + USER_CACHE_TTL_SECONDS, user)
+    _user_cache.move_to_end(username)
+    while len(_user_cache) > USER_CACHE_MAX_SIZE:
+        _user_cache.popitem(last=False)
+    return user
+
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
 def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
+async def _run_password_hash(fn, *args):
+    # 排队的哈希任务过多时直接拒绝，避免登录高峰把排队延迟无限拉长
+    global _hash_pending
+    if _hash_pending >= PASSWORD_HASH_MAX_PENDING:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many concurrent password operations",
+            headers={"Retry-After": "1"},
+        )
+    _hash_pending += 1
+    try:
+        return await asyncio.get_running_loop().run_in_executor(_hash_executor, fn, *args)
+    finally:
+        _hash_pending -= 1
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    return await _run_password_hash(verify_password, plain_password, hashed_password)
+
+async def verify_and_update_password_async(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """校验密码；如果哈希的代价因子与当前配置不同，同时返回按新配置生成的哈希"""
+    return await _run_password_hash(pwd_context.verify_and_update, plain_password, hashed_password)
+
+async def get_password_hash_async(password: str) -> str:
+    return await _run_password_hash(get_password_hash, password)
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
     if expires_delta:
@@ -55,7 +114,7 @@ async def get_current_user(token: str = Depends(oauth2_scheme)):
     except JWTError:
         raise credentials_exception
         
-    user = await get_user(username=username)
+    user = await get_cached_user(username=username)
     if user is None:
         raise credentials_exception
     return user
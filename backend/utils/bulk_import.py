@@ -0,0 +1,220 @@
+import asyncio
+import json
+import os
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import Callable, Iterator, Optional
+
+from pymongo.errors import BulkWriteError
+
+DUPLICATE_KEY_ERROR = 11000
+# 源文件中没有 _id 的文档按 (文件名, 块编号, 块内位置) 生成固定的 _id
+IMPORT_ID_NAMESPACE = uuid.uuid5(uuid.NAMESPACE_URL, "bert_movie/bulk_import")
+
+
+def iter_json_documents(path, buffer_size: int = 1 << 20) -> Iterator[dict]:
+    """增量解析 JSON 数组或 NDJSON 文件，每次只在内存中保留一个缓冲区和一条文档"""
+    decoder = json.JSONDecoder()
+    with open(path, "r", encoding="utf-8-sig") as f:
+        buf = ""
+        pos = 0
+        eof = False
+        while True:
+            # 跳过空白、逗号以及数组的起止符号
+            while True:
+                while pos < len(buf) and buf[pos] in " \t\r\n,[]":
+                    pos += 1
+                if pos < len(buf) or eof:
+                    break
+                buf = f.read(buffer_size)
+                pos = 0
+                eof = not buf
+            if pos >= len(buf):
+                return
+            try:
+                doc, end = decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                # 文档跨越缓冲区边界，读入更多内容后重试
+                more = f.read(buffer_size)
+                eof = not more
+                buf = buf[pos:] + more
+                pos = 0
+                continue
+            yield doc
+            pos = end
+
+
+def _parse_date(value):
+    if isinstance(value, dict) and "$numberLong" in value:
+        return datetime.fromtimestamp(int(value["$numberLong"]) / 1000, tz=timezone.utc)
+    if isinstance(value, (int, float)):
+        return datetime.fromtimestamp(value / 1000, tz=timezone.utc)
+    return datetime.fromisoformat(value.replace("Z", "+00:00"))
+
+
+def convert_extended_json(value):
+    """递归转换 MongoDB 扩展 JSON 字段（$oid / $date / $numberLong 等）"""
+    if isinstance(value, dict):
+        if len(value) == 1:
+            key, inner = next(iter(value.items()))
+            if key == "$oid":
+                return inner  # 与原导入逻辑一致，_id 保留为字符串
+            if key == "$date":
+                return _parse_date(inner)
+            if key in ("$numberLong", "$numberInt"):
+                return int(inner)
+            if key == "$numberDouble":
+                return float(inner)
+        return {k: convert_extended_json(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [convert_extended_json(v) for v in value]
+    return value
+
+
+def _iter_chunks(docs: Iterator[dict], chunk_size: int):
+    chunk = []
+    for doc in docs:
+        chunk.append(doc)
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _assign_ids(docs, source: str, index: int):
+    """为缺少 _id 的文档生成确定性的 _id（与接口创建的评论、收藏一致，为 UUID 字符串）
+
+    续传时水位线之后的块会整体重新写入，其中可能有乱序完成或写了一半的块；
+    _id 固定后这些文档会触发重复键错误而被忽略，不会重复导入。
+    """
+    for position, doc in enumerate(docs):
+        if "_id" not in doc:
+            doc["_id"] = str(uuid.uuid5(IMPORT_ID_NAMESPACE, f"{source}:{index}:{position}"))
+    return docs
+
+
+async def _insert_chunk(collection, docs) -> int:
+    """无序批量写入；断点续传时重复写入的文档（重复键错误）直接忽略"""
+    try:
+        result = await collection.insert_many(docs, ordered=False)
+        return len(result.inserted_ids)
+    except BulkWriteError as e:
+        fatal = [err for err in e.details.get("writeErrors", []) if err.get("code") != DUPLICATE_KEY_ERROR]
+        if fatal:
+            raise
+        return e.details.get("nInserted", 0)
+
+
+async def has_pending_import(db, collection_name: str, path) -> bool:
+    state = await db.import_progress.find_one({"_id": f"{collection_name}:{os.path.basename(path)}"})
+    return bool(state) and not state.get("completed")
+
+
+async def reset_import(db, collection_name: str, path):
+    await db.import_progress.delete_one({"_id": f"{collection_name}:{os.path.basename(path)}"})
+
+
+async def import_collection(
+    db,
+    collection_name: str,
+    path,
+    chunk_size: int = 1000,
+    workers: int = 4,
+    transform: Optional[Callable[[dict], dict]] = None,
+) -> int:
+    """流式导入一个 JSON 文件到集合
+
+    文件按 chunk_size 切块后由 workers 个写入协程并发写入。import_progress 集合记录
+    已连续提交的块数（水位线），中断后重新运行会跳过水位线之前的块继续导入。
+    没有 _id 的文档会按块编号和位置生成固定的 _id，保证重新写入时不会产生重复数据。
+    """
+    progress = db.import_progress
+    key = f"{collection_name}:{os.path.basename(path)}"
+    state = await progress.find_one({"_id": key}) or {}
+    if state.get("completed"):
+        print(f"{collection_name}: {path} 已导入完成，跳过")
+        return state.get("inserted", 0)
+
+    # 续传时沿用上次的块大小，保证块编号一致
+    chunk_size = state.get("chunk_size", chunk_size)
+    resume_from = state.get("committed_chunks", 0)
+    inserted = state.get("inserted", 0)
+    if resume_from:
+        print(f"{collection_name}: 从第 {resume_from} 块继续导入（已导入 {inserted} 条）")
+
+    collection = db[collection_name]
+    queue: asyncio.Queue = asyncio.Queue(maxsize=workers * 2)
+    done_chunks = set()
+    watermark = resume_from
+    started = time.monotonic()
+    lock = asyncio.Lock()
+    failure = None
+
+    async def writer():
+        nonlocal watermark, inserted, failure
+        while True:
+            item = await queue.get()
+            if item is None:
+                return
+            if failure is not None:
+                continue  # 已有写入失败：继续取空队列，避免读取端阻塞
+            index, docs = item
+            try:
+                count = await _insert_chunk(collection, docs)
+            except Exception as e:
+                failure = e
+                continue
+            async with lock:
+                inserted += count
+                done_chunks.add(index)
+                while watermark in done_chunks:
+                    done_chunks.discard(watermark)
+                    watermark += 1
+                await progress.update_one(
+                    {"_id": key},
+                    {"$set": {
+                        "committed_chunks": watermark,
+                        "chunk_size": chunk_size,
+                        "inserted": inserted,
+                        "completed": False,
+                        "updated_at": datetime.now(timezone.utc),
+                    }},
+                    upsert=True,
+                )
+                rate = (inserted - state.get("inserted", 0)) / max(time.monotonic() - started, 1e-6)
+                print(f"\r{collection_name}: 已导入 {inserted} 条（{rate:.0f} 条/秒）", end="", flush=True)
+
+    tasks = [asyncio.create_task(writer()) for _ in range(workers)]
+    try:
+        docs = iter_json_documents(path)
+        for index, chunk in enumerate(_iter_chunks(docs, chunk_size)):
+            if index < resume_from:
+                continue
+            chunk = [convert_extended_json(doc) for doc in chunk]
+            if transform is not None:
+                chunk = [transform(doc) for doc in chunk]
+            chunk = _assign_ids(chunk, os.path.basename(path), index)
+            await queue.put((index, chunk))
+            if failure is not None:
+                break
+        for _ in tasks:
+            await queue.put(None)
+        await asyncio.gather(*tasks)
+        if failure is not None:
+            raise failure
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        raise
+
+    await progress.update_one(
+        {"_id": key},
+        {"$set": {"completed": True, "inserted": inserted, "updated_at": datetime.now(timezone.utc)}},
+        upsert=True,
+    )
+    print(f"\n{collection_name}: 成功导入 {inserted} 条数据")
+    return inserted
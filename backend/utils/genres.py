@@ -0,0 +1,99 @@
+import re
+from collections import Counter
+from datetime import datetime
+from typing import Iterable, List, Optional
+
+from pymongo import UpdateOne
+
+# movie_stats: {_id: "genres", counts: {类型: 电影数}, updated_at}
+MOVIE_STATS = "movie_stats"
+GENRE_STATS_ID = "genres"
+
+# 数据集中的 genre 以 ; 分隔，兼容全角分号、逗号、顿号和斜杠
+_separator_re = re.compile(r"[;；,，、/|]")
+# 类型名作为 counts 的字段名，不能包含 . 或以 $ 开头
+_invalid_key_re = re.compile(r"[.$]")
+
+
+def normalize_genres(genre) -> List[str]:
+    """把 genre 字符串（或已经是数组的值）转换为去重后的类型数组，保持原顺序"""
+    if not genre:
+        return []
+    parts = genre if isinstance(genre, list) else _separator_re.split(str(genre))
+    genres = []
+    for part in parts:
+        part = _invalid_key_re.sub("", str(part)).strip()
+        if part and part not in genres:
+            genres.append(part)
+    return genres
+
+
+def add_genres_field(movie: dict) -> dict:
+    # 保留原 genre 字符串以兼容现有响应，另存一份可建多键索引的 genres 数组
+    movie["genres"] = normalize_genres(movie.get("genre"))
+    return movie
+
+
+async def record_genres(db, genres_lists: Iterable[List[str]], sign: int = 1):
+    """电影写入（sign=1）或删除（sign=-1）时增量更新类型统计；修改电影类型时先减旧值再加新值"""
+    counts = Counter()
+    for genres in genres_lists:
+        counts.update(genres)
+    if not counts:
+        return
+    await db[MOVIE_STATS].update_one(
+        {"_id": GENRE_STATS_ID},
+        {
+            "$inc": {f"counts.{genre}": sign * count for genre, count in counts.items()},
+            "$set": {"updated_at": datetime.utcnow()},
+        },
+        upsert=True,
+    )
+
+
+async def rebuild_genre_stats(db) -> dict:
+    """按 genres 字段全量重新统计（批量导入后使用）"""
+    pipeline = [
+        {"$unwind": "$genres"},
+        {"$group": {"_id": "$genres", "count": {"$sum": 1}}},
+    ]
+    counts = {doc["_id"]: doc["count"] async for doc in db.movies.aggregate(pipeline)}
+    await db[MOVIE_STATS].replace_one(
+        {"_id": GENRE_STATS_ID},
+        {"counts": counts, "updated_at": datetime.utcnow()},
+        upsert=True,
+    )
+    return counts
+
+
+async def backfill_genres(db, batch_size: int = 1000) -> int:
+    """为缺少 genres 字段的电影补齐数组，并把它们计入类型统计"""
+    updated = 0
+    requests = []
+    batch_genres = []
+    async for movie in db.movies.find({"genres": {"$exists": False}}, {"genre": 1}):
+        genres = normalize_genres(movie.get("genre"))
+        requests.append(UpdateOne({"_id": movie["_id"]}, {"$set": {"genres": genres}}))
+        batch_genres.append(genres)
+        if len(requests) >= batch_size:
+            await db.movies.bulk_write(requests, ordered=False)
+            await record_genres(db, batch_genres)
+            updated += len(requests)
+            requests, batch_genres = [], []
+    if requests:
+        await db.movies.bulk_write(requests, ordered=False)
+        await record_genres(db, batch_genres)
+        updated += len(requests)
+    return updated
+
+
+async def get_genre_counts(db, limit: Optional[int] = None) -> List[dict]:
+    """读取类型统计文档，按电影数降序返回 [{_id: 类型, count}]"""
+    stats = await db[MOVIE_STATS].find_one({"_id": GENRE_STATS_ID})
+    counts = stats["counts"] if stats else await rebuild_genre_stats(db)
+    genres = sorted(
+        ({"_id": genre, "count": count} for genre, count in counts.items() if count > 0),
+        key=lambda item: item["count"],
+        reverse=True,
+    )
+    return genres[:limit] if limit else genres
@@ -0,0 +1,89 @@
+import asyncio
+import base64
+import hashlib
+import io
+from typing import Optional, Tuple
+
+from bson import Binary
+
+from config import THUMBNAIL_SIZE
+
+# movie_images: {_id: movie_id, version, full: {data, content_type, etag}, thumb: {...}}
+IMAGES = "movie_images"
+IMAGE_SIZES = ("thumb", "full")
+
+
+def image_url(movie_id: int, size: str = "thumb", version: Optional[str] = None) -> str:
+    # 带版本号的地址内容不可变，可以被浏览器长期缓存
+    url = f"/api/movies/{movie_id}/image?size={size}"
+    return f"{url}&v={version}" if version else url
+
+
+def _content_type(image_type: str) -> str:
+    image_type = (image_type or "webp").lower()
+    return image_type if "/" in image_type else f"image/{image_type}"
+
+
+def _variant(data: bytes, content_type: str) -> dict:
+    return {
+        "data": Binary(data),
+        "content_type": content_type,
+        "etag": f'"{hashlib.sha256(data).hexdigest()[:32]}"',  # 强 ETag：内容字节的哈希
+    }
+
+
+def generate_variants(img: dict) -> dict:
+    """解码内嵌的 base64 海报，生成原图和缩略图两种尺寸"""
+    from PIL import Image as PILImage
+
+    full = base64.b64decode(img["content"])
+    with PILImage.open(io.BytesIO(full)) as image:
+        image.thumbnail(THUMBNAIL_SIZE)
+        if image.mode not in ("RGB", "RGBA"):
+            image = image.convert("RGB")
+        buffer = io.BytesIO()
+        image.save(buffer, format="WEBP", quality=80)
+    variants = {
+        "full": _variant(full, _content_type(img.get("type"))),
+        "thumb": _variant(buffer.getvalue(), "image/webp"),
+    }
+    variants["version"] = variants["full"]["etag"].strip('"')[:12]
+    return variants
+
+
+async def store_movie_images(db, movie: dict) -> Optional[dict]:
+    img = movie.get("img") or {}
+    if not img.get("content"):
+        return None
+    variants = await asyncio.to_thread(generate_variants, img)
+    await db[IMAGES].replace_one({"_id": movie["movie_id"]}, variants, upsert=True)
+    # 列表接口只读取 img_version 拼接图片地址，不再读取图片内容
+    await db.movies.update_one({"movie_id": movie["movie_id"]}, {"$set": {"img_version": variants["version"]}})
+    return variants
+
+
+async def get_movie_image(db, movie_id: int, size: str) -> Optional[Tuple[bytes, str, str, str]]:
+    """返回 (图片字节, Content-Type, ETag, 版本号)；尚未预生成时即时生成并保存"""
+    doc = await db[IMAGES].find_one({"_id": movie_id}, {size: 1, "version": 1})
+    if doc is None:
+        movie = await db.movies.find_one({"movie_id": movie_id}, {"movie_id": 1, "img": 1})
+        if movie is None:
+            return None
+        doc = await store_movie_images(db, movie)
+        if doc is None:
+            return None
+    variant = doc[size]
+    return bytes(variant["data"]), variant["content_type"], variant["etag"], doc["version"]
+
+
+async def generate_missing_images(db) -> int:
+    """为尚未生成缩略图的电影批量预生成图片"""
+    count = 0
+    query = {"img.content": {"$exists": True}, "img_version": {"$exists": False}}
+    async for movie in db.movies.find(query, {"movie_id": 1, "img": 1}):
+        try:
+            if await store_movie_images(db, movie):
+                count += 1
+        except Exception as e:
+            print(f"电影 {movie.get('movie_id')} 海报处理失败: {e}")
+    return count
@@ -0,0 +1,115 @@
+import os
+from abc import ABC, abstractmethod
+from typing import Dict
+
+import numpy as np
+
+# 模型输入字段，tokenizer 输出与 ONNX 图的输入名保持一致
+MODEL_INPUT_NAMES = ["input_ids", "attention_mask", "token_type_ids"]
+
+
+class InferenceBackend(ABC):
+    """统一的推理后端接口：输入 numpy 编码，输出 numpy logits"""
+
+    name = "base"
+
+    @abstractmethod
+    def __call__(self, encodings: Dict[str, np.ndarray]) -> np.ndarray:
+        """对一批编码执行前向计算，返回 [batch, num_labels] 的 logits"""
+
+
+class TorchBackend(InferenceBackend):
+    """PyTorch fp32 推理"""
+
+    name = "torch"
+
+    def __init__(self, model_path: str):
+        import torch
+        from transformers import BertForSequenceClassification
+
+        self.torch = torch
+        self.model = BertForSequenceClassification.from_pretrained(model_path)
+        self.model.eval()
+
+    def __call__(self, encodings):
+        inputs = {
+            name: self.torch.from_numpy(np.ascontiguousarray(encodings[name], dtype=np.int64))
+            for name in MODEL_INPUT_NAMES if name in encodings
+        }
+        with self.torch.inference_mode():
+            return self.model(**inputs).logits.numpy()
+
+
+class QuantizedTorchBackend(TorchBackend):
+    """PyTorch 动态 int8 量化：Linear 层权重量化为 int8，激活在运行时量化"""
+
+    name = "torch-int8"
+
+    def __init__(self, model_path: str):
+        super().__init__(model_path)
+        self.model = self.torch.quantization.quantize_dynamic(
+            self.model, {self.torch.nn.Linear}, dtype=self.torch.qint8
+        )
+
+
+class OnnxBackend(InferenceBackend):
+    """ONNX Runtime CPU 推理，模型需先用 scripts/export_onnx.py 导出"""
+
+    name = "onnx"
+
+    def __init__(self, model_path: str, onnx_path: str = None):
+        import onnxruntime as ort
+
+        onnx_path = onnx_path or os.path.join(model_path, "model.onnx")
+        if not os.path.exists(onnx_path):
+            raise FileNotFoundError(f"找不到 ONNX 模型 {onnx_path}，请先运行 scripts/export_onnx.py")
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = ort.InferenceSession(onnx_path, options, providers=["CPUExecutionProvider"])
+        self.input_names = [i.name for i in self.session.get_inputs()]
+
+    def __call__(self, encodings):
+        inputs = {
+            name: np.ascontiguousarray(encodings[name], dtype=np.int64)
+            for name in self.input_names
+        }
+        return self.session.run(None, inputs)[0]
+
+
+BACKENDS = {
+    TorchBackend.name: TorchBackend,
+    QuantizedTorchBackend.name: QuantizedTorchBackend,
+    OnnxBackend.name: OnnxBackend,
+}
+
+
+def load_backend(name: str, model_path: str) -> InferenceBackend:
+    if name not in BACKENDS:
+        raise ValueError(f"未知的推理后端 '{name}'，可选: {', '.join(BACKENDS)}")
+    return BACKENDS[name](model_path)
+
+
+def export_onnx(model_path: str, onnx_path: str = None, opset: int = 14) -> str:
+    """把微调后的模型导出为 batch 和序列长度均为动态维度的 ONNX 图"""
+    import torch
+    from transformers import BertTokenizer, BertForSequenceClassification
+
+    onnx_path = onnx_path or os.path.join(model_path, "model.onnx")
+    tokenizer = BertTokenizer.from_pretrained(model_path)
+    model = BertForSequenceClassification.from_pretrained(model_path)
+    model.eval()
+
+    sample = tokenizer(["这部电影太棒了", "不好看"], return_tensors="pt", padding=True)
+    dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in MODEL_INPUT_NAMES}
+    dynamic_axes["logits"] = {0: "batch"}
+    with torch.no_grad():
+        torch.onnx.export(
+            model,
+            tuple(sample[name] for name in MODEL_INPUT_NAMES),
+            onnx_path,
+            input_names=MODEL_INPUT_NAMES,
+            output_names=["logits"],
+            dynamic_axes=dynamic_axes,
+            opset_version=opset,
+        )
+    return onnx_path
@@ -0,0 +1,126 @@
+import asyncio
+import logging
+from collections import Counter
+from datetime import datetime
+from typing import List
+
+from pymongo import UpdateOne
+
+from utils.segmentation import segment_texts
+
+logger = logging.getLogger(__name__)
+
+# keyword_terms: {_id: 词, tf: 出现次数, df: 包含该词的评论数}
+# keyword_meta:  {_id: "corpus", doc_count}、{_id: "top_keywords", keywords, computed_at}
+TERMS = "keyword_terms"
+META = "keyword_meta"
+
+
+def keyword_counts(tokens: List[str]) -> Counter:
+    """分词结果已去掉停用词和标点，这里再像 extract_tags 一样去掉单字"""
+    return Counter(w for w in tokens if len(w) >= 2)
+
+
+async def record_reviews(db, contents: List[str], sign: int = 1):
+    """评论新增（sign=1）或删除（sign=-1）时增量更新词频与文档频率，一批评论合并为一次写入"""
+    tf = Counter()
+    df = Counter()
+    for tokens in await segment_texts(contents):
+        counts = keyword_counts(tokens)
+        tf.update(counts)
+        df.update(counts.keys())
+    if tf:
+        await db[TERMS].bulk_write([
+            UpdateOne({"_id": word}, {"$inc": {"tf": sign * count, "df": sign * df[word]}}, upsert=True)
+            for word, count in tf.items()
+        ], ordered=False)
+    await db[META].update_one({"_id": "corpus"}, {"$inc": {"doc_count": sign * len(contents)}}, upsert=True)
+
+
+async def record_review(db, content: str, sign: int = 1):
+    await record_reviews(db, [content], sign)
+
+
+async def compute_top_keywords(db, top_k: int = 50) -> List[dict]:
+    meta = await db[META].find_one({"_id": "corpus"}) or {}
+    doc_count = max(meta.get("doc_count", 0), 1)
+    pipeline = [
+        {"$match": {"tf": {"$gt": 0}, "df": {"$gt": 0}}},
+        # TF-IDF：tf * ln(N / df)，与 extract_tags 一样按总词数归一化
+        {"$project": {"tf": 1, "score": {"$multiply": ["$tf", {"$ln": {"$divide": [doc_count + 1, "$df"]}}]}}},
+        {"$sort": {"score": -1}},
+        {"$limit": top_k},
+    ]
+    terms = await db[TERMS].aggregate(pipeline, allowDiskUse=True).to_list(None)
+    total = await db[TERMS].aggregate([
+        {"$match": {"tf": {"$gt": 0}}},
+        {"$group": {"_id": None, "total": {"$sum": "$tf"}}},
+    ]).to_list(None)
+    total_tf = total[0]["total"] if total else 1
+    return [
+        {"word": term["_id"], "weight": round(term["score"] / total_tf * 100, 2)}
+        for term in terms
+    ]
+
+
+async def compact_keyword_stats(db, top_k: int = 50):
+    """清理计数归零的词，并重新计算热门关键词快照"""
+    await db[TERMS].delete_many({"$or": [{"tf": {"$lte": 0}}, {"df": {"$lte": 0}}]})
+    keywords = await compute_top_keywords(db, top_k)
+    await db[META].update_one(
+        {"_id": "top_keywords"},
+        {"$set": {"keywords": keywords, "top_k": top_k, "computed_at": datetime.utcnow()}},
+        upsert=True,
+    )
+    return keywords
+
+
+async def get_top_keywords(db, top_k: int = 50) -> List[dict]:
+    snapshot = await db[META].find_one({"_id": "top_keywords"})
+    if snapshot and snapshot.get("top_k", 0) >= top_k:
+        return snapshot["keywords"][:top_k]
+    return await compact_keyword_stats(db, top_k)
+
+
+async def rebuild_keyword_stats(db, batch_size: int = 1000):
+    """从 reviews 集合全量重建统计（首次部署或数据修复时使用）"""
+    tf = Counter()
+    df = Counter()
+    doc_count = 0
+    async def consume(contents):
+        for tokens in await segment_texts(contents):
+            counts = keyword_counts(tokens)
+            tf.update(counts)
+            df.update(counts.keys())
+
+    contents = []
+    async for review in db.reviews.find({}, {"content": 1}, batch_size=batch_size):
+        contents.append(review.get("content", ""))
+        doc_count += 1
+        if len(contents) >= batch_size:
+            await consume(contents)
+            contents = []
+    if contents:
+        await consume(contents)
+
+    await db[TERMS].delete_many({})
+    words = list(tf)
+    for start in range(0, len(words), batch_size):
+        await db[TERMS].insert_many(
+            [{"_id": w, "tf": tf[w], "df": df[w]} for w in words[start:start + batch_size]],
+            ordered=False,
+        )
+    await db[META].update_one({"_id": "corpus"}, {"$set": {"doc_count": doc_count}}, upsert=True)
+    return doc_count, len(words)
+
+
+async def run_compaction_loop(get_db, interval_seconds: float, top_k: int = 50):
+    while True:
+        await asyncio.sleep(interval_seconds)
+        db = get_db()
+        if db is None:
+            continue
+        try:
+            await compact_keyword_stats(db, top_k)
+        except Exception:
+            logger.exception("关键词统计压缩失败")
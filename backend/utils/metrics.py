@@ -0,0 +1,249 @@
+import bisect
+import contextvars
+import json
+import logging
+import threading
+import time
+from collections import defaultdict
+from typing import Dict, Optional, Tuple
+
+from pymongo import monitoring
+
+logger = logging.getLogger(__name__)
+
+# 延迟分桶（秒），与 Prometheus 客户端默认分桶一致并补充了更细的低延迟档位
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labels: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self.lock = threading.Lock()  # mongo 监听器在 motor 的线程池中回调
+
+    def header(self):
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.values: Dict[tuple, float] = defaultdict(float)
+
+    def inc(self, *labels, amount: float = 1):
+        with self.lock:
+            self.values[labels] += amount
+
+    def collect(self):
+        lines = self.header()
+        with self.lock:
+            for labels, value in sorted(self.values.items()):
+                lines.append(f"{self.name}{_format_labels(self.labels, labels)} {_format_value(value)}")
+        return lines
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, *labels, amount: float = 1):
+        self.inc(*labels, amount=-amount)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labels: Tuple[str, ...] = (), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(buckets)
+        # 标签 -> [各分桶计数（非累计）, 总和, 总数]
+        self.values: Dict[tuple, list] = {}
+
+    def observe(self, value: float, *labels):
+        index = bisect.bisect_left(self.buckets, value)
+        with self.lock:
+            state = self.values.get(labels)
+            if state is None:
+                state = self.values[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    def collect(self):
+        lines = self.header()
+        with self.lock:
+            for labels, (counts, total, count) in sorted(self.values.items()):
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                    cumulative += bucket_count
+                    le = _format_labels(self.labels, labels, f'le="{_format_value(bound)}"')
+                    lines.append(f"{self.name}_bucket{le} {cumulative}")
+                label_str = _format_labels(self.labels, labels)
+                lines.append(f"{self.name}_sum{label_str} {_format_value(total)}")
+                lines.append(f"{self.name}_count{label_str} {count}")
+        return lines
+
+
+REQUESTS = Counter("http_requests_total", "HTTP 请求数", ("method", "route", "status"))
+REQUEST_LATENCY = Histogram("http_request_duration_seconds", "HTTP 请求耗时", ("method", "route"))
+# 路由在请求处理完成后才能确定，正在处理的请求数只按方法区分
+REQUESTS_IN_FLIGHT = Gauge("http_requests_in_flight", "正在处理的 HTTP 请求数", ("method",))
+REQUEST_MONGO_TIME = Histogram("http_request_mongo_seconds", "单个请求内 MongoDB 命令耗时之和", ("method", "route"))
+REQUEST_MONGO_COMMANDS = Counter(
+    "http_request_mongo_commands_total", "按请求路由归属的 MongoDB 命令数", ("route", "collection", "command"))
+REQUEST_MONGO_COMMAND_TIME = Counter(
+    "http_request_mongo_command_seconds_total", "按请求路由归属的 MongoDB 命令耗时", ("route", "collection", "command"))
+MONGO_COMMANDS = Counter("mongo_commands_total", "MongoDB 命令数", ("collection", "command", "status"))
+MONGO_COMMAND_LATENCY = Histogram("mongo_command_duration_seconds", "MongoDB 命令耗时", ("collection", "command"))
+
+REGISTRY = [
+    REQUESTS, REQUEST_LATENCY, REQUESTS_IN_FLIGHT, REQUEST_MONGO_TIME, REQUEST_MONGO_COMMANDS,
+    REQUEST_MONGO_COMMAND_TIME, MONGO_COMMANDS, MONGO_COMMAND_LATENCY,
+]
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def render_metrics() -> str:
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.collect())
+    return "\n".join(lines) + "\n"
+
+
+class RequestStats:
+    """单个请求的耗时分解，通过 contextvar 传递给 mongo 监听器"""
+
+    def __init__(self, method: str, route: str = "unmatched"):
+        self.method = method
+        self.route = route
+        self.start = time.perf_counter()
+        self.mongo_seconds = 0.0
+        # (集合, 命令) -> [次数, 耗时]
+        self.commands: Dict[Tuple[str, str], list] = defaultdict(lambda: [0, 0.0])
+        self.lock = threading.Lock()
+
+    def add_command(self, collection: str, command: str, seconds: float):
+        with self.lock:
+            self.mongo_seconds += seconds
+            entry = self.commands[(collection, command)]
+            entry[0] += 1
+            entry[1] += seconds
+
+    def breakdown(self, total: float) -> dict:
+        # 并发执行的命令耗时会重叠，其余部分按 0 截断
+        other = max(total - self.mongo_seconds, 0.0)
+        return {
+            "total_ms": round(total * 1000, 2),
+            "mongo_ms": round(self.mongo_seconds * 1000, 2),
+            "python_ms": round(other * 1000, 2),
+            "mongo_commands": {
+                f"{collection}.{command}": {"count": count, "ms": round(seconds * 1000, 2)}
+                for (collection, command), (count, seconds) in self.commands.items()
+            },
+        }
+
+
+_current_request: contextvars.ContextVar[Optional[RequestStats]] = contextvars.ContextVar(
+    "current_request_stats", default=None)
+
+
+def begin_request(method: str) -> RequestStats:
+    stats = RequestStats(method)
+    _current_request.set(stats)
+    REQUESTS_IN_FLIGHT.inc(method)
+    return stats
+
+
+def end_request(stats: RequestStats, status: int, slow_request_ms: float = 0):
+    total = time.perf_counter() - stats.start
+    REQUESTS_IN_FLIGHT.dec(stats.method)
+    REQUESTS.inc(stats.method, stats.route, str(status))
+    REQUEST_LATENCY.observe(total, stats.method, stats.route)
+    REQUEST_MONGO_TIME.observe(stats.mongo_seconds, stats.method, stats.route)
+    for (collection, command), (count, seconds) in stats.commands.items():
+        REQUEST_MONGO_COMMANDS.inc(stats.route, collection, command, amount=count)
+        REQUEST_MONGO_COMMAND_TIME.inc(stats.route, collection, command, amount=seconds)
+    if slow_request_ms and total * 1000 >= slow_request_ms:
+        logger.warning("慢请求 %s %s %s status=%s", stats.method, stats.route,
+                       json.dumps(stats.breakdown(total), ensure_ascii=False), status)
+
+
+class MongoCommandListener(monitoring.CommandListener):
+    """统计每个集合、每种命令的次数与耗时，并归属到发起它的 HTTP 请求
+
+    motor 在线程池中执行 pymongo 调用时会复制当前 contextvars，
+    因此回调里能拿到发起请求的 RequestStats。
+    """
+
+    # 不属于具体集合的命令
+    _ignored = {"isMaster", "ismaster", "hello", "ping", "saslStart", "saslContinue", "endSessions", "killCursors"}
+
+    def __init__(self):
+        self._pending: Dict[tuple, str] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(event):
+        return event.connection_id, event.request_id, event.operation_id
+
+    def started(self, event):
+        if event.command_name in self._ignored:
+            return
+        target = event.command.get(event.command_name)
+        if event.command_name == "getMore":
+            target = event.command.get("collection")
+        collection = target if isinstance(target, str) else event.database_name
+        with self._lock:
+            self._pending[self._key(event)] = collection
+
+    def _finish(self, event, status: str):
+        with self._lock:
+            collection = self._pending.pop(self._key(event), None)
+        if collection is None:
+            return
+        seconds = event.duration_micros / 1e6
+        MONGO_COMMANDS.inc(collection, event.command_name, status)
+        MONGO_COMMAND_LATENCY.observe(seconds, collection, event.command_name)
+        stats = _current_request.get()
+        if stats is not None:
+            stats.add_command(collection, event.command_name, seconds)
+
+    def succeeded(self, event):
+        self._finish(event, "ok")
+
+    def failed(self, event):
+        self._finish(event, "error")
+
+
+mongo_command_listener = MongoCommandListener()
+
+
+def route_template(scope) -> str:
+    """用路由模板（如 /api/movies/{movie_id}）作为标签，避免路径参数导致标签数量膨胀
+
+    FastAPI 匹配到路由后会把它写入 scope["route"]，需在请求处理完成后读取。
+    """
+    route = scope.get("route")
+    return getattr(route, "path", None) or "unmatched"
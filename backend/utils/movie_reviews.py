@@ -0,0 +1,60 @@
+from typing import List, Optional, Tuple
+
+from pymongo import ReplaceOne
+
+from utils.pagination import keyset_filter, paginate
+
+# movie_reviews: 数据集自带的电影评论，从 movies.reviews 数组迁移而来
+# {_id: "movie_id:seq", movie_id, seq: 在原数组中的位置, review_id, uname, gender, profileUrl, content, ...}
+MOVIE_REVIEWS = "movie_reviews"
+MOVIE_REVIEW_SORT = [("seq", 1)]
+
+
+def movie_review_docs(movie: dict) -> List[dict]:
+    return [
+        {**review, "_id": f"{movie['movie_id']}:{seq}", "movie_id": movie["movie_id"], "seq": seq}
+        for seq, review in enumerate(movie.get("reviews") or [])
+    ]
+
+
+async def migrate_embedded_reviews(db, batch_size: int = 1000) -> Tuple[int, int]:
+    """把 movies.reviews 数组拆分到 movie_reviews 集合，可重复执行
+
+    以 movie_id:seq 作为 _id 覆盖写入，中断后重新执行不会产生重复评论；
+    每部电影写完评论后才删除数组，并记录 review_count。
+    """
+    movies = 0
+    reviews = 0
+    query = {"reviews": {"$exists": True}}
+    async for movie in db.movies.find(query, {"movie_id": 1, "reviews": 1}, batch_size=10):
+        docs = movie_review_docs(movie)
+        for start in range(0, len(docs), batch_size):
+            await db[MOVIE_REVIEWS].bulk_write(
+                [ReplaceOne({"_id": doc["_id"]}, doc, upsert=True) for doc in docs[start:start + batch_size]],
+                ordered=False,
+            )
+        # 电影重新导入后评论变少时，清理多出来的旧评论
+        await db[MOVIE_REVIEWS].delete_many({"movie_id": movie["movie_id"], "seq": {"$gte": len(docs)}})
+        await db.movies.update_one(
+            {"_id": movie["_id"]},
+            # reviews_version 变化使词云等按评论版本缓存的结果失效
+            {"$unset": {"reviews": ""}, "$set": {"review_count": len(docs)}, "$inc": {"reviews_version": 1}},
+        )
+        movies += 1
+        reviews += len(docs)
+    return movies, reviews
+
+
+async def get_movie_review_page(db, movie_id: int, cursor: Optional[str] = None,
+                                limit: int = 20) -> Tuple[List[dict], Optional[str]]:
+    # 使用 (movie_id, seq) 唯一索引，按原数组顺序分页
+    query = {"movie_id": movie_id, **keyset_filter(cursor, MOVIE_REVIEW_SORT)}
+    docs = await db[MOVIE_REVIEWS].find(query).sort(MOVIE_REVIEW_SORT).limit(limit + 1).to_list(limit + 1)
+    return paginate(docs, limit, MOVIE_REVIEW_SORT)
+
+
+async def get_movie_review_contents(db, movie_id: int) -> List[dict]:
+    """情感统计、词云只需要评论内容"""
+    return await db[MOVIE_REVIEWS].find(
+        {"movie_id": movie_id}, {"_id": 0, "content": 1}
+    ).sort(MOVIE_REVIEW_SORT).to_list(None)
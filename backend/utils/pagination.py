@@ -0,0 +1,68 @@
+import base64
+import time
+from typing import List, Optional, Sequence, Tuple
+
+from bson import json_util
+from fastapi import HTTPException, Response
+
+# 列表接口通过响应头返回下一页游标，响应体保持原有结构
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+SortSpec = Sequence[Tuple[str, int]]
+
+# 估算总数缓存：集合名 -> (过期时间, 数量)
+_count_cache = {}
+
+
+def encode_cursor(doc: dict, sort: SortSpec) -> str:
+    values = {field: doc.get(field) for field, _ in sort}
+    return base64.urlsafe_b64encode(json_util.dumps(values).encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(cursor: str, sort: SortSpec) -> dict:
+    try:
+        values = json_util.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+    except Exception:
+        raise HTTPException(status_code=400, detail="无效的分页游标")
+    if not isinstance(values, dict) or any(field not in values for field, _ in sort):
+        raise HTTPException(status_code=400, detail="无效的分页游标")
+    return values
+
+
+def keyset_filter(cursor: Optional[str], sort: SortSpec) -> dict:
+    """生成“排在游标之后”的查询条件，例如 (created_at, _id) 降序时：
+    created_at < c 或 (created_at == c 且 _id < id)
+    """
+    if not cursor:
+        return {}
+    values = decode_cursor(cursor, sort)
+    clauses = []
+    for i, (field, direction) in enumerate(sort):
+        clause = {prev: values[prev] for prev, _ in sort[:i]}
+        clause[field] = {"$lt" if direction < 0 else "$gt": values[field]}
+        clauses.append(clause)
+    return clauses[0] if len(clauses) == 1 else {"$or": clauses}
+
+
+def paginate(docs: List[dict], limit: int, sort: SortSpec) -> Tuple[List[dict], Optional[str]]:
+    """查询时多取一条（limit + 1）以判断是否还有下一页"""
+    if len(docs) <= limit:
+        return docs, None
+    docs = docs[:limit]
+    return docs, encode_cursor(docs[-1], sort)
+
+
+def set_next_cursor(response: Response, next_cursor: Optional[str]):
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+
+
+async def estimated_count(collection, ttl_seconds: float = 60) -> int:
+    """基于集合元数据的估算总数，并在进程内缓存，避免每页都做全量计数"""
+    now = time.monotonic()
+    cached = _count_cache.get(collection.name)
+    if cached is not None and cached[0] > now:
+        return cached[1]
+    count = await collection.estimated_document_count()
+    _count_cache[collection.name] = (now + ttl_seconds, count)
+    return count
@@ -0,0 +1,182 @@
+import asyncio
+import logging
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from pymongo.errors import BulkWriteError, PyMongoError
+
+from config import (
+    REVIEW_QUEUE_MAX_SIZE,
+    REVIEW_BATCH_SIZE,
+    REVIEW_BATCH_MAX_WAIT_MS,
+    REVIEW_WRITE_RETRIES,
+    REVIEW_WRITE_RETRY_BASE_MS,
+)
+from database.database import get_database
+from utils.keyword_stats import record_reviews
+from utils.review_stats import record_review_stats
+from utils.sentiment import collect_batch, is_sentiment_available, classify_texts
+
+logger = logging.getLogger(__name__)
+
+# 评论处理状态
+STATUS_PENDING = "pending"    # 已接收，等待打分写入
+STATUS_SCORED = "scored"      # 已由模型打分并写入
+STATUS_UNSCORED = "unscored"  # 模型不可用，已写入但没有情感标签
+STATUS_FAILED = "failed"      # 重试后仍未能写入数据库
+
+DUPLICATE_KEY = 11000
+
+
+class ReviewQueueFull(Exception):
+    pass
+
+
+class ReviewIngestQueue:
+    """评论写入队列：接口只负责入队，后台协程批量打分并一次性写入"""
+
+    def __init__(self, max_size: int = 10000, batch_size: int = 64, max_wait_ms: float = 50,
+                 write_retries: int = 3, retry_base_ms: float = 200):
+        self.max_size = max_size
+        self.batch_size = batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.write_retries = write_retries
+        self.retry_base = retry_base_ms / 1000
+        self.queue: Optional[asyncio.Queue] = None
+        self.worker: Optional[asyncio.Task] = None
+        # 已入队但尚未写入数据库的评论：review_id -> 评论
+        self.pending: Dict[str, dict] = {}
+        # 重试后仍写入失败的评论，状态接口返回 failed；最多保留 max_size 条，超出时丢弃最早的
+        self.failed: "OrderedDict[str, dict]" = OrderedDict()
+
+    async def start(self):
+        self.queue = asyncio.Queue(maxsize=self.max_size)
+        self.worker = asyncio.create_task(self._run())
+
+    async def stop(self):
+        # 放入结束标记，后台协程写完队列中剩余的评论后退出
+        if self.worker is None:
+            return
+        await self.queue.put(None)
+        await self.worker
+        self.worker = None
+
+    def submit(self, review: dict):
+        try:
+            self.queue.put_nowait(review)
+        except asyncio.QueueFull:
+            raise ReviewQueueFull()
+        self.pending[review["_id"]] = review
+
+    def qsize(self) -> int:
+        return self.queue.qsize() if self.queue is not None else 0
+
+    async def _process(self, batch):
+        db = get_database()
+        contents = [review["content"] for review in batch]
+        status = STATUS_UNSCORED
+        if is_sentiment_available():
+            try:
+                results = await classify_texts(contents)
+                for review, result in zip(batch, results):
+                    review["sentiment"] = result["label"]
+                    review["sentiment_confidence"] = result["confidence"]
+                status = STATUS_SCORED
+            except Exception:
+                logger.exception("评论情感打分失败，按未打分写入")
+        for review in batch:
+            review["status"] = status
+        inserted, failed = await self._insert(db, batch)
+        for review in inserted:
+            self.pending.pop(review["_id"], None)
+        self._mark_failed(failed)
+        if not inserted:
+            return
+        # 只统计实际写入的评论；统计更新失败不影响评论本身
+        try:
+            await record_reviews(db, [review["content"] for review in inserted])
+            await record_review_stats(db, inserted)
+        except Exception:
+            logger.exception(f"更新 {len(inserted)} 条评论的关键词及按天统计失败")
+
+    async def _insert(self, db, batch) -> Tuple[List[dict], List[dict]]:
+        """带指数退避重试的批量写入，返回 (已写入, 仍失败) 两组评论
+
+        ordered=False 时部分失败的 BulkWriteError 会列出失败文档的下标，其余文档已写入；
+        重试时遇到重复键说明该评论在上一次结果未知的尝试中已写入，同样算作已写入。
+        """
+        inserted = []
+        remaining = list(batch)
+        for attempt in range(self.write_retries + 1):
+            try:
+                await db.reviews.insert_many(remaining, ordered=False)
+                inserted.extend(remaining)
+                return inserted, []
+            except BulkWriteError as e:
+                failed_indexes = {
+                    error["index"] for error in e.details.get("writeErrors", [])
+                    if error.get("code") != DUPLICATE_KEY
+                }
+                inserted.extend(r for i, r in enumerate(remaining) if i not in failed_indexes)
+                remaining = [r for i, r in enumerate(remaining) if i in failed_indexes]
+                if not remaining:
+                    return inserted, []
+                logger.warning(f"评论批量写入部分失败（第 {attempt + 1} 次），{len(remaining)} 条待重试")
+            except PyMongoError as e:
+                logger.warning(f"评论批量写入失败（第 {attempt + 1} 次），{len(remaining)} 条待重试: {e}")
+            if attempt < self.write_retries:
+                await asyncio.sleep(self.retry_base * 2 ** attempt)
+        return inserted, remaining
+
+    def _mark_failed(self, reviews: List[dict]):
+        if not reviews:
+            return
+        logger.error(f"评论重试后仍写入失败，{len(reviews)} 条标记为 failed")
+        for review in reviews:
+            review["status"] = STATUS_FAILED
+            self.pending.pop(review["_id"], None)
+            self.failed[review["_id"]] = review
+        while len(self.failed) > self.max_size:
+            self.failed.popitem(last=False)
+
+    async def _run(self):
+        stopping = False
+        while not stopping:
+            batch = await collect_batch(self.queue, self.batch_size, self.max_wait)
+            stopping = any(review is None for review in batch)
+            batch = [review for review in batch if review is not None]
+            if stopping:
+                while not self.queue.empty():
+                    review = self.queue.get_nowait()
+                    if review is not None:
+                        batch.append(review)
+            for start in range(0, len(batch), self.batch_size):
+                chunk = batch[start:start + self.batch_size]
+                try:
+                    await self._process(chunk)
+                except Exception:
+                    logger.exception("评论批量处理异常")
+                    self._mark_failed([review for review in chunk if review["_id"] in self.pending])
+
+
+review_queue: Optional[ReviewIngestQueue] = None
+
+
+async def start_review_queue():
+    global review_queue
+    review_queue = ReviewIngestQueue(
+        REVIEW_QUEUE_MAX_SIZE, REVIEW_BATCH_SIZE, REVIEW_BATCH_MAX_WAIT_MS,
+        REVIEW_WRITE_RETRIES, REVIEW_WRITE_RETRY_BASE_MS,
+    )
+    await review_queue.start()
+
+
+async def stop_review_queue():
+    global review_queue
+    if review_queue is not None:
+        await review_queue.stop()
+        review_queue = None
+
+
+def get_review_queue() -> Optional[ReviewIngestQueue]:
+    return review_queue
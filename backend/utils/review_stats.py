@@ -0,0 +1,153 @@
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Iterable, List, Optional
+
+from dateutil import parser as date_parser
+from pymongo import UpdateOne
+
+# review_daily_stats: 按天汇总的用户评论数与情感计数，评论写入/删除时用 $inc 增量维护
+# {_id: "movie_id:YYYY-MM-DD", movie_id, date: "YYYY-MM-DD", reviews, sentiment: {positive, neutral, negative, unscored}}
+# movie_id 为 None 的文档是全站汇总：_id "all:YYYY-MM-DD" 为每天的汇总，_id "all" 为累计总数（date 为 None）
+REVIEW_DAILY_STATS = "review_daily_stats"
+SENTIMENTS = ["positive", "neutral", "negative"]
+UNSCORED = "unscored"
+DATE_FORMAT = "%Y-%m-%d"
+
+
+def review_date(created_at) -> Optional[str]:
+    # 导入的历史评论中 created_at 可能是字符串
+    if isinstance(created_at, str):
+        try:
+            created_at = date_parser.parse(created_at)
+        except (ValueError, OverflowError):
+            return None
+    if not isinstance(created_at, datetime):
+        return None
+    return created_at.strftime(DATE_FORMAT)
+
+
+def _stats_key(movie_id, date) -> str:
+    if movie_id is None:
+        return f"all:{date}" if date else "all"
+    return f"{movie_id}:{date}"
+
+
+async def record_review_stats(db, reviews: Iterable[dict], sign: int = 1):
+    """评论写入（sign=1）或删除（sign=-1）时更新按天汇总，一批评论合并为一次 bulk_write"""
+    counts = Counter()
+    for review in reviews:
+        date = review_date(review.get("created_at"))
+        if date is None:
+            continue
+        sentiment = review.get("sentiment") if review.get("sentiment") in SENTIMENTS else UNSCORED
+        keys = [(None, date), (None, None)]
+        if review.get("movie_id") is not None:
+            keys.append((review["movie_id"], date))
+        for movie_id, day in keys:
+            counts[(movie_id, day, "reviews")] += 1
+            counts[(movie_id, day, f"sentiment.{sentiment}")] += 1
+    if not counts:
+        return
+
+    updates = {}
+    for (movie_id, date, field), count in counts.items():
+        updates.setdefault((movie_id, date), {})[field] = sign * count
+    await db[REVIEW_DAILY_STATS].bulk_write([
+        UpdateOne(
+            {"_id": _stats_key(movie_id, date)},
+            {"$inc": inc, "$setOnInsert": {"movie_id": movie_id, "date": date}},
+            upsert=True,
+        )
+        for (movie_id, date), inc in updates.items()
+    ], ordered=False)
+
+
+async def rebuild_review_stats(db) -> int:
+    """从 reviews 集合全量重建按天汇总（历史数据回填或导入后使用），返回每部电影每天的文档数
+
+    重建期间新写入的评论可能被重复或遗漏计数，应在无写入时执行。
+    """
+    await db[REVIEW_DAILY_STATS].delete_many({})
+    sentiment_sums = {
+        name: {"$sum": {"$cond": [{"$eq": ["$sentiment", name]}, 1, 0]}} for name in SENTIMENTS
+    }
+    sentiment_sums[UNSCORED] = {"$sum": {"$cond": [{"$in": ["$sentiment", SENTIMENTS]}, 0, 1]}}
+    merge = {"$merge": {"into": REVIEW_DAILY_STATS, "on": "_id", "whenMatched": "replace"}}
+
+    # 1. 每部电影每天：唯一一次扫描 reviews 集合
+    await db.reviews.aggregate([
+        {"$project": {
+            "movie_id": 1,
+            "sentiment": 1,
+            "date": {"$dateToString": {
+                "format": DATE_FORMAT,
+                "date": {"$convert": {"input": "$created_at", "to": "date", "onError": None, "onNull": None}},
+            }},
+        }},
+        {"$match": {"date": {"$ne": None}, "movie_id": {"$ne": None}}},
+        {"$group": {"_id": {"movie_id": "$movie_id", "date": "$date"}, "reviews": {"$sum": 1}, **sentiment_sums}},
+        {"$project": {
+            "_id": {"$concat": [{"$toString": "$_id.movie_id"}, ":", "$_id.date"]},
+            "movie_id": "$_id.movie_id",
+            "date": "$_id.date",
+            "reviews": 1,
+            "sentiment": {name: f"${name}" for name in SENTIMENTS + [UNSCORED]},
+        }},
+        merge,
+    ], allowDiskUse=True).to_list(None)
+
+    # 2. 全站每天与累计：在上一步的汇总结果上聚合，文档数很少
+    day_sums = {name: {"$sum": f"$sentiment.{name}"} for name in SENTIMENTS + [UNSCORED]}
+    await db[REVIEW_DAILY_STATS].aggregate([
+        {"$match": {"movie_id": {"$ne": None}}},
+        {"$group": {"_id": "$date", "reviews": {"$sum": "$reviews"}, **day_sums}},
+        {"$project": {
+            "_id": {"$concat": ["all:", "$_id"]},
+            "movie_id": {"$literal": None},
+            "date": "$_id",
+            "reviews": 1,
+            "sentiment": {name: f"${name}" for name in SENTIMENTS + [UNSCORED]},
+        }},
+        merge,
+    ]).to_list(None)
+    await db[REVIEW_DAILY_STATS].aggregate([
+        {"$match": {"movie_id": None, "date": {"$ne": None}}},
+        {"$group": {"_id": None, "reviews": {"$sum": "$reviews"}, **day_sums}},
+        {"$project": {
+            "_id": {"$literal": "all"},
+            "movie_id": {"$literal": None},
+            "date": {"$literal": None},
+            "reviews": 1,
+            "sentiment": {name: f"${name}" for name in SENTIMENTS + [UNSCORED]},
+        }},
+        merge,
+    ]).to_list(None)
+    return await db[REVIEW_DAILY_STATS].count_documents({"movie_id": {"$ne": None}})
+
+
+def date_range(days: int, end: Optional[datetime] = None) -> List[str]:
+    # 评论的 created_at 为 UTC 时间，日期范围同样按 UTC 计算
+    end = end or datetime.utcnow()
+    return [(end - timedelta(days=i)).strftime(DATE_FORMAT) for i in range(days - 1, -1, -1)]
+
+
+async def get_daily_stats(db, dates: List[str], movie_id: Optional[int] = None) -> dict:
+    """按日期范围读取汇总文档（每天最多一条），返回 {日期: 文档}"""
+    query = {"movie_id": movie_id, "date": {"$gte": dates[0], "$lte": dates[-1]}}
+    docs = await db[REVIEW_DAILY_STATS].find(query).to_list(len(dates))
+    return {doc["date"]: doc for doc in docs}
+
+
+async def get_sentiment_trend(db, days: int = 7, movie_id: Optional[int] = None) -> dict:
+    dates = date_range(days)
+    stats = await get_daily_stats(db, dates, movie_id)
+    trend = {"dates": dates, "reviews": [stats.get(date, {}).get("reviews", 0) for date in dates]}
+    for name in SENTIMENTS:
+        trend[name] = [stats.get(date, {}).get("sentiment", {}).get(name, 0) for date in dates]
+    return trend
+
+
+async def get_sentiment_totals(db) -> dict:
+    totals = await db[REVIEW_DAILY_STATS].find_one({"_id": "all"}) or {}
+    sentiment = totals.get("sentiment", {})
+    return {name: sentiment.get(name, 0) for name in SENTIMENTS}
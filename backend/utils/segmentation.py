@@ -0,0 +1,132 @@
+import asyncio
+import hashlib
+import multiprocessing
+import re
+from collections import Counter, OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional
+
+from config import SEGMENTATION_WORKERS, SEGMENTATION_CHUNK_SIZE, SEGMENTATION_CACHE_SIZE
+
+# 常见中文停用词（虚词、代词、语气词），分词后直接过滤
+STOPWORDS = set("""
+的 了 是 我 你 他 她 它 们 我们 你们 他们 这 那 这个 那个 这些 那些 就 都 也 还 在 和 与 及 或 而 但 但是
+又 很 太 更 最 啊 吧 呢 吗 呀 哦 嗯 哈 着 过 把 被 让 给 对 从 到 向 于 为 为了 因为 所以 如果 虽然 然后
+一个 一部 一种 有 没有 没 不 不是 就是 还是 什么 怎么 怎么样 这么 那么 自己 可以 已经 真的 觉得 感觉 其实
+""".split())
+
+_punctuation_re = re.compile(r"^[\W_]+$")
+
+
+def _init_worker():
+    import jieba
+    jieba.setLogLevel(60)
+    jieba.initialize()  # 每个子进程只加载一次词典
+
+
+def _segment_chunk(texts: List[str]) -> List[List[str]]:
+    import jieba
+    results = []
+    for text in texts:
+        tokens = []
+        for word in jieba.cut(text or ""):
+            word = word.strip()
+            if word and word not in STOPWORDS and not _punctuation_re.match(word):
+                tokens.append(word)
+        results.append(tokens)
+    return results
+
+
+class _LRU(OrderedDict):
+    def __init__(self, max_size: int):
+        super().__init__()
+        self.max_size = max_size
+
+    def get(self, key, default=None):
+        if key in self:
+            self.move_to_end(key)
+            return self[key]
+        return default
+
+    def put(self, key, value):
+        self[key] = value
+        self.move_to_end(key)
+        while len(self) > self.max_size:
+            self.popitem(last=False)
+
+
+_executor: Optional[ProcessPoolExecutor] = None
+# 单条评论分词结果：内容哈希 -> 词列表
+_review_tokens = _LRU(SEGMENTATION_CACHE_SIZE)
+# 单部电影聚合词频：movie_id -> (版本, Counter)
+_movie_counts = _LRU(1000)
+
+
+def _get_executor() -> ProcessPoolExecutor:
+    # jieba 自带的并行模式基于 fork 且不能在服务进程中使用，这里用独立的 spawn 进程池
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(
+            max_workers=SEGMENTATION_WORKERS,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+        )
+    return _executor
+
+
+def shutdown_segmentation():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+def _content_key(text: str) -> str:
+    return hashlib.sha1((text or "").encode("utf-8")).hexdigest()
+
+
+async def segment_texts(texts: List[str]) -> List[List[str]]:
+    """在进程池中分词（已过滤停用词和标点），结果按评论内容缓存"""
+    keys = [_content_key(text) for text in texts]
+    tokens_by_key = {}
+    pending = {}
+    for key, text in zip(keys, texts):
+        cached = _review_tokens.get(key)
+        if cached is not None:
+            tokens_by_key[key] = cached
+        elif key not in pending:
+            pending[key] = text
+
+    if pending:
+        loop = asyncio.get_running_loop()
+        executor = _get_executor()
+        items = list(pending.items())
+        chunks = [items[i:i + SEGMENTATION_CHUNK_SIZE] for i in range(0, len(items), SEGMENTATION_CHUNK_SIZE)]
+        results = await asyncio.gather(*[
+            loop.run_in_executor(executor, _segment_chunk, [text for _, text in chunk])
+            for chunk in chunks
+        ])
+        for chunk, tokens_list in zip(chunks, results):
+            for (key, _), tokens in zip(chunk, tokens_list):
+                _review_tokens.put(key, tokens)
+                tokens_by_key[key] = tokens
+
+    return [tokens_by_key[key] for key in keys]
+
+
+async def movie_word_counts(movie_id: int, reviews: List[dict], version=None) -> Counter:
+    """单部电影的聚合词频；评论数量或版本号变化时重新计算"""
+    key = (len(reviews), version)
+    cached = _movie_counts.get(movie_id)
+    if cached is not None and cached[0] == key:
+        return cached[1]
+
+    counts = Counter()
+    for tokens in await segment_texts([r.get("content", "") for r in reviews]):
+        counts.update(tokens)
+    _movie_counts.put(movie_id, (key, counts))
+    return counts
+
+
+def invalidate_movie_counts(movie_id: int):
+    _movie_counts.pop(movie_id, None)
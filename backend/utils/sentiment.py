@@ -0,0 +1,216 @@
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
+
+import numpy as np
+
+from config import (
+    SENTIMENT_MODEL_PATH,
+    SENTIMENT_BACKEND,
+    SENTIMENT_MAX_LENGTH,
+    SENTIMENT_MAX_BATCH_SIZE,
+    SENTIMENT_MAX_WAIT_MS,
+    SENTIMENT_SUB_BATCH_SIZE,
+    SENTIMENT_CACHE_SIZE,
+    SENTIMENT_CACHE_TTL_SECONDS,
+)
+from database.database import get_database
+from utils.inference_backends import load_backend
+from utils.sentiment_cache import SentimentCache, compute_model_version
+
+logger = logging.getLogger(__name__)
+
+# 情感标签映射（与 bert_experiment/模型训练.py 的标签保持一致）
+id2label = {0: "negative", 1: "neutral", 2: "positive"}
+
+
+class SentimentModel:
+    """加载微调后的 BERT 模型，对一批文本做一次前向推理"""
+
+    def __init__(self, model_path: str, max_length: int = 128, backend: str = "torch", sub_batch_size: int = 16):
+        from transformers import BertTokenizer
+
+        self.model_path = model_path
+        self.max_length = max_length
+        self.sub_batch_size = sub_batch_size
+        self.tokenizer = BertTokenizer.from_pretrained(model_path)
+        self.backend = load_backend(backend, model_path)
+        # 不同后端的输出存在微小差异，版本号中包含后端名，避免缓存混用
+        self.version = f"{compute_model_version(model_path)}-{self.backend.name}"
+
+    def predict(self, texts: List[str]) -> List[dict]:
+        # 按长度排序后分块推理，每块只填充到块内最长文本，最后恢复原始顺序
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+        results = [None] * len(texts)
+        for start in range(0, len(order), self.sub_batch_size):
+            indices = order[start:start + self.sub_batch_size]
+            chunk = self._predict_batch([texts[i] for i in indices])
+            for i, result in zip(indices, chunk):
+                results[i] = result
+        return results
+
+    def _predict_batch(self, texts: List[str]) -> List[dict]:
+        # padding=True 只填充到本批次最长文本，而不是 max_length
+        inputs = self.tokenizer(
+            texts,
+            return_tensors="np",
+            padding=True,
+            truncation=True,
+            max_length=self.max_length,
+        )
+        probabilities = softmax(self.backend(inputs))
+        results = []
+        for probs in probabilities.tolist():
+            predicted_class_id = max(range(len(probs)), key=probs.__getitem__)
+            results.append({
+                "label": id2label[predicted_class_id],
+                "confidence": probs[predicted_class_id],
+                "probabilities": {id2label[i]: p for i, p in enumerate(probs)},
+            })
+        return results
+
+
+def softmax(logits: np.ndarray) -> np.ndarray:
+    exp = np.exp(logits - logits.max(axis=-1, keepdims=True))
+    return exp / exp.sum(axis=-1, keepdims=True)
+
+
+async def collect_batch(queue: asyncio.Queue, max_size: int, max_wait: float) -> list:
+    """阻塞等待第一条，然后在 max_wait 秒内尽量凑满一个批次"""
+    batch = [await queue.get()]
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + max_wait
+    while len(batch) < max_size:
+        timeout = deadline - loop.time()
+        if timeout <= 0:
+            break
+        try:
+            batch.append(await asyncio.wait_for(queue.get(), timeout))
+        except asyncio.TimeoutError:
+            break
+    return batch
+
+
+class MicroBatcher:
+    """把并发请求中的文本合并成微批次，交给模型一次性推理"""
+
+    def __init__(self, predict_fn, max_batch_size: int = 32, max_wait_ms: float = 10):
+        self.predict_fn = predict_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.queue: Optional[asyncio.Queue] = None
+        self.worker: Optional[asyncio.Task] = None
+        # 单线程执行器：推理串行进行，torch 自身负责算子内并行
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sentiment")
+
+    async def start(self):
+        self.queue = asyncio.Queue()
+        self.worker = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self.worker is not None:
+            self.worker.cancel()
+            try:
+                await self.worker
+            except asyncio.CancelledError:
+                pass
+        self.executor.shutdown(wait=False)
+
+    async def submit(self, texts: List[str]) -> List[dict]:
+        loop = asyncio.get_running_loop()
+        futures = []
+        for text in texts:
+            future = loop.create_future()
+            await self.queue.put((text, future))
+            futures.append(future)
+        return list(await asyncio.gather(*futures))
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await collect_batch(self.queue, self.max_batch_size, self.max_wait)
+            # 跳过已被取消的请求（例如客户端断开）
+            batch = [(text, future) for text, future in batch if not future.done()]
+            if not batch:
+                continue
+            texts = [text for text, _ in batch]
+            try:
+                results = await loop.run_in_executor(self.executor, self.predict_fn, texts)
+            except Exception as e:
+                logger.exception("情感分析推理失败")
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            for (_, future), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+
+
+sentiment_batcher: Optional[MicroBatcher] = None
+sentiment_cache: Optional[SentimentCache] = None
+
+
+async def start_sentiment_service():
+    """启动时加载一次模型；模型不存在时只记录警告，相关接口返回 503"""
+    global sentiment_batcher, sentiment_cache
+    try:
+        model = SentimentModel(
+            SENTIMENT_MODEL_PATH,
+            max_length=SENTIMENT_MAX_LENGTH,
+            backend=SENTIMENT_BACKEND,
+            sub_batch_size=SENTIMENT_SUB_BATCH_SIZE,
+        )
+    except Exception as e:
+        logger.warning(f"无法从 '{SENTIMENT_MODEL_PATH}' 加载情感分析模型: {e}")
+        return
+    db = get_database()
+    sentiment_cache = SentimentCache(
+        db.sentiment_cache if db is not None else None,
+        model.version,
+        max_size=SENTIMENT_CACHE_SIZE,
+        ttl_seconds=SENTIMENT_CACHE_TTL_SECONDS,
+    )
+    await sentiment_cache.init()
+    sentiment_batcher = MicroBatcher(
+        model.predict,
+        max_batch_size=SENTIMENT_MAX_BATCH_SIZE,
+        max_wait_ms=SENTIMENT_MAX_WAIT_MS,
+    )
+    await sentiment_batcher.start()
+    logger.info(f"从 '{SENTIMENT_MODEL_PATH}' 加载情感分析模型成功（版本 {model.version}）")
+
+
+async def stop_sentiment_service():
+    global sentiment_batcher, sentiment_cache
+    if sentiment_batcher is not None:
+        await sentiment_batcher.stop()
+        sentiment_batcher = None
+    sentiment_cache = None
+
+
+def is_sentiment_available() -> bool:
+    return sentiment_batcher is not None
+
+
+async def classify_texts(texts: List[str]) -> List[dict]:
+    """先查缓存，只把未命中且去重后的文本送入微批次推理"""
+    keys = [sentiment_cache.key(text) for text in texts]
+    cached = await sentiment_cache.get_many(list(dict.fromkeys(keys)))
+
+    pending = {}
+    for key, text in zip(keys, texts):
+        if key not in cached and key not in pending:
+            pending[key] = text
+    if pending:
+        results = await sentiment_batcher.submit(list(pending.values()))
+        computed = dict(zip(pending.keys(), results))
+        await sentiment_cache.set_many(computed)
+        cached.update(computed)
+
+    return [cached[key] for key in keys]
+
+
+def get_sentiment_cache_stats() -> Optional[dict]:
+    return sentiment_cache.stats() if sentiment_cache is not None else None
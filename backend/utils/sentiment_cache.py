@@ -0,0 +1,122 @@
+import hashlib
+import os
+import re
+import unicodedata
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from pymongo import UpdateOne
+
+_whitespace_re = re.compile(r"\s+")
+
+
+def normalize_text(text: str) -> str:
+    # 全角转半角、合并空白，使转载/模板化的评论得到相同的键
+    text = unicodedata.normalize("NFKC", text)
+    return _whitespace_re.sub(" ", text).strip()
+
+
+def compute_model_version(model_path: str) -> str:
+    """根据检查点目录中的文件名、大小和修改时间生成模型版本号"""
+    digest = hashlib.sha1()
+    for name in sorted(os.listdir(model_path)):
+        path = os.path.join(model_path, name)
+        if os.path.isfile(path):
+            stat = os.stat(path)
+            digest.update(f"{name}:{stat.st_size}:{stat.st_mtime_ns};".encode())
+    return digest.hexdigest()[:16]
+
+
+def cache_key(text: str, model_version: str) -> str:
+    return hashlib.sha256(f"{model_version}\x00{normalize_text(text)}".encode("utf-8")).hexdigest()
+
+
+class SentimentCache:
+    """两级情感结果缓存：进程内 LRU + MongoDB sentiment_cache 集合"""
+
+    def __init__(self, collection, model_version: str, max_size: int = 100000, ttl_seconds: int = 30 * 24 * 3600):
+        self.collection = collection
+        self.model_version = model_version
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.lru: "OrderedDict[str, dict]" = OrderedDict()
+        self.lru_hits = 0
+        self.mongo_hits = 0
+        self.misses = 0
+
+    async def init(self):
+        # TTL 索引自动清理过期结果；检查点变化后旧版本的结果直接删除
+        if self.collection is None:
+            return
+        await self.collection.create_index("created_at", expireAfterSeconds=self.ttl_seconds)
+        await self.collection.delete_many({"model_version": {"$ne": self.model_version}})
+
+    def key(self, text: str) -> str:
+        return cache_key(text, self.model_version)
+
+    def _lru_get(self, key: str) -> Optional[dict]:
+        result = self.lru.get(key)
+        if result is not None:
+            self.lru.move_to_end(key)
+        return result
+
+    def _lru_put(self, key: str, result: dict):
+        self.lru[key] = result
+        self.lru.move_to_end(key)
+        while len(self.lru) > self.max_size:
+            self.lru.popitem(last=False)
+
+    async def get_many(self, keys: List[str]) -> Dict[str, dict]:
+        found = {}
+        missing = []
+        for key in keys:
+            result = self._lru_get(key)
+            if result is not None:
+                found[key] = result
+                self.lru_hits += 1
+            else:
+                missing.append(key)
+
+        if missing and self.collection is not None:
+            cursor = self.collection.find(
+                {"_id": {"$in": missing}, "model_version": self.model_version},
+                {"label": 1, "confidence": 1, "probabilities": 1},
+            )
+            async for doc in cursor:
+                key = doc.pop("_id")
+                found[key] = doc
+                self._lru_put(key, doc)
+                self.mongo_hits += 1
+
+        self.misses += len(keys) - len(found)
+        return found
+
+    async def set_many(self, results: Dict[str, dict]):
+        if not results:
+            return
+        for key, result in results.items():
+            self._lru_put(key, result)
+        if self.collection is not None:
+            now = datetime.utcnow()
+            await self.collection.bulk_write([
+                UpdateOne(
+                    {"_id": key},
+                    {"$set": {**result, "model_version": self.model_version, "created_at": now}},
+                    upsert=True,
+                )
+                for key, result in results.items()
+            ], ordered=False)
+
+    def stats(self) -> dict:
+        lookups = self.lru_hits + self.mongo_hits + self.misses
+        hits = self.lru_hits + self.mongo_hits
+        return {
+            "model_version": self.model_version,
+            "lru_size": len(self.lru),
+            "lru_max_size": self.max_size,
+            "lru_hits": self.lru_hits,
+            "mongo_hits": self.mongo_hits,
+            "misses": self.misses,
+            "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+        }
@@ -0,0 +1,148 @@
+import asyncio
+import hashlib
+import io
+import multiprocessing
+import os
+import urllib.request
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Optional, Tuple
+
+from config import WORD_CLOUD_FONT_PATH, WORD_CLOUD_FONT_URL, WORD_CLOUD_CACHE_DIR, WORD_CLOUD_WORKERS
+from utils.movie_reviews import get_movie_review_contents
+from utils.segmentation import movie_word_counts
+
+# 配置的字体不存在时依次尝试的系统中文字体
+FALLBACK_FONTS = [
+    "/usr/share/fonts/opentype/noto/NotoSansCJK-Regular.ttc",
+    "/usr/share/fonts/noto-cjk/NotoSansCJK-Regular.ttc",
+    "/usr/share/fonts/truetype/wqy/wqy-microhei.ttc",
+    "/System/Library/Fonts/PingFang.ttc",
+    "C:/Windows/Fonts/simhei.ttf",
+]
+
+_executor: Optional[ProcessPoolExecutor] = None
+# 同一张词云只渲染一次，并发请求等待同一个渲染结果
+_render_locks: Dict[str, asyncio.Lock] = {}
+
+
+def resolve_font() -> Optional[str]:
+    for path in [WORD_CLOUD_FONT_PATH] + FALLBACK_FONTS:
+        if path and os.path.exists(path):
+            return path
+    return None
+
+
+def ensure_font(timeout: float = 60) -> Optional[str]:
+    """找不到可用字体时下载默认字体到 WORD_CLOUD_FONT_PATH，返回可用的字体路径；下载失败时抛出 OSError"""
+    font_path = resolve_font()
+    if font_path is not None or not WORD_CLOUD_FONT_URL:
+        return font_path
+    os.makedirs(os.path.dirname(WORD_CLOUD_FONT_PATH), exist_ok=True)
+    with urllib.request.urlopen(WORD_CLOUD_FONT_URL, timeout=timeout) as response:
+        _write_atomic(WORD_CLOUD_FONT_PATH, response.read())
+    return WORD_CLOUD_FONT_PATH
+
+
+def _render(frequencies: Dict[str, int], font_path: str, width: int, height: int, max_words: int) -> bytes:
+    from wordcloud import WordCloud
+
+    wordcloud = WordCloud(
+        font_path=font_path,
+        width=width,
+        height=height,
+        max_words=max_words,
+        background_color="white",
+    ).generate_from_frequencies(frequencies)
+    buffer = io.BytesIO()
+    wordcloud.to_image().save(buffer, format="PNG", optimize=True)
+    return buffer.getvalue()
+
+
+def _get_executor() -> ProcessPoolExecutor:
+    # 渲染是 CPU 密集型操作，放到独立进程中执行，不阻塞事件循环
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(
+            max_workers=WORD_CLOUD_WORKERS,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _executor
+
+
+def shutdown_word_cloud():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+def reviews_version(movie: dict) -> str:
+    # movie_reviews 迁移时递增 reviews_version 并记录 review_count，评论变化后版本号随之改变
+    return f"{movie.get('reviews_version', 0)}-{movie.get('review_count', 0)}"
+
+
+def word_cloud_etag(movie_id: int, version: str, font_path: str, width: int, height: int, max_words: int) -> str:
+    """缓存键：电影评论版本 + 渲染参数，同一个键对应的图片内容不变，直接作为强 ETag"""
+    params = f"{movie_id}|{version}|{os.path.basename(font_path)}|{width}x{height}|{max_words}"
+    return hashlib.sha256(params.encode("utf-8")).hexdigest()[:32]
+
+
+def _cache_path(movie_id: int, version: str, key: str) -> str:
+    return os.path.join(WORD_CLOUD_CACHE_DIR, f"{movie_id}_{version}_{key}.png")
+
+
+def _remove_stale(movie_id: int, version: str):
+    # 评论版本变化后，旧版本的所有尺寸都不会再被访问
+    prefix = f"{movie_id}_"
+    for name in os.listdir(WORD_CLOUD_CACHE_DIR):
+        if name.startswith(prefix) and not name.startswith(f"{prefix}{version}_"):
+            try:
+                os.remove(os.path.join(WORD_CLOUD_CACHE_DIR, name))
+            except OSError:
+                pass
+
+
+def _write_atomic(path: str, data: bytes):
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+async def get_word_cloud_png(db, movie: dict, font_path: str, width: int, height: int,
+                             max_words: int) -> Tuple[Optional[bytes], str]:
+    """返回 (PNG 字节, ETag)；命中磁盘缓存时只读取文件，没有可用评论时字节为 None"""
+    movie_id = movie["movie_id"]
+    version = reviews_version(movie)
+    key = word_cloud_etag(movie_id, version, font_path, width, height, max_words)
+    path = _cache_path(movie_id, version, key)
+    if os.path.exists(path):
+        return await asyncio.to_thread(_read_file, path), key
+
+    lock = _render_locks.setdefault(key, asyncio.Lock())
+    try:
+        async with lock:
+            if os.path.exists(path):
+                return await asyncio.to_thread(_read_file, path), key
+            reviews = await get_movie_review_contents(db, movie_id)
+            # 分词在分词进程池中完成，结果按评论和电影缓存
+            counts = await movie_word_counts(movie_id, reviews, version)
+            frequencies = dict(counts.most_common(max_words))
+            if not frequencies:
+                return None, key
+            loop = asyncio.get_running_loop()
+            data = await loop.run_in_executor(
+                _get_executor(), _render, frequencies, font_path, width, height, max_words
+            )
+            os.makedirs(WORD_CLOUD_CACHE_DIR, exist_ok=True)
+            await asyncio.to_thread(_write_atomic, path, data)
+            await asyncio.to_thread(_remove_stale, movie_id, version)
+            return data, key
+    finally:
+        if not lock.locked():
+            _render_locks.pop(key, None)
+
+
+def _read_file(path: str) -> bytes:
+    with open(path, "rb") as f:
+        return f.read()
@@ -0,0 +1,96 @@
+import time
+import random
+import pandas as pd
+import torch
+from transformers import BertTokenizer, BertForSequenceClassification, DataCollatorWithPadding
+
+# 对比固定长度填充（max_length=128）与按长度分组的动态填充在 CPU 上的训练/推理速度
+model_name = 'bert-base-chinese'
+max_length = 128
+batch_size = 16
+train_steps = 20        # 每种方式计时的训练步数
+num_samples = 2000      # 参与推理计时的样本数
+
+try:
+    df = pd.read_csv('processed_reviews.csv')
+    texts = df['cleaned_content'].dropna().astype(str).tolist()
+except FileNotFoundError:
+    print("错误：'processed_reviews.csv' 未找到。请先运行预处理代码。")
+    exit()
+
+# 样本太少时重复采样，使计时结果稳定
+random.seed(42)
+texts = [random.choice(texts) for _ in range(num_samples)]
+labels = [random.randint(0, 2) for _ in texts]
+
+tokenizer = BertTokenizer.from_pretrained(model_name)
+model = BertForSequenceClassification.from_pretrained(model_name, num_labels=3)
+collator = DataCollatorWithPadding(tokenizer=tokenizer)
+encoded = tokenizer(texts, truncation=True, max_length=max_length)
+features = [{'input_ids': ids, 'token_type_ids': tt, 'attention_mask': am, 'labels': label}
+            for ids, tt, am, label in zip(encoded['input_ids'], encoded['token_type_ids'], encoded['attention_mask'], labels)]
+
+
+def make_batches(indices, padding):
+    for start in range(0, len(indices), batch_size):
+        chunk = [features[i] for i in indices[start:start + batch_size]]
+        if padding == 'max_length':
+            yield tokenizer.pad(chunk, padding='max_length', max_length=max_length, return_tensors='pt')
+        else:
+            yield collator(chunk)
+
+
+def length_grouped_indices():
+    # 与 Trainer(group_by_length=True) 的思路一致：先随机打乱成大块，块内按长度排序后再切批
+    indices = list(range(len(features)))
+    random.shuffle(indices)
+    mega = batch_size * 50
+    grouped = []
+    for start in range(0, len(indices), mega):
+        grouped.extend(sorted(indices[start:start + mega], key=lambda i: len(features[i]['input_ids'])))
+    return grouped
+
+
+def time_inference(indices, padding):
+    model.eval()
+    start = time.perf_counter()
+    with torch.no_grad():
+        for batch in make_batches(indices, padding):
+            batch.pop('labels')
+            model(**batch)
+    return len(indices) / (time.perf_counter() - start)
+
+
+def time_training(indices, padding):
+    model.train()
+    optimizer = torch.optim.AdamW(model.parameters(), lr=2e-5)
+    batches = make_batches(indices[:train_steps * batch_size], padding)
+    start = time.perf_counter()
+    for batch in batches:
+        loss = model(**batch).loss
+        loss.backward()
+        optimizer.step()
+        optimizer.zero_grad()
+    return train_steps * batch_size / (time.perf_counter() - start)
+
+
+random_indices = list(range(len(features)))
+random.shuffle(random_indices)
+sorted_indices = sorted(range(len(features)), key=lambda i: len(features[i]['input_ids']))
+
+lengths = [len(f['input_ids']) for f in features]
+print(f"样本数: {len(features)}，平均 token 长度: {sum(lengths) / len(lengths):.1f}，max_length: {max_length}")
+
+results = {
+    '推理 固定填充': time_inference(random_indices, 'max_length'),
+    '推理 动态填充': time_inference(random_indices, 'dynamic'),
+    '推理 动态填充+长度排序': time_inference(sorted_indices, 'dynamic'),
+    '训练 固定填充': time_training(random_indices, 'max_length'),
+    '训练 动态填充+长度分组': time_training(length_grouped_indices(), 'dynamic'),
+}
+
+print("\n吞吐量 (样本/秒):")
+for name, value in results.items():
+    print(f"  {name:<20}{value:>10.1f}")
+print(f"\n推理加速: {results['推理 动态填充+长度排序'] / results['推理 固定填充']:.2f}x")
+print(f"训练加速: {results['训练 动态填充+长度分组'] / results['训练 固定填充']:.2f}x")
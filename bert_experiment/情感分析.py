@@ -25,20 +25,27 @@ texts = [
 # 情感标签映射
 id2label = {0: "negative", 1: "neutral", 2: "positive"}
 
-# 进行推理
-print("\n情感分析推理结果:")
+# 进行推理：按长度排序后分批，每批只填充到批内最长文本，输出时恢复原始顺序
+batch_size = 32
+order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+all_probabilities = [None] * len(texts)
 with torch.no_grad():
-    for text in texts:
-        inputs = tokenizer(text, return_tensors="pt", padding=True, truncation=True, max_length=128)
+    for start in range(0, len(order), batch_size):
+        indices = order[start:start + batch_size]
+        inputs = tokenizer([texts[i] for i in indices], return_tensors="pt", padding=True, truncation=True, max_length=128)
         outputs = model(**inputs)
-        logits = outputs.logits
-        probabilities = F.softmax(logits, dim=-1)
-        predicted_class_id = torch.argmax(probabilities, dim=-1).item()
-        predicted_label = id2label[predicted_class_id]
-        confidence = probabilities[0][predicted_class_id].item()
+        probabilities = F.softmax(outputs.logits, dim=-1)
+        for i, probs in zip(indices, probabilities):
+            all_probabilities[i] = probs
+
+print("\n情感分析推理结果:")
+for text, probabilities in zip(texts, all_probabilities):
+    predicted_class_id = torch.argmax(probabilities, dim=-1).item()
+    predicted_label = id2label[predicted_class_id]
+    confidence = probabilities[predicted_class_id].item()
 
-        print(f"文本: {text}")
-        print(f"  预测情感: {predicted_label}")
-        print(f"  置信度: {confidence:.4f}")
-        print(f"  概率分布 (neg, neu, pos): {probabilities.numpy()[0]}")
-        print("-" * 20)
\ No newline at end of file
+    print(f"文本: {text}")
+    print(f"  预测情感: {predicted_label}")
+    print(f"  置信度: {confidence:.4f}")
+    print(f"  概率分布 (neg, neu, pos): {probabilities.numpy()}")
+    print("-" * 20)
\ No newline at end of file
@@ -0,0 +1,119 @@
+import hashlib
+import json
+import os
+import shutil
+
+import pandas as pd
+from datasets import Dataset, DatasetDict, load_from_disk
+from sklearn.model_selection import train_test_split
+
+# 分词后的数据集缓存：训练和评估共用同一份按 key 存放的 Arrow 文件（load_from_disk 为内存映射读取）
+CACHE_DIR = "./tokenized_cache"
+# 最近一次使用的缓存目录名，供 backend/scripts/benchmark_inference.py 等外部脚本定位验证集
+LATEST_FILE = "LATEST"
+# 预处理.py 的清洗规则（clean_text 等）变化时递增，使旧缓存失效
+CLEANING_VERSION = 1
+# 模型输入以外需要保留的列
+KEEP_COLUMNS = ["label"]
+
+
+def file_hash(path):
+    sha = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            sha.update(block)
+    return sha.hexdigest()
+
+
+def tokenizer_hash(tokenizer):
+    # 只依赖词表和分词规则，不依赖加载路径：训练用 bert-base-chinese、评估用 final_model 时得到同一个 key
+    sha = hashlib.sha256()
+    sha.update(type(tokenizer).__name__.encode("utf-8"))
+    sha.update(str(getattr(tokenizer, "do_lower_case", None)).encode("utf-8"))
+    for token, index in sorted(tokenizer.get_vocab().items(), key=lambda item: item[1]):
+        sha.update(f"{index}\t{token}\n".encode("utf-8"))
+    return sha.hexdigest()
+
+
+def cache_key(data_path, tokenizer, max_length, test_size, seed):
+    parts = {
+        "data": file_hash(data_path),
+        "tokenizer": tokenizer_hash(tokenizer),
+        "max_length": max_length,
+        "cleaning_version": CLEANING_VERSION,
+        "test_size": test_size,
+        "seed": seed,
+    }
+    key = hashlib.sha256(json.dumps(parts, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+    return key, parts
+
+
+def read_data(path, columns=None):
+    # 预处理.py 同时输出 Parquet 和 CSV，两种格式都可以作为训练数据
+    if path.endswith(".parquet"):
+        return pd.read_parquet(path, columns=columns)
+    return pd.read_csv(path, usecols=columns)
+
+
+def data_columns(path):
+    if path.endswith(".parquet"):
+        import pyarrow.parquet as pq
+        return pq.read_schema(path).names
+    return list(pd.read_csv(path, nrows=0).columns)
+
+
+def tokenize_batch(examples, tokenizer, max_length):
+    # 不做填充：由 DataCollatorWithPadding 在组批时动态填充到批内最长长度
+    encodings = tokenizer(examples['cleaned_content'], truncation=True, max_length=max_length)
+    # 记录序列长度，供 group_by_length 的长度分组采样器使用
+    encodings['length'] = [len(ids) for ids in encodings['input_ids']]
+    return encodings
+
+
+def load_tokenized_splits(data_path, tokenizer, max_length=128, test_size=0.2, seed=42,
+                          cache_dir=CACHE_DIR, num_proc=None):
+    """返回包含 train / validation 两个划分的 DatasetDict，命中缓存时直接内存映射读取"""
+    key, parts = cache_key(data_path, tokenizer, max_length, test_size, seed)
+    path = os.path.join(cache_dir, key)
+    if os.path.exists(os.path.join(path, "dataset_dict.json")):
+        print(f"命中分词缓存: {path}")
+        _write_latest(cache_dir, key)
+        return load_from_disk(path)
+
+    print(f"未命中分词缓存，开始分词: {path}")
+    # 分词只需要文本和标签列
+    df = read_data(data_path, columns=['cleaned_content'] + KEEP_COLUMNS)
+    # 划分与原训练脚本保持一致
+    train_df, val_df = train_test_split(df, test_size=test_size, random_state=seed)
+    dataset = DatasetDict({
+        "train": Dataset.from_pandas(train_df, preserve_index=False),
+        "validation": Dataset.from_pandas(val_df, preserve_index=False),
+    })
+    remove_columns = [name for name in dataset["train"].column_names if name not in KEEP_COLUMNS]
+    # 多进程分词；进程数不超过最小划分的样本数
+    num_proc = max(1, min(num_proc or os.cpu_count() or 1, len(dataset["validation"])))
+    dataset = dataset.map(
+        tokenize_batch,
+        batched=True,
+        num_proc=num_proc,
+        remove_columns=remove_columns,
+        fn_kwargs={"tokenizer": tokenizer, "max_length": max_length},
+        desc="分词",
+    )
+
+    # 先写临时目录再改名，中断时不会留下不完整的缓存
+    tmp_path = path + ".tmp"
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    dataset.save_to_disk(tmp_path)
+    with open(os.path.join(tmp_path, "cache_info.json"), "w", encoding="utf-8") as f:
+        json.dump(parts, f, ensure_ascii=False, indent=2)
+    shutil.rmtree(path, ignore_errors=True)
+    os.replace(tmp_path, path)
+    _write_latest(cache_dir, key)
+    print(f"分词结果已缓存: {path}")
+    return load_from_disk(path)
+
+
+def _write_latest(cache_dir, key):
+    with open(os.path.join(cache_dir, LATEST_FILE), "w", encoding="utf-8") as f:
+        f.write(key)
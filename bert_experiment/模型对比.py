@@ -0,0 +1,167 @@
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+import torch
+from sklearn.metrics import classification_report, roc_curve, auc
+from sklearn.preprocessing import label_binarize
+from transformers import BertTokenizer, BertForSequenceClassification, DataCollatorWithPadding
+from 数据缓存 import load_tokenized_splits
+
+# 教师 / 学生模型并排评估：准确率、F1、AUC 与 模型评估.py 的指标一致，另外测量 CPU 推理延迟，
+# 输出一张延迟/准确率权衡表，供 backend 选择 SENTIMENT_MODEL=teacher 或 student
+labels = ["negative", "neutral", "positive"]
+n_classes = len(labels)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="并排评估多个情感模型并生成延迟/准确率权衡表")
+    parser.add_argument("--models", nargs="+",
+                        default=["teacher=./results_bert_finetune/final_model", "student=./results_bert_distill/final_model"],
+                        help="name=模型目录，第一个模型作为基准")
+    parser.add_argument("--data", default="processed_reviews.csv")
+    parser.add_argument("--max-length", type=int, default=128)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--limit", type=int, default=None, help="最多评估的验证样本数")
+    parser.add_argument("--latency-samples", type=int, default=200, help="测量单条延迟使用的样本数")
+    parser.add_argument("--threads", type=int, default=0, help="torch 算子内并行线程数，0 表示使用默认值")
+    parser.add_argument("--output", default="model_tradeoff.md", help="权衡表（Markdown）")
+    parser.add_argument("--json", default="model_tradeoff.json")
+    return parser.parse_args()
+
+
+def directory_size_mb(path):
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            if not name.endswith(".onnx"):
+                total += os.path.getsize(os.path.join(root, name))
+    return total / (1 << 20)
+
+
+def predict(model, dataset, collator, batch_size):
+    dataset = dataset.remove_columns([c for c in dataset.column_names if c == "length"])
+    all_logits = []
+    all_labels = []
+    start = time.perf_counter()
+    with torch.inference_mode():
+        for i in range(0, len(dataset), batch_size):
+            batch = collator(dataset[i:i + batch_size])
+            all_labels.append(batch.pop("labels").numpy())
+            all_logits.append(model(**batch).logits.float().numpy())
+    elapsed = time.perf_counter() - start
+    return np.concatenate(all_logits), np.concatenate(all_labels), elapsed
+
+
+def single_latency(model, dataset, collator, samples):
+    # 模拟线上逐条打分：batch=1，先预热几次
+    dataset = dataset.remove_columns([c for c in dataset.column_names if c in ("length", "label")])
+    samples = min(samples, len(dataset))
+    latencies = []
+    with torch.inference_mode():
+        for i in range(samples + 5):
+            inputs = collator([dataset[i % len(dataset)]])
+            t0 = time.perf_counter()
+            model(**inputs)
+            if i >= 5:
+                latencies.append((time.perf_counter() - t0) * 1000)
+    return latencies
+
+
+def evaluate_model(name, path, args):
+    tokenizer = BertTokenizer.from_pretrained(path)
+    model = BertForSequenceClassification.from_pretrained(path).eval()
+    # 教师与学生共用 tokenizer，读取的是同一份分词缓存中的验证集
+    dataset = load_tokenized_splits(args.data, tokenizer, max_length=args.max_length)["validation"]
+    if args.limit:
+        dataset = dataset.select(range(min(args.limit, len(dataset))))
+    collator = DataCollatorWithPadding(tokenizer=tokenizer, return_tensors="pt")
+
+    logits, y_true, elapsed = predict(model, dataset, collator, args.batch_size)
+    y_pred = np.argmax(logits, axis=-1)
+    y_prob = torch.softmax(torch.from_numpy(logits), dim=-1).numpy()
+    report = classification_report(y_true, y_pred, labels=range(n_classes), target_names=labels,
+                                   digits=4, output_dict=True, zero_division=0)
+    y_true_bin = label_binarize(y_true, classes=range(n_classes))
+    fpr, tpr, _ = roc_curve(y_true_bin.ravel(), y_prob.ravel())
+    latencies = single_latency(model, dataset, collator, args.latency_samples)
+
+    return {
+        "name": name,
+        "path": path,
+        "layers": model.config.num_hidden_layers,
+        "hidden_size": model.config.hidden_size,
+        "params_m": round(sum(p.numel() for p in model.parameters()) / 1e6, 1),
+        "size_mb": round(directory_size_mb(path), 1),
+        "samples": int(len(y_true)),
+        "accuracy": round(report["accuracy"], 4),
+        "macro_f1": round(report["macro avg"]["f1-score"], 4),
+        "weighted_f1": round(report["weighted avg"]["f1-score"], 4),
+        "micro_auc": round(float(auc(fpr, tpr)), 4),
+        "latency_ms": {
+            "p50": round(float(np.percentile(latencies, 50)), 2),
+            "p95": round(float(np.percentile(latencies, 95)), 2),
+        },
+        "throughput": round(len(y_true) / elapsed, 2),  # 批量推理样本/秒
+    }, y_pred
+
+
+def write_table(results, args):
+    lines = [
+        "# 情感模型延迟/准确率权衡",
+        "",
+        f"验证集样本数 {results[0]['samples']}，CPU 线程数 {torch.get_num_threads()}，"
+        f"单条延迟为 batch=1 的 PyTorch fp32 前向时间，吞吐量按 batch={args.batch_size} 计算。",
+        "",
+        "| 模型 | 层数 | 隐藏层 | 参数量(M) | 大小(MB) | accuracy | macro F1 | micro AUC | 一致率 | p50(ms) | p95(ms) | 样本/秒 | 加速比 |",
+        "|---|---|---|---|---|---|---|---|---|---|---|---|---|",
+    ]
+    for r in results:
+        lines.append(
+            f"| {r['name']} | {r['layers']} | {r['hidden_size']} | {r['params_m']} | {r['size_mb']} | "
+            f"{r['accuracy']} | {r['macro_f1']} | {r['micro_auc']} | {r['agreement']} | "
+            f"{r['latency_ms']['p50']} | {r['latency_ms']['p95']} | {r['throughput']} | {r['speedup']}x |"
+        )
+    lines += ["", "线上使用学生模型：设置环境变量 `SENTIMENT_MODEL=student`（或 `SENTIMENT_MODEL_PATH` 指向模型目录）。", ""]
+    with open(args.output, "w", encoding="utf-8") as f:
+        f.write("\n".join(lines))
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    if args.threads:
+        torch.set_num_threads(args.threads)
+
+    results = []
+    baseline = None
+    for item in args.models:
+        name, _, path = item.partition("=")
+        path = path or name
+        if not os.path.isdir(path):
+            print(f"跳过 {name}: 未找到模型目录 {path}")
+            continue
+        print(f"评估 {name} ({path})...")
+        result, y_pred = evaluate_model(name, path, args)
+        if baseline is None:
+            baseline = (result, y_pred)
+        # 以第一个模型（默认教师）为基准计算预测一致率和 p50 加速比
+        result["agreement"] = round(float((y_pred == baseline[1]).mean()), 4)
+        result["speedup"] = round(baseline[0]["latency_ms"]["p50"] / max(result["latency_ms"]["p50"], 1e-6), 2)
+        results.append(result)
+
+    if not results:
+        print("没有可评估的模型")
+        exit()
+
+    print(f"\n{'model':<10}{'layers':>7}{'params(M)':>11}{'accuracy':>10}{'macroF1':>9}{'AUC':>8}{'p50(ms)':>9}{'样本/秒':>9}{'加速比':>7}")
+    for r in results:
+        print(f"{r['name']:<10}{r['layers']:>7}{r['params_m']:>11}{r['accuracy']:>10}{r['macro_f1']:>9}"
+              f"{r['micro_auc']:>8}{r['latency_ms']['p50']:>9}{r['throughput']:>9}{r['speedup']:>7}")
+
+    write_table(results, args)
+    with open(args.json, "w", encoding="utf-8") as f:
+        json.dump({"batch_size": args.batch_size, "threads": torch.get_num_threads(), "results": results},
+                  f, ensure_ascii=False, indent=2)
+    print(f"\n权衡表已写入 {args.output}，详细结果已写入 {args.json}")
@@ -0,0 +1,149 @@
+import argparse
+import os
+
+import numpy as np
+import torch
+import torch.nn.functional as F
+from transformers import (BertConfig, BertTokenizer, BertForSequenceClassification, Trainer, TrainingArguments,
+                          DataCollatorWithPadding)
+from 数据缓存 import load_tokenized_splits
+
+# 知识蒸馏：用 模型训练.py 微调得到的 12 层教师模型的软标签训练一个层数更少、隐藏层更窄的学生模型。
+# 学生模型仍是 BertForSequenceClassification，沿用教师的 tokenizer，
+# 因此 backend 的各推理后端（torch / torch-int8 / onnx）和 export_onnx.py 都可以直接加载。
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="从微调后的 BERT 教师模型蒸馏小型学生模型")
+    parser.add_argument("--teacher", default="./results_bert_finetune/final_model", help="模型训练.py 输出的教师模型")
+    parser.add_argument("--data", default="processed_reviews.csv")
+    parser.add_argument("--output-dir", default="./results_bert_distill")
+    parser.add_argument("--layers", type=int, default=4, help="学生模型 Transformer 层数")
+    parser.add_argument("--hidden-size", type=int, default=384, help="学生模型隐藏层维度，与教师相同时从教师复制权重初始化")
+    parser.add_argument("--heads", type=int, default=6, help="注意力头数，需整除 hidden-size")
+    parser.add_argument("--intermediate-size", type=int, default=None, help="前馈层维度，默认 4 * hidden-size")
+    parser.add_argument("--temperature", type=float, default=2.0, help="软标签温度")
+    parser.add_argument("--alpha", type=float, default=0.7, help="蒸馏损失权重，其余为真实标签交叉熵")
+    parser.add_argument("--max-length", type=int, default=128)
+    parser.add_argument("--epochs", type=float, default=3)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--eval-batch-size", type=int, default=64)
+    parser.add_argument("--learning-rate", type=float, default=1e-4)
+    parser.add_argument("--warmup-steps", type=int, default=100)
+    parser.add_argument("--bf16", action="store_true", help="在 CPU 上使用 bf16 自动混合精度")
+    parser.add_argument("--threads", type=int, default=0, help="torch 算子内并行线程数，0 表示使用默认值")
+    parser.add_argument("--seed", type=int, default=42, help="训练随机种子；训练/验证划分固定使用默认种子，与其他脚本一致")
+    return parser.parse_args()
+
+
+def build_student(teacher, layers, hidden_size, heads, intermediate_size=None):
+    config = BertConfig.from_dict(teacher.config.to_dict())
+    config.num_hidden_layers = layers
+    config.hidden_size = hidden_size
+    config.num_attention_heads = heads
+    config.intermediate_size = intermediate_size or 4 * hidden_size
+    student = BertForSequenceClassification(config)
+    if hidden_size == teacher.config.hidden_size:
+        # 维度一致时复制词向量，并从教师中均匀抽取 layers 层作为初始化，收敛更快
+        student.bert.embeddings.load_state_dict(teacher.bert.embeddings.state_dict())
+        step = teacher.config.num_hidden_layers / layers
+        for i, layer in enumerate(student.bert.encoder.layer):
+            layer.load_state_dict(teacher.bert.encoder.layer[int(i * step)].state_dict())
+        student.bert.pooler.load_state_dict(teacher.bert.pooler.state_dict())
+        student.classifier.load_state_dict(teacher.classifier.state_dict())
+        print(f"学生模型从教师模型初始化（抽取 {layers} 层）")
+    return student
+
+
+class DistillationTrainer(Trainer):
+    """损失 = alpha * T^2 * KL(学生软标签 || 教师软标签) + (1 - alpha) * 交叉熵(真实标签)"""
+
+    def __init__(self, *args, teacher=None, temperature=2.0, alpha=0.7, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.teacher = teacher.to(self.args.device).eval()
+        self.temperature = temperature
+        self.alpha = alpha
+
+    def compute_loss(self, model, inputs, return_outputs=False, **kwargs):
+        labels = inputs.pop("labels")
+        outputs = model(**inputs)
+        with torch.no_grad():
+            teacher_logits = self.teacher(**inputs).logits
+        t = self.temperature
+        soft_loss = F.kl_div(
+            F.log_softmax(outputs.logits / t, dim=-1),
+            F.softmax(teacher_logits / t, dim=-1),
+            reduction="batchmean",
+        ) * (t * t)
+        hard_loss = F.cross_entropy(outputs.logits, labels)
+        loss = self.alpha * soft_loss + (1 - self.alpha) * hard_loss
+        return (loss, outputs) if return_outputs else loss
+
+
+def count_parameters(model):
+    return sum(p.numel() for p in model.parameters())
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    if args.threads:
+        torch.set_num_threads(args.threads)
+
+    try:
+        tokenizer = BertTokenizer.from_pretrained(args.teacher)
+        teacher = BertForSequenceClassification.from_pretrained(args.teacher)
+    except OSError:
+        print(f"错误：无法加载教师模型 '{args.teacher}'，请先运行 模型训练.py。")
+        exit()
+
+    # 与 模型训练.py 使用同一份分词缓存和同一个训练/验证划分，学生不会见到教师的验证集；
+    # 划分种子不随 --seed 变化，否则 模型对比.py 评估时用到的验证集会混入学生的训练样本
+    dataset = load_tokenized_splits(args.data, tokenizer, max_length=args.max_length)
+    dataset.set_format("torch")
+
+    student = build_student(teacher, args.layers, args.hidden_size, args.heads, args.intermediate_size)
+    print(f"教师参数量: {count_parameters(teacher) / 1e6:.1f}M，学生参数量: {count_parameters(student) / 1e6:.1f}M")
+
+    training_args = TrainingArguments(
+        output_dir=args.output_dir,
+        num_train_epochs=args.epochs,
+        per_device_train_batch_size=args.batch_size,
+        per_device_eval_batch_size=args.eval_batch_size,
+        learning_rate=args.learning_rate,
+        warmup_steps=args.warmup_steps,
+        weight_decay=0.01,
+        logging_steps=50,
+        evaluation_strategy="epoch",
+        save_strategy="epoch",
+        save_total_limit=2,
+        load_best_model_at_end=True,
+        metric_for_best_model="accuracy",
+        group_by_length=True,
+        length_column_name="length",
+        use_cpu=not torch.cuda.is_available(),
+        bf16=args.bf16,
+        seed=args.seed,
+    )
+
+    def compute_metrics(eval_pred):
+        logits, labels = eval_pred
+        return {"accuracy": float((np.argmax(logits, axis=-1) == labels).mean())}
+
+    trainer = DistillationTrainer(
+        model=student,
+        args=training_args,
+        train_dataset=dataset["train"],
+        eval_dataset=dataset["validation"],
+        data_collator=DataCollatorWithPadding(tokenizer=tokenizer),
+        compute_metrics=compute_metrics,
+        teacher=teacher,
+        temperature=args.temperature,
+        alpha=args.alpha,
+    )
+
+    print("开始蒸馏训练...")
+    trainer.train()
+    final_path = os.path.join(args.output_dir, "final_model")
+    trainer.save_model(final_path)
+    tokenizer.save_pretrained(final_path)
+    print(f"学生模型已保存到 {final_path}，可运行 模型对比.py 生成教师/学生的延迟与准确率对比表")
@@ -1,17 +1,125 @@
+import argparse
+import json
+import os
+import time
+
+import numpy as np
 import pandas as pd
 from sklearn.model_selection import train_test_split
-from transformers import BertTokenizer, BertForSequenceClassification, Trainer, TrainingArguments
+from transformers import (BertTokenizer, BertForSequenceClassification, Trainer, TrainingArguments,
+                          DataCollatorWithPadding, TrainerCallback)
+from transformers.trainer_utils import get_last_checkpoint
 import torch
 from datasets import Dataset # 需要安装 datasets: pip install datasets
+from 数据缓存 import load_tokenized_splits, tokenize_batch, data_columns
+
+# 默认值与原脚本一致；可通过 --config 指定 JSON 配置文件覆盖，命令行参数优先级最高
+DEFAULTS = {
+    "data": "processed_reviews.csv",  # 也可以使用 预处理.py 输出的 processed_reviews.parquet
+    "model_name": "bert-base-chinese",
+    "output_dir": "./results_bert_finetune",
+    "logging_dir": "./logs_bert",
+    "max_length": 128,
+    "epochs": 1,
+    "batch_size": 4,
+    "eval_batch_size": 8,
+    "grad_accum": 1,
+    "learning_rate": 5e-5,
+    "warmup_steps": 10,
+    "weight_decay": 0.01,
+    "logging_steps": 10,
+    "save_steps": 0,
+    "save_total_limit": 2,
+    "bf16": False,
+    "threads": 0,
+    "interop_threads": 0,
+    "dataloader_workers": 0,
+    "pin_memory": False,
+    "torch_compile": False,
+    "resume": None,
+    "tokenize_workers": 0,
+    "seed": 42,
+}
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="BERT 情感分类微调（支持 CPU 训练调优）")
+    parser.add_argument("--config", help="JSON 配置文件，键名与下列参数名一致（使用下划线）")
+    parser.add_argument("--data", help="预处理.py 输出的 CSV 或 Parquet")
+    parser.add_argument("--model-name", dest="model_name")
+    parser.add_argument("--output-dir", dest="output_dir")
+    parser.add_argument("--logging-dir", dest="logging_dir")
+    parser.add_argument("--max-length", dest="max_length", type=int)
+    parser.add_argument("--epochs", type=float)
+    parser.add_argument("--batch-size", dest="batch_size", type=int, help="每步的样本数")
+    parser.add_argument("--eval-batch-size", dest="eval_batch_size", type=int)
+    parser.add_argument("--grad-accum", dest="grad_accum", type=int, help="梯度累积步数，等效批大小 = batch_size * grad_accum")
+    parser.add_argument("--learning-rate", dest="learning_rate", type=float)
+    parser.add_argument("--warmup-steps", dest="warmup_steps", type=int)
+    parser.add_argument("--weight-decay", dest="weight_decay", type=float)
+    parser.add_argument("--logging-steps", dest="logging_steps", type=int)
+    parser.add_argument("--save-steps", dest="save_steps", type=int, help="每隔多少步保存检查点并评估，0 表示每个 epoch")
+    parser.add_argument("--save-total-limit", dest="save_total_limit", type=int)
+    parser.add_argument("--bf16", action=argparse.BooleanOptionalAction, help="在 CPU 上使用 bf16 自动混合精度（需要 CPU 支持 AVX512-BF16/AMX）")
+    parser.add_argument("--threads", type=int, help="算子内并行线程数（torch.set_num_threads），0 表示使用默认值")
+    parser.add_argument("--interop-threads", dest="interop_threads", type=int, help="算子间并行线程数，0 表示使用默认值")
+    parser.add_argument("--dataloader-workers", dest="dataloader_workers", type=int)
+    parser.add_argument("--pin-memory", dest="pin_memory", action=argparse.BooleanOptionalAction, help="CPU 训练时没有收益，默认关闭")
+    parser.add_argument("--torch-compile", dest="torch_compile", action=argparse.BooleanOptionalAction)
+    parser.add_argument("--resume", nargs="?", const="latest", help="从检查点恢复训练；不带值时使用 output_dir 中最新的检查点")
+    parser.add_argument("--tokenize-workers", dest="tokenize_workers", type=int, help="分词进程数，0 表示使用全部 CPU")
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args()
+
+    config = dict(DEFAULTS)
+    if args.config:
+        with open(args.config, encoding="utf-8") as f:
+            config.update(json.load(f))
+    config.update({key: value for key, value in vars(args).items() if value is not None and key != "config"})
+    return argparse.Namespace(**config)
+
+
+class ThroughputCallback(TrainerCallback):
+    """每次记录日志时输出最近一段时间的训练吞吐量（样本/秒）"""
+
+    def __init__(self, samples_per_step):
+        self.samples_per_step = samples_per_step
+        self.last_time = None
+        self.last_step = 0
+
+    def on_train_begin(self, args, state, control, **kwargs):
+        self.last_time = time.perf_counter()
+        self.last_step = state.global_step
+
+    def on_log(self, args, state, control, logs=None, **kwargs):
+        now = time.perf_counter()
+        steps = state.global_step - self.last_step
+        if logs is None or steps <= 0 or "loss" not in logs:
+            return
+        samples_per_sec = steps * self.samples_per_step / (now - self.last_time)
+        logs["samples_per_second"] = round(samples_per_sec, 2)
+        print(f"step {state.global_step}: loss={logs['loss']:.4f} samples/sec={samples_per_sec:.2f}")
+        self.last_time = now
+        self.last_step = state.global_step
+
+
+args = parse_args()
+
+# 线程数需要在任何并行计算之前设置
+if args.threads:
+    torch.set_num_threads(args.threads)
+if args.interop_threads:
+    torch.set_num_interop_threads(args.interop_threads)
+print(f"torch 线程数: intra-op={torch.get_num_threads()}, inter-op={torch.get_num_interop_threads()}")
 
 # --- 假设你已经运行了 5.1 的代码并得到了 df ---
 # 或者从已处理的文件加载
 try:
-    df = pd.read_csv('processed_reviews.csv')
-    if 'label' not in df.columns:
+    columns = data_columns(args.data)  # 只检查列名，完整数据在分词缓存未命中时才读取
+    if 'label' not in columns:
         raise ValueError("处理后的数据文件需要包含 'label' 列。")
 except FileNotFoundError:
-     print("错误：'processed_reviews.csv' 未找到。请先运行5.1的预处理代码。")
+     print(f"错误：'{args.data}' 未找到。请先运行5.1的预处理代码。")
      # 创建示例数据
      data = {'cleaned_content': ['这部 电影 太棒了', '剧情 有点 拖沓', '演员 演技 在线', '不 好看'],
              'label': [2, 0, 2, 0]}
@@ -22,65 +130,79 @@ except ValueError as e:
     exit()
 
 
-# 划分训练集和验证集
-train_df, val_df = train_test_split(df, test_size=0.2, random_state=42)
-
-# 将 Pandas DataFrame 转换为 Hugging Face Dataset 对象
-train_dataset = Dataset.from_pandas(train_df)
-val_dataset = Dataset.from_pandas(val_df)
-
 # 加载 Tokenizer
-model_name = 'bert-base-chinese'
 try:
-    tokenizer = BertTokenizer.from_pretrained(model_name)
+    tokenizer = BertTokenizer.from_pretrained(args.model_name)
 except OSError:
-     print(f"错误：无法下载或找到 '{model_name}' 的 tokenizer。请检查网络连接或模型名称。")
+     print(f"错误：无法下载或找到 '{args.model_name}' 的 tokenizer。请检查网络连接或模型名称。")
      exit()
 
 
-# 定义预处理函数
-def preprocess_function(examples):
-    # 使用 cleaned_content 列进行 tokenize
-    return tokenizer(examples['cleaned_content'], padding='max_length', truncation=True, max_length=128)
-
-# 应用预处理
-train_dataset = train_dataset.map(preprocess_function, batched=True)
-val_dataset = val_dataset.map(preprocess_function, batched=True)
+# 划分训练集和验证集并分词：结果按 (数据文件, tokenizer, max_length, 清洗版本) 缓存在磁盘上，
+# 再次运行时直接读取，模型评估.py 也读取同一份验证集
+if os.path.exists(args.data):
+    dataset = load_tokenized_splits(args.data, tokenizer, max_length=args.max_length,
+                                    num_proc=args.tokenize_workers or None)
+    train_dataset = dataset["train"]
+    val_dataset = dataset["validation"]
+else:
+    # 示例数据不写缓存
+    train_df, val_df = train_test_split(df, test_size=0.2, random_state=42)
+    fn_kwargs = {"tokenizer": tokenizer, "max_length": args.max_length}
+    train_dataset = Dataset.from_pandas(train_df, preserve_index=False)
+    val_dataset = Dataset.from_pandas(val_df, preserve_index=False)
+    train_dataset = train_dataset.map(tokenize_batch, batched=True, fn_kwargs=fn_kwargs,
+                                      remove_columns=['cleaned_content'])
+    val_dataset = val_dataset.map(tokenize_batch, batched=True, fn_kwargs=fn_kwargs,
+                                  remove_columns=['cleaned_content'])
 
-# 设置 Dataset 格式，移除不需要的列，重命名 label 列
-train_dataset = train_dataset.remove_columns(['__index_level_0__', 'cleaned_content', 'tokenized_content'] if '__index_level_0__' in train_dataset.column_names else ['cleaned_content', 'tokenized_content'])
-val_dataset = val_dataset.remove_columns(['__index_level_0__', 'cleaned_content', 'tokenized_content'] if '__index_level_0__' in val_dataset.column_names else ['cleaned_content', 'tokenized_content'])
-# train_dataset = train_dataset.rename_column("label", "labels") # Trainer 默认需要 'labels' 列
-# val_dataset = val_dataset.rename_column("label", "labels")
 train_dataset.set_format('torch')
 val_dataset.set_format('torch')
 
 
 # 加载预训练模型，指定类别数量 (positive, neutral, negative -> 3)
 try:
-    model = BertForSequenceClassification.from_pretrained(model_name, num_labels=3)
+    model = BertForSequenceClassification.from_pretrained(args.model_name, num_labels=3)
 except OSError:
-     print(f"错误：无法下载或找到 '{model_name}' 的模型。请检查网络连接或模型名称。")
+     print(f"错误：无法下载或找到 '{args.model_name}' 的模型。请检查网络连接或模型名称。")
      exit()
 
+# 按步保存时评估也按步进行（load_best_model_at_end 要求两者一致）
+strategy = "steps" if args.save_steps else "epoch"
+
 # 定义训练参数
 training_args = TrainingArguments(
-    output_dir='./results_bert_finetune', # 输出目录
-    num_train_epochs=1,                  # 训练轮数 (示例减少轮数)
-    per_device_train_batch_size=4,       # 减小 batch size 以适应内存 (示例)
-    per_device_eval_batch_size=8,
-    warmup_steps=10,                     # 减小 warmup steps (示例)
-    weight_decay=0.01,
-    logging_dir='./logs_bert',           # 日志目录
-    logging_steps=10,
-    evaluation_strategy="epoch",         # 每个 epoch 结束时评估
-    save_strategy="epoch",               # 每个 epoch 结束时保存模型
+    output_dir=args.output_dir,          # 输出目录
+    num_train_epochs=args.epochs,        # 训练轮数
+    per_device_train_batch_size=args.batch_size,
+    per_device_eval_batch_size=args.eval_batch_size,
+    gradient_accumulation_steps=args.grad_accum,
+    learning_rate=args.learning_rate,
+    warmup_steps=args.warmup_steps,
+    weight_decay=args.weight_decay,
+    logging_dir=args.logging_dir,        # 日志目录
+    logging_steps=args.logging_steps,
+    evaluation_strategy=strategy,
+    save_strategy=strategy,
+    eval_steps=args.save_steps or None,
+    save_steps=args.save_steps or 500,
+    save_total_limit=args.save_total_limit,  # 只保留最近的几个检查点
     load_best_model_at_end=True,         # 训练结束时加载最佳模型
     metric_for_best_model="accuracy",    # 使用准确率作为最佳模型指标
+    group_by_length=True,                # 长度相近的样本分到同一批，减少填充
+    length_column_name="length",
+    use_cpu=not torch.cuda.is_available(),
+    bf16=args.bf16,                      # CPU 上通过 torch.autocast 使用 bf16
+    dataloader_num_workers=args.dataloader_workers,
+    dataloader_pin_memory=args.pin_memory,
+    torch_compile=args.torch_compile,
+    seed=args.seed,
 )
 
+# 动态填充：每个批次只填充到批内最长样本
+data_collator = DataCollatorWithPadding(tokenizer=tokenizer)
+
 # 定义评估指标 (可选，更精细化评估)
-import numpy as np
 from datasets import load_metric
 
 metric = load_metric("accuracy") # 可以添加 F1, Precision, Recall 等
@@ -96,24 +218,34 @@ trainer = Trainer(
     args=training_args,
     train_dataset=train_dataset,
     eval_dataset=val_dataset,
+    data_collator=data_collator,
     compute_metrics=compute_metrics, # 添加评估指标计算函数
+    callbacks=[ThroughputCallback(args.batch_size * args.grad_accum)],
 )
 
+# 断点续训：--resume 不带值时从 output_dir 中最新的检查点继续
+resume_from_checkpoint = None
+if args.resume == "latest":
+    resume_from_checkpoint = get_last_checkpoint(args.output_dir) if os.path.isdir(args.output_dir) else None
+    if resume_from_checkpoint is None:
+        print("未找到检查点，从头开始训练")
+elif args.resume:
+    resume_from_checkpoint = args.resume
+if resume_from_checkpoint:
+    print(f"从检查点恢复训练: {resume_from_checkpoint}")
+
+print("训练配置:")
+print(json.dumps(vars(args), ensure_ascii=False, indent=2))
+
 # 开始训练 (需要 GPU 加速效果更佳)
 print("开始模型微调...")
 try:
-    trainer.train()
-    print("模型训练完成。")
+    train_result = trainer.train(resume_from_checkpoint=resume_from_checkpoint)
+    print(f"模型训练完成，平均吞吐量 {train_result.metrics.get('train_samples_per_second', 0):.2f} samples/sec")
     # 保存最终模型和 tokenizer
-    trainer.save_model("./results_bert_finetune/final_model")
-    tokenizer.save_pretrained("./results_bert_finetune/final_model")
+    final_path = os.path.join(args.output_dir, "final_model")
+    trainer.save_model(final_path)
+    tokenizer.save_pretrained(final_path)
     print("最终模型已保存。")
 except Exception as e:
     print(f"模型训练过程中发生错误: {e}")
-
-
-import os
-save_path = "./processed_val_dataset"
-os.makedirs(save_path, exist_ok=True)  # 确保目录存在
-val_dataset = val_dataset.flatten()  # 确保数据集格式正确
-val_dataset.save_to_disk(save_path)
\ No newline at end of file
@@ -1,77 +1,180 @@
+import argparse
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
 import pandas as pd
-import re
+import pyarrow as pa
+import pyarrow.parquet as pq
 import jieba # 需要提前安装: pip install jieba
 
-# 假设您有一个包含评论数据的CSV文件 'reviews.csv'
-# 列名可能包含 'review_id', 'content', 'raw_sentiment' (如果做了初步标注)
-try:
-    df = pd.read_csv('reviews.csv')
-except FileNotFoundError:
-    print("错误：'reviews.csv' 未找到。请确保数据文件存在。")
-    # 在此可以创建一个示例 DataFrame 用于演示
-    data = {'review_id': [1, 2, 3, 4, 5, 5],
-            'content': ['这部电影太棒了！', '剧情有点拖沓。', None, '演员演技在线！', '不好看。', '不好看。'],
-            'raw_sentiment': ['positive', 'negative', 'neutral', 'positive', 'negative', 'negative']}
-    df = pd.DataFrame(data)
-    print("已创建示例数据进行演示。")
+# 流式预处理：按块读取 reviews.csv，向量化清洗，跨块哈希去重，多进程 jieba 分词，逐块写出 Parquet（及 CSV）。
+# 内存占用只与块大小有关；各阶段行数与块大小、进程数无关，结果和一次性读入整个文件时一致。
+# 修改清洗规则时请递增 数据缓存.py 中的 CLEANING_VERSION，使旧的分词缓存失效。
+
+# 将 'positive', 'neutral', 'negative' 映射为 0, 1, 2
+sentiment_map = {'positive': 2, 'neutral': 1, 'negative': 0}
+STAGES = ["原始数据", "去除内容为空", "去除内容重复", "文本清洗", "标签映射"]
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="评论数据流式预处理")
+    parser.add_argument("--input", default="reviews.csv")
+    parser.add_argument("--output", default="processed_reviews.parquet", help="Parquet 输出文件")
+    parser.add_argument("--csv-output", default="processed_reviews.csv",
+                        help="同时写出的 CSV（模型训练.py 默认读取），传空字符串则不写")
+    parser.add_argument("--chunksize", type=int, default=100000, help="每次读取的行数")
+    parser.add_argument("--workers", type=int, default=0, help="分词进程数，0 表示使用全部 CPU")
+    return parser.parse_args()
 
 
-print(f"原始数据量: {len(df)}")
+def read_chunks(path, chunksize):
+    # 原始列统一按字符串读取，保证各块写入 Parquet 时的 schema 一致
+    try:
+        yield from pd.read_csv(path, chunksize=chunksize, dtype=str)
+    except FileNotFoundError:
+        print(f"错误：'{path}' 未找到。请确保数据文件存在。")
+        # 在此可以创建一个示例 DataFrame 用于演示
+        data = {'review_id': ['1', '2', '3', '4', '5', '5'],
+                'content': ['这部电影太棒了！', '剧情有点拖沓。', None, '演员演技在线！', '不好看。', '不好看。'],
+                'raw_sentiment': ['positive', 'negative', 'neutral', 'positive', 'negative', 'negative']}
+        print("已创建示例数据进行演示。")
+        yield pd.DataFrame(data)
+
 
 # 1. 数据清洗
-# 1.1 去除重复评论 (基于内容)
-df.drop_duplicates(subset=['content'], keep='first', inplace=True)
-print(f"去除内容重复后数据量: {len(df)}")
+def clean_text(series):
+    # 向量化版本：保留中英文、数字、空格，并去除多余空格
+    return (series.str.replace(r"[^\u4e00-\u9fa5a-zA-Z0-9\s]", "", regex=True)
+                  .str.replace(r"\s+", " ", regex=True)
+                  .str.strip())
+
+
+def clean_chunk(df, seen, counts):
+    counts["原始数据"] += len(df)
 
-# 1.2 处理缺失值 (例如，删除内容为空的评论)
-df.dropna(subset=['content'], inplace=True)
-print(f"去除内容为空后数据量: {len(df)}")
+    # 1.1 处理缺失值 (删除内容为空的评论)
+    df = df.dropna(subset=['content'])
+    counts["去除内容为空"] += len(df)
 
-# 1.3 文本清洗 (示例: 去除特殊字符、多余空格)
-def clean_text(text):
-    if isinstance(text, str):
-        text = re.sub(r"[^\u4e00-\u9fa5a-zA-Z0-9\s]", "", text) # 保留中英文、数字、空格
-        text = re.sub(r"\s+", " ", text).strip() # 去除多余空格
-        return text
-    return ""
+    # 1.2 去除重复评论 (基于内容)：保存已出现内容的 64 位哈希，跨块保留第一次出现的评论
+    hashes = pd.util.hash_pandas_object(df['content'], index=False).to_numpy()
+    keep = ~pd.Series(hashes).duplicated().to_numpy()
+    keep &= np.fromiter((h not in seen for h in hashes.tolist()), dtype=bool, count=len(hashes))
+    seen.update(hashes[keep].tolist())
+    df = df[keep]
+    counts["去除内容重复"] += len(df)
 
-df['cleaned_content'] = df['content'].apply(clean_text)
-# 删除清洗后为空的内容
-df = df[df['cleaned_content'] != ""]
-print(f"文本清洗后数据量: {len(df)}")
+    # 1.3 文本清洗，删除清洗后为空的内容
+    df = df.assign(cleaned_content=clean_text(df['content']))
+    df = df[df['cleaned_content'] != ""]
+    counts["文本清洗"] += len(df)
 
+    # 3. 标签映射 (假设已有初步标注 'raw_sentiment')
+    if 'raw_sentiment' in df.columns:
+        df = df.assign(label=df['raw_sentiment'].map(sentiment_map))
+        # 处理无法映射的情况
+        df = df.dropna(subset=['label'])
+        df = df.assign(label=df['label'].astype(int))
+    counts["标签映射"] += len(df)
+    return df
 
-# 2. 中文分词 (使用 jieba)
+
+# 2. 中文分词 (使用 jieba)，在子进程中执行
 # 可以加载自定义词典和停用词表
 # jieba.load_userdict('user_dict.txt')
 # stopwords = set(line.strip() for line in open('stopwords.txt', encoding='utf-8'))
+def init_worker():
+    jieba.initialize()  # 每个进程只加载一次词典
 
-def tokenize_chinese(text):
-    words = jieba.cut(text)
-    # filtered_words = [word for word in words if word not in stopwords and len(word.strip()) > 0]
-    # 简化示例：仅分词
-    filtered_words = [word for word in words if len(word.strip()) > 0]
-    return " ".join(filtered_words) # 返回以空格分隔的词
 
-df['tokenized_content'] = df['cleaned_content'].apply(tokenize_chinese)
+def tokenize_chinese(texts):
+    results = []
+    for text in texts:
+        words = jieba.cut(text)
+        # filtered_words = [word for word in words if word not in stopwords and len(word.strip()) > 0]
+        # 简化示例：仅分词
+        filtered_words = [word for word in words if len(word.strip()) > 0]
+        results.append(" ".join(filtered_words)) # 返回以空格分隔的词
+    return results
 
-# 3. 标签映射 (假设已有初步标注 'raw_sentiment')
-# 将 'positive', 'neutral', 'negative' 映射为 0, 1, 2
-sentiment_map = {'positive': 2, 'neutral': 1, 'negative': 0}
-# 假设存在名为 'raw_sentiment' 的列
-if 'raw_sentiment' in df.columns:
-    df['label'] = df['raw_sentiment'].map(sentiment_map)
-    # 处理无法映射的情况 (可选)
-    df.dropna(subset=['label'], inplace=True)
-    df['label'] = df['label'].astype(int)
-    print("标签已映射为数字。")
-else:
-    print("警告：数据中缺少'raw_sentiment'列，无法进行标签映射。")
-
-
-# 查看处理后的数据
-print("\n处理后的数据示例:")
-print(df[['cleaned_content', 'tokenized_content', 'label' if 'label' in df.columns else 'cleaned_content']].head())
-
-# 保存处理后的数据 (可选)
-df.to_csv('processed_reviews.csv', index=False)
\ No newline at end of file
+
+class ChunkWriter:
+    """逐块写出 Parquet 和 CSV，先写临时文件，全部完成后再改名"""
+
+    def __init__(self, parquet_path, csv_path=None):
+        self.parquet_path = parquet_path
+        self.csv_path = csv_path
+        self.parquet_writer = None
+        self.schema = None
+        self.csv_started = False
+        self.rows = 0
+
+    def write(self, df):
+        if self.parquet_writer is None:
+            # 原始列均为字符串，label 为整数；显式指定 schema，避免某一块整列为空时推断出不同类型
+            self.schema = pa.schema([(name, pa.int64() if name == 'label' else pa.string()) for name in df.columns])
+            self.parquet_writer = pq.ParquetWriter(self.parquet_path + ".tmp", self.schema)
+        table = pa.Table.from_pandas(df, schema=self.schema, preserve_index=False)
+        self.parquet_writer.write_table(table)
+        if self.csv_path:
+            df.to_csv(self.csv_path + ".tmp", index=False, mode="a" if self.csv_started else "w",
+                      header=not self.csv_started)
+            self.csv_started = True
+        self.rows += len(df)
+
+    def close(self):
+        if self.parquet_writer is not None:
+            self.parquet_writer.close()
+            os.replace(self.parquet_path + ".tmp", self.parquet_path)
+        if self.csv_started:
+            os.replace(self.csv_path + ".tmp", self.csv_path)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    workers = args.workers or os.cpu_count() or 1
+    counts = dict.fromkeys(STAGES, 0)
+    seen = set()
+    writer = ChunkWriter(args.output, args.csv_output or None)
+    # 最多同时有两块在分词：主进程清洗下一块时，子进程仍在处理上一块
+    pending = deque()
+    example = None
+
+    def flush(item):
+        global example
+        df, futures = item
+        tokenized = [text for future in futures for text in future.result()]
+        df = df.assign(tokenized_content=tokenized)
+        if example is None:
+            example = df.head()
+        writer.write(df)
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_worker) as executor:
+        for chunk in read_chunks(args.input, args.chunksize):
+            df = clean_chunk(chunk, seen, counts)
+            if df.empty:
+                continue
+            texts = df['cleaned_content'].tolist()
+            step = -(-len(texts) // workers)
+            futures = [executor.submit(tokenize_chinese, texts[i:i + step]) for i in range(0, len(texts), step)]
+            pending.append((df, futures))
+            if len(pending) > 1:
+                flush(pending.popleft())
+            print(f"已读取 {counts['原始数据']} 行")
+        while pending:
+            flush(pending.popleft())
+    writer.close()
+
+    print("\n各阶段数据量:")
+    for stage in STAGES:
+        print(f"{stage}: {counts[stage]}")
+    if example is not None and 'label' not in example.columns:
+        print("警告：数据中缺少'raw_sentiment'列，无法进行标签映射。")
+
+    # 查看处理后的数据
+    if example is not None:
+        print("\n处理后的数据示例:")
+        print(example[['cleaned_content', 'tokenized_content', 'label' if 'label' in example.columns else 'cleaned_content']])
+    print(f"\n处理后的数据已保存到 {args.output}" + (f" 和 {args.csv_output}" if args.csv_output else ""))